@@ -4,11 +4,29 @@ import os
 
 class TableExtractor:
 
-    def __init__(self, image_path):
+    def __init__(self, image_path, image=None, compact=False, deadline=None):
         self.image_path = image_path
+        self.input_image = image
+        # Optional request Deadline, checked around the contour search that can explode on noisy scans
+        self.deadline = deadline
+        # Compact mode keeps only the warped page and the homography, and writes no debug images
+        self.compact = compact
+        self.homography = None
+
+    def load_image(self):
+        # Pages coming from a multi-page document are already decoded
+        if self.input_image is not None:
+            self.image = self.input_image
+            self.input_image = None
+        else:
+            self.image = cv2.imread(self.image_path)
+        if self.image is None:
+            raise ValueError(f"Could not read image: {self.image_path}")
 
     def execute(self):
-        self.image = cv2.imread(self.image_path)
+        if self.compact:
+            return self.execute_compact()
+        self.load_image()
         self.store_process_image("0_original.jpg", self.image)
         self.convert_image_to_grayscale()
         self.store_process_image("1_grayscaled.jpg", self.grayscale_image)
@@ -20,6 +38,7 @@ class TableExtractor:
         self.store_process_image("5_dialateded.jpg", self.dilated_image)
         self.find_contours()
         self.store_process_image("6_all_contours.jpg", self.image_with_all_contours)
+        self.check_deadline("contour filtering")
         self.filter_contours_and_leave_only_rectangles()
         self.store_process_image("7_only_rectangular_contours.jpg", self.image_with_only_rectangular_contours)
         self.find_largest_contour_by_area()
@@ -34,6 +53,55 @@ class TableExtractor:
         return self.perspective_corrected_image_with_padding
         
 
+    def execute_compact(self):
+        """
+        Same pipeline as execute(), but every intermediate lives in one reused buffer and is
+        released as soon as possible: only the padded warped page and the homography remain.
+        """
+        self.load_image()
+        binary = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        cv2.threshold(binary, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
+        cv2.bitwise_not(binary, dst=binary)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+        cv2.dilate(binary, kernel, dst=binary, iterations=2)
+        contours, _ = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        del binary
+
+        largest_contour = None
+        largest_area = 0
+        min_area = 10000
+        self.check_deadline("contour filtering")
+        for index, contour in enumerate(contours):
+            if index % 1000 == 999:
+                self.check_deadline("contour filtering")
+            # As in execute(): the contour itself must be large enough, the quadrilateral is ranked
+            if cv2.contourArea(contour) <= min_area:
+                continue
+            peri = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.01 * peri, True)
+            if len(approx) == 4:
+                area = cv2.contourArea(approx)
+                if area > largest_area:
+                    largest_contour = approx
+                    largest_area = area
+        del contours
+        if largest_contour is None:
+            raise ValueError(f"No table outline found in {self.image_path}")
+
+        self.contour_with_max_area = largest_contour
+        self.contour_with_max_area_ordered = self.order_points(largest_contour)
+        self.calculate_new_width_and_height_of_image()
+        self.apply_perspective_transform()
+        self.add_10_percent_padding()
+
+        self.perspective_corrected_image = None
+        self.image = None
+        return self.perspective_corrected_image_with_padding
+
+    def check_deadline(self, stage):
+        if self.deadline is not None:
+            self.deadline.check(stage)
+
     def convert_image_to_grayscale(self):
         self.grayscale_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
 
@@ -109,6 +177,7 @@ class TableExtractor:
         pts1 = np.float32(self.contour_with_max_area_ordered)
         pts2 = np.float32([[0, 0], [self.new_image_width, 0], [self.new_image_width, self.new_image_height], [0, self.new_image_height]])
         matrix = cv2.getPerspectiveTransform(pts1, pts2)
+        self.homography = matrix
         self.perspective_corrected_image = cv2.warpPerspective(self.image, matrix, (self.new_image_width, self.new_image_height))
 
     def add_10_percent_padding(self):
@@ -0,0 +1,231 @@
+import threading
+import queue
+import time
+from page_source import MULTI_PAGE_EXTENSIONS, iter_pages, read_image
+
+STOP = object()
+
+class MonitoredQueue:
+    """
+    Bounded queue that records its time-weighted mean and peak occupancy, and how long
+    producers waited on a full queue and consumers on an empty one.
+    """
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.last_change = self.started_at
+        self.size = 0
+        self.size_seconds = 0.0
+        self.peak = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def record(self, delta, put_wait=0.0, get_wait=0.0):
+        with self.lock:
+            self.put_wait += put_wait
+            self.get_wait += get_wait
+            now = time.perf_counter()
+            self.size_seconds += self.size * (now - self.last_change)
+            self.last_change = now
+            self.size += delta
+            self.peak = max(self.peak, self.size)
+
+    def put(self, item):
+        start = time.perf_counter()
+        self.queue.put(item)
+        self.record(1, put_wait=time.perf_counter() - start)
+
+    def get(self):
+        start = time.perf_counter()
+        item = self.queue.get()
+        self.record(-1, get_wait=time.perf_counter() - start)
+        return item
+
+    def report(self):
+        self.record(0)
+        elapsed = max(self.last_change - self.started_at, 1e-9)
+        return {
+            'depth': self.maxsize,
+            'mean_occupancy': round(self.size_seconds / elapsed, 2),
+            'peak_occupancy': self.peak,
+            'producer_blocked_s': round(self.put_wait, 3),
+            'consumer_starved_s': round(self.get_wait, 3),
+        }
+
+class StageStats:
+    """Busy time of one pipeline stage, summed over its workers"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.busy += seconds
+            self.items += 1
+
+    def report(self, wall_seconds):
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_s': round(self.busy, 3),
+            'utilization': round(self.busy / (wall_seconds * self.workers), 3) if wall_seconds else 0.0,
+        }
+
+class BatchPipeline:
+    """
+    Overlap decoding, preprocessing and OCR when processing a batch of files.
+
+    A prefetch thread decodes pages, a pool of threads runs TableExtractor (OpenCV
+    releases the GIL) and the calling thread runs OCR, which needs the single
+    PaddleOCR engine of the processor. With an ImagePack nothing is opened per page:
+    the prefetch thread only hands out index entries and the preprocess threads
+    decode them from the memory-mapped pack. Stages are connected by bounded queues, so at
+    most about 2 * queue_depth + preprocess_workers pages are in memory at once.
+    """
+
+    def __init__(self, processor, preprocess_workers=2, queue_depth=4):
+        self.processor = processor
+        self.preprocess_workers = preprocess_workers
+        self.queue_depth = queue_depth
+        self.stats = {}
+        self.report = {}
+
+    def scaled_pages(self, path):
+        """(page_index, image, scale) of a file; single images are decoded at reduced resolution if large"""
+        if path.lower().endswith(tuple(MULTI_PAGE_EXTENSIONS)):
+            for page_index, image in iter_pages(path, dpi=self.processor.PDF_DPI):
+                yield page_index, image, 1.0
+        else:
+            image, scale = read_image(path, target_height=self.processor.DECODE_TARGET_HEIGHT)
+            yield 0, image, scale
+
+    def prefetch(self, paths, decoded):
+        """Stage 1: decode every page of every file in order"""
+        stage = self.stats['decode']
+        sequence = 0
+        for path in paths:
+            pages = self.scaled_pages(path)
+            multi_page = path.lower().endswith(tuple(MULTI_PAGE_EXTENSIONS))
+            while True:
+                start = time.perf_counter()
+                try:
+                    page_index, image, scale = next(pages)
+                    error = None
+                except StopIteration:
+                    break
+                except Exception as e:
+                    page_index, image, scale, error = None, None, 1.0, e
+                stage.add(time.perf_counter() - start)
+                decoded.put((sequence, path, page_index if multi_page else None, image, error, None, scale))
+                sequence += 1
+                if error is not None:
+                    break
+        for _ in range(self.preprocess_workers):
+            decoded.put(STOP)
+    
+    def prefetch_pack(self, pack, decoded):
+        """Stage 1 for a pack: the entries in order, decoded later by the preprocess threads"""
+        for sequence, entry in enumerate(pack.entries):
+            decoded.put((sequence, entry['name'], entry['page_index'], entry, None, entry['format'], 1.0))
+        for _ in range(self.preprocess_workers):
+            decoded.put(STOP)
+
+    def preprocess(self, decoded, preprocessed, pack=None):
+        """Stage 2: TableExtractor on decoded pages, several pages at a time"""
+        stage = self.stats['preprocess']
+        while True:
+            item = decoded.get()
+            if item is STOP:
+                preprocessed.put(STOP)
+                return
+            sequence, path, page_index, image, error, page_format, scale = item
+            if pack is not None:
+                start = time.perf_counter()
+                try:
+                    image, scale = pack.decode_scaled(image, self.processor.DECODE_TARGET_HEIGHT)
+                except Exception as e:
+                    image, error = None, e
+                self.stats['decode'].add(time.perf_counter() - start)
+            processed = None
+            if error is None:
+                start = time.perf_counter()
+                try:
+                    processed, scale = self.processor.preprocess_page(path, image, scale)
+                except Exception as e:
+                    error = e
+                stage.add(time.perf_counter() - start)
+            preprocessed.put((sequence, path, page_index, processed, error, page_format, scale))
+
+    def run(self, paths, format_name=None, pack=None):
+        """
+        Process the files (or every entry of an ImagePack, with the format stored for it
+        unless format_name is given) and return one result per page, in input order
+        """
+        start = time.perf_counter()
+        self.stats = {
+            'decode': StageStats('decode', self.preprocess_workers if pack is not None else 1),
+            'preprocess': StageStats('preprocess', self.preprocess_workers),
+            'ocr': StageStats('ocr', 1),
+        }
+        decoded = MonitoredQueue('decoded', self.queue_depth)
+        preprocessed = MonitoredQueue('preprocessed', self.queue_depth)
+        if pack is not None:
+            threads = [threading.Thread(target=self.prefetch_pack, args=(pack, decoded), name="pipeline-index", daemon=True)]
+        else:
+            threads = [threading.Thread(target=self.prefetch, args=(paths, decoded), name="pipeline-decode", daemon=True)]
+        threads += [
+            threading.Thread(target=self.preprocess, args=(decoded, preprocessed, pack), name=f"pipeline-preprocess-{i}", daemon=True)
+            for i in range(self.preprocess_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Stage 3 runs here: OCR for whichever page is ready first
+        results = {}
+        finished_workers = 0
+        while finished_workers < self.preprocess_workers:
+            item = preprocessed.get()
+            if item is STOP:
+                finished_workers += 1
+                continue
+            sequence, path, page_index, processed, error, page_format, scale = item
+            ocr_start = time.perf_counter()
+            if error is not None:
+                print(f"Error processing image {path}: {error}")
+                results[sequence] = self.processor.build_error_result(path, format_name or page_format, error, page_index)
+            else:
+                results[sequence] = self.processor.process_single_image(
+                    path, format_name or page_format, page_index=page_index, preprocessed=processed, image_scale=scale
+                )
+            self.stats['ocr'].add(time.perf_counter() - ocr_start)
+
+        for thread in threads:
+            thread.join()
+
+        wall = time.perf_counter() - start
+        self.report = {
+            'wall_s': round(wall, 3),
+            'pages': len(results),
+            'stages': {name: stage.report(wall) for name, stage in self.stats.items()},
+            'queues': {q.name: q.report() for q in (decoded, preprocessed)},
+        }
+        return [results[sequence] for sequence in sorted(results)]
+
+    def print_report(self):
+        """Show where the batch spent its time; the busiest stage is the bottleneck"""
+        print(f"Pipeline: {self.report['pages']} page(s) in {self.report['wall_s']:.2f} s")
+        for name, stage in self.report['stages'].items():
+            print(f"  stage {name:<10} workers={stage['workers']} busy={stage['busy_s']:.2f}s utilization={stage['utilization']:.0%}")
+        for name, occupancy in self.report['queues'].items():
+            print(f"  queue {name:<12} mean={occupancy['mean_occupancy']:.2f}/{occupancy['depth']} peak={occupancy['peak_occupancy']} "
+                  f"producer blocked={occupancy['producer_blocked_s']:.2f}s consumer starved={occupancy['consumer_starved_s']:.2f}s")
+        bottleneck = max(self.report['stages'].items(), key=lambda item: item[1]['utilization'])[0]
+        print(f"  bottleneck: {bottleneck}")
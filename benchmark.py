@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Quittance Extractor Benchmarks
+Timing comparisons for the extraction pipeline, run on the images in ./images.
+"""
+
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_DIR = './images'
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']
+
+def list_images(image_dir):
+    """Return the paths of all images in the directory"""
+    return [
+        os.path.join(image_dir, filename)
+        for filename in sorted(os.listdir(image_dir))
+        if any(filename.lower().endswith(ext) for ext in IMAGE_EXTENSIONS)
+    ]
+
+def time_call(function, *args, repeat=1, **kwargs):
+    """Run a function `repeat` times and return (last result, mean seconds)"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) / repeat
+
+def print_table(headers, rows):
+    """Print rows as an aligned text table"""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    print("  ".join(str(header).ljust(width) for header, width in zip(headers, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+def benchmark_orientation(args):
+    """Per-crop angle classification vs a single page-level orientation check"""
+    from quittance_processor import QuittanceProcessor
+    from page_orientation import correct_page_orientation
+
+    processor = QuittanceProcessor()
+    processor.OCR_MODE = args.ocr_mode
+    processor.BOX_ALIGNMENT_MODE = None
+
+    rows = []
+    total_per_crop = 0.0
+    total_page_level = 0.0
+    for image_path in list_images(args.image_dir):
+        page = processor.preprocess_image(image_path)
+        format_name = args.format or processor.detect_quittance_format(page)
+        # Warm-up pass so engine initialisation is not charged to the first variant
+        processor.extract_all_fields(page, format_name)
+
+        processor.PAGE_ORIENTATION_CHECK = False
+        _, per_crop = time_call(processor.extract_all_fields, page, format_name, repeat=args.repeat)
+
+        processor.PAGE_ORIENTATION_CHECK = True
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            upright_page, angle, _ = correct_page_orientation(processor.ocr, page)
+            processor.extract_all_fields(upright_page, format_name)
+        page_level = (time.perf_counter() - start) / args.repeat
+
+        total_per_crop += per_crop
+        total_page_level += page_level
+        rows.append([
+            os.path.basename(image_path), format_name, angle,
+            f"{per_crop * 1000:.0f}", f"{page_level * 1000:.0f}",
+            f"{(per_crop - page_level) * 1000:.0f}",
+        ])
+
+    print_table(["image", "format", "rotation", "cls per crop (ms)", "page check (ms)", "saved (ms)"], rows)
+    if rows:
+        print(f"\nTotal saved: {(total_per_crop - total_page_level) * 1000:.0f} ms "
+              f"({(1 - total_page_level / total_per_crop):.1%} of field extraction time)")
+
+def prepare_table_inputs(image_path):
+    """Warp a quittance and build the binary text image OcrToTableTool expects"""
+    import cv2
+    from TableExtractor import TableExtractor
+
+    page = TableExtractor(image_path).execute()
+    gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+    thresholded = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    return thresholded, page
+
+def benchmark_table(args):
+    """OcrToTableTool enhancing each crop as it is read vs the text region once, crops sliced from it"""
+    from OcrToTableTool import OcrToTableTool
+
+    rows = []
+    for image_path in list_images(args.image_dir):
+        thresholded, page = prepare_table_inputs(image_path)
+        # Warm-up so the shared engine is built before anything is timed
+        OcrToTableTool(thresholded, page.copy()).execute()
+
+        timings = {}
+        tables = {}
+        for mode in ['crop', 'page']:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                tool = OcrToTableTool(thresholded, page.copy(), enhance_mode=mode)
+                tool.execute()
+            timings[mode] = ((time.perf_counter() - start) / args.repeat, tool.enhancement_ms)
+            tables[mode] = tool.table
+
+        same_cells = sum(
+            1 for crop_row, page_row in zip(tables['crop'], tables['page'])
+            for crop_cell, page_cell in zip(crop_row, page_row) if crop_cell == page_cell
+        )
+        total_cells = max(sum(len(row) for row in tables['crop']), sum(len(row) for row in tables['page']), 1)
+        rows.append([
+            os.path.basename(image_path),
+            f"{timings['crop'][0] * 1000:.0f}", f"{timings['crop'][1]:.0f}",
+            f"{timings['page'][0] * 1000:.0f}", f"{timings['page'][1]:.0f}",
+            f"{timings['crop'][0] / timings['page'][0]:.2f}x",
+            f"{same_cells}/{total_cells}",
+        ])
+
+    print_table(["image", "crop total (ms)", "crop enhance (ms)", "page total (ms)",
+                 "page enhance (ms)", "speedup", "identical cells"], rows)
+
+_shared_reader = None
+
+def checksum_pickled_crops(payload):
+    """Worker side of the pickle transport: the page and its crops arrive by value"""
+    page, crops = payload
+    return sum(int(crop.sum()) for crop in crops) + page.shape[0]
+
+def checksum_shared_crops(descriptor):
+    """Worker side of the shared-memory transport: only the descriptor arrives"""
+    global _shared_reader
+    from shared_images import SharedImageReader
+
+    if _shared_reader is None:
+        _shared_reader = SharedImageReader()
+    page, crops = _shared_reader.open(descriptor)
+    checksum = sum(int(crop.sum()) for crop in crops) + page.shape[0]
+    del page, crops
+    _shared_reader.release(descriptor)
+    return checksum
+
+def benchmark_handoff(args):
+    """Pickling pages and crops to a worker process vs shared memory descriptors"""
+    import json
+    from TableExtractor import TableExtractor
+    from shared_images import SharedImage, SharedImageRing
+
+    with open(args.boxes, 'r', encoding='utf-8') as f:
+        boxes = [tuple(box) for box in json.load(f).values()]
+    rows = []
+    with ProcessPoolExecutor(max_workers=1) as pool, SharedImageRing(slots=2, slot_bytes=args.slot_mb * 1024 * 1024) as ring:
+        pool.submit(int, 0).result()
+        for image_path in list_images(args.image_dir):
+            page = TableExtractor(image_path).execute()
+            page_boxes = [(x, y, w, h) for x, y, w, h in boxes if x + w <= page.shape[1] and y + h <= page.shape[0]]
+            crops = [page[y:y + h, x:x + w] for x, y, w, h in page_boxes]
+
+            pickled_bytes = len(pickle.dumps((page, crops), protocol=pickle.HIGHEST_PROTOCOL))
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                expected = pool.submit(checksum_pickled_crops, (page, crops)).result()
+            pickle_ms = (time.perf_counter() - start) * 1000 / args.requests
+
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                with SharedImage(page, page_boxes) as shared:
+                    shared_result = pool.submit(checksum_shared_crops, shared.descriptor).result()
+            block_ms = (time.perf_counter() - start) * 1000 / args.requests
+
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                descriptor = ring.put(page, page_boxes)
+                try:
+                    ring_result = pool.submit(checksum_shared_crops, descriptor).result()
+                finally:
+                    ring.release(descriptor)
+            ring_ms = (time.perf_counter() - start) * 1000 / args.requests
+
+            assert expected == shared_result == ring_result, "Transports returned different checksums"
+            descriptor_bytes = len(pickle.dumps(descriptor, protocol=pickle.HIGHEST_PROTOCOL))
+            rows.append([
+                os.path.basename(image_path),
+                f"{pickled_bytes / 1024:.0f}", f"{pickle_ms:.2f}",
+                f"{descriptor_bytes} + {page.nbytes / 1024:.0f}K", f"{block_ms:.2f}", f"{ring_ms:.2f}",
+            ])
+
+    print_table(["image", "pickle (KB)", "pickle (ms)", "shm descriptor (B) + page copy",
+                 "shm block (ms)", "shm ring (ms)"], rows)
+
+def measure_table_extractor_memory(image_path, compact):
+    """Runs in a fresh process: peak RSS growth (MB) and wall time of one TableExtractor run"""
+    import resource
+    from TableExtractor import TableExtractor
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    extractor = TableExtractor(image_path, compact=compact)
+    page = extractor.execute()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    import numpy as np
+    retained = sum(value.nbytes for value in vars(extractor).values() if isinstance(value, np.ndarray))
+    # ru_maxrss is in kilobytes on Linux
+    return (peak - before) / 1024, retained / (1024 * 1024), elapsed, page.shape
+
+def benchmark_memory(args):
+    """Peak RSS per page of TableExtractor in full vs compact mode"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for image_path in list_images(args.image_dir):
+        row = [os.path.basename(image_path)]
+        for compact in (False, True):
+            # A new process per measurement, since ru_maxrss only ever grows
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                peak_mb, retained_mb, elapsed, shape = pool.submit(measure_table_extractor_memory, image_path, compact).result()
+            row += [f"{peak_mb:.1f}", f"{retained_mb:.1f}", f"{elapsed * 1000:.0f}"]
+        rows.append(row)
+
+    print_table(["image", "full peak (MB)", "full kept (MB)", "full (ms)",
+                 "compact peak (MB)", "compact kept (MB)", "compact (ms)"], rows)
+
+def measure_reduced_decode(image_path, target_height):
+    """Runs in a fresh process: decode and preprocess times (ms), peak RSS growth (MB) and scale"""
+    import resource
+    from PIL import Image  # imported before timing, as in a long-running processor
+    from page_source import read_image
+    from TableExtractor import TableExtractor
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    image, scale = read_image(image_path, target_height=target_height)
+    decoded = time.perf_counter()
+    TableExtractor(image_path, image=image, compact=True).execute()
+    preprocessed = time.perf_counter()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (decoded - start) * 1000, (preprocessed - decoded) * 1000, (peak - before) / 1024, scale
+
+def benchmark_decode(args):
+    """Full-resolution vs reduced-resolution decode (DECODE_TARGET_HEIGHT) of every image"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for image_path in list_images(args.image_dir):
+        row = [os.path.basename(image_path)]
+        for target_height in (0, args.target_height):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                decode_ms, preprocess_ms, peak_mb, scale = pool.submit(measure_reduced_decode, image_path, target_height).result()
+            row += [f"{decode_ms:.0f}", f"{preprocess_ms:.0f}", f"{peak_mb:.1f}"]
+        rows.append(row + [f"{scale:.3f}"])
+
+    print_table(["image", "full decode (ms)", "full preprocess (ms)", "full peak (MB)",
+                 "reduced decode (ms)", "reduced preprocess (ms)", "reduced peak (MB)", "scale"], rows)
+
+def benchmark_pipeline(args):
+    """Sequential batch vs the staged decode/preprocess/OCR pipeline"""
+    from quittance_processor import QuittanceProcessor
+    from batch_pipeline import BatchPipeline
+
+    processor = QuittanceProcessor()
+    processor.warm_up()
+    paths = list_images(args.image_dir) * args.repeat
+
+    start = time.perf_counter()
+    for path in paths:
+        list(processor.process_document(path, args.format))
+    sequential = time.perf_counter() - start
+
+    pipeline = BatchPipeline(processor, preprocess_workers=args.workers, queue_depth=args.depth)
+    pipeline.run(paths, args.format)
+    pipeline.print_report()
+    print()
+    print_table(["pages", "sequential (s)", "pipelined (s)", "speedup"],
+                [[pipeline.report['pages'], f"{sequential:.2f}", f"{pipeline.report['wall_s']:.2f}",
+                  f"{sequential / pipeline.report['wall_s']:.2f}x"]])
+
+def field_texts(fields):
+    """Flat {field: text} of an extraction, without its metadata"""
+    texts = {}
+    for field, value in fields.items():
+        if isinstance(value, str):
+            texts[field] = value
+        elif isinstance(value, dict) and field not in ('field_confidence', 'ocr_metrics', 'validation', 'deadline'):
+            texts.update({f"{field}.{key}": text for key, text in value.items()})
+    return texts
+
+def benchmark_backends(args):
+    """Field agreement, confidence and latency of the OCR backends against FP32 Paddle"""
+    from quittance_processor import QuittanceProcessor
+
+    pages = None
+    baseline = {}
+    rows = []
+    for backend in args.backends:
+        os.environ['OCR_BACKEND'] = backend
+        processor = QuittanceProcessor()
+        processor.warm_up()
+        if pages is None:
+            # Preprocess once with the first backend; every backend reads the same pages
+            pages = []
+            for image_path in list_images(args.image_dir):
+                page = processor.preprocess_image(image_path)
+                pages.append((os.path.basename(image_path), page, args.format or processor.detect_quittance_format(page)))
+
+        agreed = compared = 0
+        confidences = []
+        seconds = 0.0
+        for name, page, format_name in pages:
+            fields, elapsed = time_call(processor.extract_all_fields, page, format_name, repeat=args.repeat)
+            seconds += elapsed
+            confidences.extend(fields['field_confidence'].values())
+            texts = field_texts(fields)
+            if backend == args.backends[0]:
+                baseline[name] = texts
+            else:
+                compared += len(baseline[name])
+                agreed += sum(1 for field, value in baseline[name].items() if texts.get(field) == value)
+        rows.append([
+            backend,
+            f"{seconds / len(pages) * 1000:.0f}",
+            f"{sum(confidences) / len(confidences):.3f}" if confidences else "-",
+            f"{agreed / compared:.1%}" if compared else "baseline",
+        ])
+
+    print_table(["backend", "ms/page", "mean confidence", f"fields equal to {args.backends[0]}"], rows)
+
+def benchmark_overhead(args):
+    """Pipeline overhead vs model inference, replaying a recording made with OCR_ENGINE=record"""
+    from quittance_processor import QuittanceProcessor
+
+    os.environ['OCR_ENGINE'] = 'replay'
+    os.environ['OCR_RECORDING'] = args.recording
+    processor = QuittanceProcessor()
+    processor.BATCH_PIPELINE = False
+    rows = []
+    for image_path in list_images(args.image_dir):
+        before = dict(processor.ocr.stats)
+        _, seconds = time_call(lambda: list(processor.process_document(image_path)), repeat=args.repeat)
+        rows.append([
+            os.path.basename(image_path),
+            f"{seconds * 1000:.0f}",
+            f"{(processor.ocr.stats['replayed_ms'] - before['replayed_ms']) / args.repeat:.0f}",
+            f"{(processor.ocr.stats['hits'] - before['hits']) // args.repeat}",
+            f"{(processor.ocr.stats['misses'] - before['misses']) // args.repeat}",
+        ])
+
+    print_table(["image", "pipeline without model (ms)", "recorded inference (ms)", "OCR hits", "OCR misses"], rows)
+
+def benchmark_strips(args):
+    """OCR calls and latency per page with and without row-strip OCR, and whether the fields change"""
+    from quittance_processor import QuittanceProcessor
+
+    processor = QuittanceProcessor()
+    processor.warm_up()
+    pages = []
+    for image_path in list_images(args.image_dir):
+        page = processor.preprocess_image(image_path)
+        pages.append((os.path.basename(image_path), page, args.format or processor.detect_quittance_format(page)))
+
+    rows = []
+    baseline = {}
+    for row_strips in (False, True):
+        processor.ROW_STRIP_OCR = row_strips
+        calls = changed = 0
+        seconds = 0.0
+        for name, page, format_name in pages:
+            fields, elapsed = time_call(processor.extract_all_fields, page, format_name, repeat=args.repeat)
+            seconds += elapsed
+            calls += fields['ocr_metrics']['ocr_calls']
+            texts = field_texts(fields)
+            if not row_strips:
+                baseline[name] = texts
+            else:
+                changed += sum(1 for field, value in baseline[name].items() if texts.get(field) != value)
+        rows.append([
+            "row strips" if row_strips else "one crop per field",
+            f"{seconds / len(pages) * 1000:.0f}",
+            f"{calls / len(pages):.1f}",
+            str(changed) if row_strips else "baseline",
+        ])
+
+    print_table(["mode", "ms/page", "OCR calls/page", "fields changed"], rows)
+    if changed:
+        print(f"\nWarning: row strips changed {changed} field(s); keep ROW_STRIP_OCR off for these pages")
+
+def benchmark_pack(args):
+    """Reading and decoding a directory of image files vs the same images from an image pack"""
+    import shutil
+    import tempfile
+    import cv2
+    from image_pack import ImagePack, build_pack
+
+    sources = list_images(args.image_dir)
+    work_dir = tempfile.mkdtemp(prefix='pack_benchmark_')
+    try:
+        image_dir = os.path.join(work_dir, 'images')
+        os.makedirs(image_dir)
+        # Distinct files (one byte appended) so the pack cannot store them once
+        for copy in range(args.copies):
+            for source in sources:
+                with open(source, 'rb') as f:
+                    data = f.read()
+                with open(os.path.join(image_dir, f"{copy:05d}_{os.path.basename(source)}"), 'wb') as f:
+                    f.write(data + bytes([copy % 256]))
+        pack_path = os.path.join(work_dir, 'images.qpack')
+        _, build_seconds = time_call(build_pack, image_dir, pack_path)
+
+        def read_directory(decode):
+            for filename in sorted(os.listdir(image_dir)):
+                path = os.path.join(image_dir, filename)
+                if decode:
+                    cv2.imread(path)
+                else:
+                    with open(path, 'rb') as f:
+                        f.read()
+
+        def read_pack(decode):
+            with ImagePack(pack_path) as pack:
+                for entry in pack.entries:
+                    if decode:
+                        pack.decode(entry)
+                    else:
+                        pack.encoded(entry).tobytes()
+
+        pages = len(sources) * args.copies
+        rows = []
+        for name, read in (("directory", read_directory), ("image pack", read_pack)):
+            _, read_seconds = time_call(read, False, repeat=args.repeat)
+            _, decode_seconds = time_call(read, True, repeat=args.repeat)
+            rows.append([name, f"{read_seconds / pages * 1000:.3f}", f"{decode_seconds / pages * 1000:.2f}",
+                         f"{pages / decode_seconds:.0f}"])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Pack of {pages} images built in {build_seconds:.2f} s (page cache warm for both reads)")
+    print_table(["source", "read ms/image", "read+decode ms/image", "images/s"], rows)
+
+def run_budget_worker(worker_index, workers, threads, pin, paths, barrier, results):
+    """One benchmark worker process: apply the budget, warm up, then process its share of pages"""
+    from thread_budget import THREAD_ENV_VARS, ThreadBudget
+
+    os.environ['OCR_WORKERS'] = str(workers)
+    os.environ['OCR_THREADS_PER_WORKER'] = str(threads)
+    os.environ['OCR_PIN_CPUS'] = '0'
+    # The layout under test sizes BLAS/OpenMP too, whatever this shell exported
+    for name in THREAD_ENV_VARS:
+        os.environ.pop(name, None)
+    ThreadBudget(workers, threads, pin).apply(worker_index)
+
+    from quittance_processor import QuittanceProcessor
+    processor = QuittanceProcessor()
+    processor.BATCH_PIPELINE = False
+    processor.warm_up()
+    barrier.wait()
+    start = time.perf_counter()
+    pages = 0
+    for path in paths[worker_index::workers]:
+        pages += len(list(processor.process_document(path)))
+    results.put((pages, time.perf_counter() - start))
+
+def benchmark_threads(args):
+    """Throughput of every workers x threads-per-worker layout on this machine"""
+    import multiprocessing
+
+    cores = args.cores or os.cpu_count() or 1
+    powers = [2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores]
+    worker_counts = args.workers or powers
+    thread_counts = args.threads or powers
+    paths = list_images(args.image_dir) * args.repeat
+    context = multiprocessing.get_context('spawn')
+
+    rows = []
+    for workers in worker_counts:
+        for threads in thread_counts:
+            if workers * threads > 2 * cores:
+                continue
+            barrier = context.Barrier(workers)
+            results = context.Queue()
+            processes = [
+                context.Process(target=run_budget_worker, args=(i, workers, threads, args.pin, paths, barrier, results))
+                for i in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            finished = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            pages = sum(count for count, _ in finished)
+            wall = max(seconds for _, seconds in finished)
+            rows.append([workers, threads, workers * threads, pages, f"{wall:.2f}", pages / wall if wall else 0.0])
+
+    best = max(rows, key=lambda row: row[5])
+    for row in rows:
+        row[5] = f"{row[5]:.2f}" + (" <- best" if row is best else "")
+    print(f"{cores} cores, pinning {'on' if args.pin else 'off'}")
+    print_table(["workers", "threads/worker", "total threads", "pages", "wall (s)", "pages/s"], rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the quittance extraction pipeline")
+    parser.add_argument('--image-dir', default=IMAGE_DIR)
+    parser.add_argument('--repeat', type=int, default=3)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    orientation_parser = subparsers.add_parser('orientation', help=benchmark_orientation.__doc__)
+    orientation_parser.add_argument('--format', default=None, help="Skip format detection and use this format")
+    orientation_parser.add_argument('--ocr-mode', default='full', choices=['full', 'tiered'])
+    orientation_parser.set_defaults(func=benchmark_orientation)
+
+    table_parser = subparsers.add_parser('table', help=benchmark_table.__doc__)
+    table_parser.set_defaults(func=benchmark_table)
+
+    handoff_parser = subparsers.add_parser('handoff', help=benchmark_handoff.__doc__)
+    handoff_parser.add_argument('--boxes', default='box_configurations/hp0012_custom_config.json',
+                                help="Box configuration used to cut the crops")
+    handoff_parser.add_argument('--requests', type=int, default=50)
+    handoff_parser.add_argument('--slot-mb', type=int, default=32)
+    handoff_parser.set_defaults(func=benchmark_handoff)
+
+    memory_parser = subparsers.add_parser('memory', help=benchmark_memory.__doc__)
+    memory_parser.set_defaults(func=benchmark_memory)
+
+    decode_parser = subparsers.add_parser('decode', help=benchmark_decode.__doc__)
+    decode_parser.add_argument('--target-height', type=int, default=1600)
+    decode_parser.set_defaults(func=benchmark_decode)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help=benchmark_pipeline.__doc__)
+    pipeline_parser.add_argument('--format', default=None, help="Skip format detection and use this format")
+    pipeline_parser.add_argument('--workers', type=int, default=2, help="Preprocessing threads")
+    pipeline_parser.add_argument('--depth', type=int, default=4, help="Capacity of each queue")
+    pipeline_parser.set_defaults(func=benchmark_pipeline)
+
+    backends_parser = subparsers.add_parser('backends', help=benchmark_backends.__doc__)
+    backends_parser.add_argument('--backends', nargs='+', default=['paddle', 'onnx', 'onnx_int8'],
+                                 help="The first backend is the reference for agreement")
+    backends_parser.add_argument('--format', default=None, help="Skip format detection and use this format")
+    backends_parser.set_defaults(func=benchmark_backends)
+
+    overhead_parser = subparsers.add_parser('overhead', help=benchmark_overhead.__doc__)
+    overhead_parser.add_argument('--recording', default='ocr_recording.json')
+    overhead_parser.set_defaults(func=benchmark_overhead)
+
+    strips_parser = subparsers.add_parser('strips', help=benchmark_strips.__doc__)
+    strips_parser.add_argument('--format', default=None, help="Skip format detection and use this format")
+    strips_parser.set_defaults(func=benchmark_strips)
+
+    pack_parser = subparsers.add_parser('pack', help=benchmark_pack.__doc__)
+    pack_parser.add_argument('--copies', type=int, default=500, help="Copies of each image in the test set")
+    pack_parser.set_defaults(func=benchmark_pack)
+
+    threads_parser = subparsers.add_parser('threads', help=benchmark_threads.__doc__)
+    threads_parser.add_argument('--cores', type=int, default=None, help="Cores to share out (default: all)")
+    threads_parser.add_argument('--workers', type=int, nargs='+', default=None)
+    threads_parser.add_argument('--threads', type=int, nargs='+', default=None)
+    threads_parser.add_argument('--pin', action='store_true', help="Pin every worker to its own cores")
+    threads_parser.set_defaults(func=benchmark_threads)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
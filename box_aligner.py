@@ -0,0 +1,146 @@
+import time
+import cv2
+import numpy as np
+
+class BoxAligner:
+    """
+    Snap configured field boxes to the ruling lines of a warped quittance.
+
+    The horizontal and vertical lines of the table are found once per page with
+    morphological opening; every box is then fitted to the cell that contains its
+    centre, growing or shrinking by up to max_shift per side (mode 'cell'), or all boxes
+    are moved by the median offset between boxes and cells (mode 'offset').
+    """
+
+    def __init__(self, image, max_shift=12, min_line_coverage=0.6, mode='cell'):
+        self.image = image
+        self.max_shift = max_shift
+        self.min_line_coverage = min_line_coverage
+        self.mode = mode
+        self.horizontal_mask = None
+        self.vertical_mask = None
+        self.elapsed_ms = 0.0
+
+    def detect_lines(self):
+        """Build binary masks that only keep long horizontal and vertical strokes"""
+        start = time.perf_counter()
+        if len(self.image.shape) == 3:
+            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = self.image
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+
+        height, width = binary.shape
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 40, 10), 1))
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(height // 40, 10)))
+        self.horizontal_mask = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal_kernel)
+        self.vertical_mask = cv2.morphologyEx(binary, cv2.MORPH_OPEN, vertical_kernel)
+        self.elapsed_ms += (time.perf_counter() - start) * 1000
+
+    def find_line_positions(self, projection, length):
+        """Return the centre of every run of projection values covering enough of the box side"""
+        covered = projection >= self.min_line_coverage * 255 * length
+        positions = []
+        start = None
+        for index, is_line in enumerate(covered):
+            if is_line and start is None:
+                start = index
+            elif not is_line and start is not None:
+                positions.append((start, index - 1))
+                start = None
+        if start is not None:
+            positions.append((start, len(covered) - 1))
+        return positions
+
+    def find_cell(self, box, image_shape):
+        """
+        Borders (left, top, right, bottom) of the cell containing the centre of an (x, y, w, h)
+        box, searched within max_shift of each edge of the box, inside or outside it. A side
+        without a line is None. Returns None for a box outside the image.
+        """
+        x, y, w, h = box
+        img_height, img_width = image_shape[:2]
+        if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > img_width or y + h > img_height:
+            return None
+
+        margin = self.max_shift
+        top = max(y - margin, 0)
+        bottom = min(y + h + margin, img_height)
+        left = max(x - margin, 0)
+        right = min(x + w + margin, img_width)
+
+        # Project the line masks inside a window slightly larger than the box
+        row_projection = self.horizontal_mask[top:bottom, x:x + w].sum(axis=1, dtype=np.int64)
+        col_projection = self.vertical_mask[y:y + h, left:right].sum(axis=0, dtype=np.int64)
+        rows = [(top + a, top + b) for a, b in self.find_line_positions(row_projection, w)]
+        cols = [(left + a, left + b) for a, b in self.find_line_positions(col_projection, h)]
+
+        # A border is the outermost line within max_shift of the box edge: flat bottoms of a
+        # line of text can form a run as long as a ruling line, but only inside the cell
+        centre_y = y + h / 2
+        centre_x = x + w / 2
+        cell_top = min((end + 1 for start, end in rows if end < centre_y and end + 1 - y <= margin), default=None)
+        cell_bottom = max((start for start, end in rows if start > centre_y and y + h - start <= margin), default=None)
+        cell_left = min((end + 1 for start, end in cols if end < centre_x and end + 1 - x <= margin), default=None)
+        cell_right = max((start for start, end in cols if start > centre_x and x + w - start <= margin), default=None)
+        return cell_left, cell_top, cell_right, cell_bottom
+
+    def snap_box(self, box, image_shape):
+        """
+        Fit a single (x, y, w, h) box to the borders of the cell containing its centre. Each
+        side moves to the cell border found within max_shift, inwards or outwards, so text
+        clipped by a small shift or skew of the page is brought back inside the box.
+        """
+        cell = self.find_cell(box, image_shape)
+        if cell is None:
+            return box
+        x, y, w, h = box
+        new_left = x if cell[0] is None else cell[0]
+        new_top = y if cell[1] is None else cell[1]
+        new_right = x + w if cell[2] is None else cell[2]
+        new_bottom = y + h if cell[3] is None else cell[3]
+
+        # A box that would lose most of its area sits on a line rather than inside a cell
+        if new_bottom - new_top < h / 2 or new_right - new_left < w / 2:
+            return box
+
+        return (int(new_left), int(new_top), int(new_right - new_left), int(new_bottom - new_top))
+
+    def page_offset(self, field_boxes):
+        """
+        Median (dx, dy) between the boxes and the cells found around them. Only the axes on
+        which both borders of the cell were found are measured, from the cell centre.
+        """
+        dxs, dys = [], []
+        for x, y, w, h in field_boxes.values():
+            cell = self.find_cell((x, y, w, h), self.image.shape)
+            if cell is None:
+                continue
+            cell_left, cell_top, cell_right, cell_bottom = cell
+            if cell_left is not None and cell_right is not None:
+                dxs.append((cell_left + cell_right) / 2 - (x + w / 2))
+            if cell_top is not None and cell_bottom is not None:
+                dys.append((cell_top + cell_bottom) / 2 - (y + h / 2))
+        dx = int(round(np.median(dxs))) if dxs else 0
+        dy = int(round(np.median(dys))) if dys else 0
+        return dx, dy
+
+    def align_boxes(self, field_boxes):
+        """Return a new {field: box} dict aligned to the detected table structure"""
+        if self.horizontal_mask is None:
+            self.detect_lines()
+
+        start = time.perf_counter()
+        if self.mode == 'offset':
+            dx, dy = self.page_offset(field_boxes)
+            img_height, img_width = self.image.shape[:2]
+            snapped = {}
+            for field, (x, y, w, h) in field_boxes.items():
+                new_x = min(max(x + dx, 0), max(img_width - w, 0))
+                new_y = min(max(y + dy, 0), max(img_height - h, 0))
+                snapped[field] = (new_x, new_y, w, h)
+        else:
+            snapped = {field: self.snap_box(box, self.image.shape) for field, box in field_boxes.items()}
+
+        self.elapsed_ms += (time.perf_counter() - start) * 1000
+        return snapped
@@ -0,0 +1,80 @@
+def vertical_overlap(box, row):
+    """Share of the height of `box` inside the y range of `row`, both (x, y, w, h)"""
+    top = max(box[1], row[1])
+    bottom = min(box[1] + box[3], row[1] + row[3])
+    return max(bottom - top, 0) / max(box[3], 1)
+
+def union_box(boxes):
+    x0 = min(box[0] for box in boxes)
+    y0 = min(box[1] for box in boxes)
+    x1 = max(box[0] + box[2] for box in boxes)
+    y1 = max(box[1] + box[3] for box in boxes)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def plan_row_strips(field_boxes, min_overlap=0.6, max_gap_ratio=2.0):
+    """
+    Group the boxes of a format that sit on the same table row, to be read as one strip.
+
+    A box joins a row when at least `min_overlap` of its height lies within the row, so
+    a box spanning two lines of the table stays on its own. A row is cut where the
+    horizontal gap to the next box exceeds `max_gap_ratio` times the row height, so
+    unrelated text far along the line is not read with it.
+    Returns a list of field-name tuples, left to right, with at least two fields each.
+    """
+    rows = []
+    for field, box in sorted(field_boxes.items(), key=lambda item: item[1][1] + item[1][3] / 2):
+        for row in rows:
+            if vertical_overlap(box, union_box([field_boxes[name] for name in row])) >= min_overlap:
+                row.append(field)
+                break
+        else:
+            rows.append([field])
+
+    strips = []
+    for row in rows:
+        row.sort(key=lambda name: field_boxes[name][0])
+        height = union_box([field_boxes[name] for name in row])[3]
+        strip = [row[0]]
+        for previous, field in zip(row, row[1:]):
+            previous_end = field_boxes[previous][0] + field_boxes[previous][2]
+            gap = field_boxes[field][0] - previous_end
+            # Overlapping boxes could not be told apart by x, and a long gap is another table
+            if gap < 0 or gap > max_gap_ratio * height:
+                strips.append(strip)
+                strip = []
+            strip.append(field)
+        strips.append(strip)
+    return [tuple(strip) for strip in strips if len(strip) > 1]
+
+def split_strip_words(words, field_boxes, fields, origin_x, min_share=0.8):
+    """
+    Assign the words recognized in a strip (boxes relative to the strip, whose left edge
+    is at `origin_x` on the page) to the fields whose x range holds them.
+
+    Returns ({field: [words]}, unresolved fields). A field is unresolved when a word has
+    no box, or lies across its border (less than `min_share` of the word inside one field):
+    its text may be cut, so it should be read on its own crop.
+    """
+    assigned = {field: [] for field in fields}
+    unresolved = set()
+    for word in words:
+        if word.box is None:
+            return assigned, set(fields)
+        xs = [point[0] + origin_x for point in word.box]
+        left, right = min(xs), max(xs)
+        width = max(right - left, 1)
+        shares = {}
+        for field in fields:
+            x, _, w, _ = field_boxes[field]
+            inside = min(right, x + w) - max(left, x)
+            if inside > 0:
+                shares[field] = inside / width
+        if not shares:
+            # Text between the boxes (a ruling line, a label) belongs to no field
+            continue
+        field = max(shares, key=shares.get)
+        if shares[field] < min_share:
+            unresolved.update(shares)
+            continue
+        assigned[field].append(word)
+    return assigned, unresolved
@@ -0,0 +1,42 @@
+import time
+
+class DeadlineExceeded(Exception):
+    """Raised by Deadline.check when the time budget ran out before a stage could start"""
+
+    def __init__(self, stage, elapsed):
+        super().__init__(f"Time budget exceeded before {stage} ({elapsed:.1f} s elapsed)")
+        self.stage = stage
+        self.elapsed = elapsed
+
+class Deadline:
+    """
+    Time budget of one request, checked between pipeline stages and between fields.
+    A budget of None never expires.
+    """
+
+    def __init__(self, seconds=None):
+        self.budget = seconds
+        self.started_at = time.perf_counter()
+        self.expires_at = None if seconds is None else self.started_at + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float('inf')
+        return self.expires_at - time.perf_counter()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if there is no time left to start `stage`"""
+        if self.expired():
+            raise DeadlineExceeded(stage, self.elapsed())
+
+    def report(self):
+        return {
+            'budget_s': self.budget,
+            'elapsed_s': round(self.elapsed(), 3),
+        }
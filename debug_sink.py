@@ -0,0 +1,154 @@
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+import uuid
+import cv2
+
+class DebugRequest:
+    """
+    Artifacts collected for one page. Nothing is encoded or written until the sink
+    decides, at the end of the request, that the page is worth keeping.
+    """
+
+    def __init__(self, label, sampled):
+        self.label = label
+        self.sampled = sampled
+        self.created_at = time.time()
+        self.artifacts = []
+
+    def add_image(self, name, image):
+        """`image` may be an array or a zero-argument callable that renders it (run on the writer thread)"""
+        self.artifacts.append((name, image))
+
+    def add_json(self, name, data):
+        self.artifacts.append((name, data))
+
+class DebugArtifactSink:
+    """
+    Writes debug crops, box previews and results from a background thread into one
+    directory per request, for a sampled subset of pages, under a disk quota.
+
+    sample_rate: fraction of pages kept regardless of outcome (0 disables sampling)
+    keep_errors: also keep pages whose processing failed
+    low_confidence: also keep pages with a field confidence below this value
+    """
+
+    def __init__(self, root_dir='debug_artifacts', sample_rate=0.0, keep_errors=False, low_confidence=None,
+                 max_bytes=500 * 1024 * 1024, retention_seconds=7 * 24 * 3600, queue_size=32):
+        self.root_dir = root_dir
+        self.sample_rate = sample_rate
+        self.keep_errors = keep_errors
+        self.low_confidence = low_confidence
+        self.max_bytes = max_bytes
+        self.retention_seconds = retention_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.stats = {'requests_written': 0, 'requests_dropped': 0, 'directories_removed': 0}
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or self.keep_errors or self.low_confidence is not None
+
+    def start_request(self, label):
+        """Return a DebugRequest to collect artifacts into, or None when nothing could be kept"""
+        if not self.enabled:
+            return None
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return DebugRequest(label, sampled)
+
+    def finish(self, request, error=None, min_confidence=None):
+        """Decide whether to keep the page and hand it to the writer thread without blocking"""
+        if request is None:
+            return False
+        keep = request.sampled
+        keep = keep or (self.keep_errors and error is not None)
+        keep = keep or (self.low_confidence is not None and min_confidence is not None and min_confidence < self.low_confidence)
+        if not keep:
+            return False
+
+        self.ensure_writer()
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            # Debug output must never slow down extraction
+            self.stats['requests_dropped'] += 1
+            return False
+        return True
+
+    def ensure_writer(self):
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.write_loop, name="debug-sink", daemon=True)
+                self.writer.start()
+
+    def write_loop(self):
+        while True:
+            request = self.queue.get()
+            try:
+                if request is None:
+                    return
+                self.write_request(request)
+                self.enforce_quota()
+            except Exception as e:
+                print(f"Warning: Could not write debug artifacts: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write_request(self, request):
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(request.created_at))
+        safe_label = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in request.label)[:60]
+        directory = os.path.join(self.root_dir, f"{stamp}-{safe_label}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(directory, exist_ok=True)
+        for name, artifact in request.artifacts:
+            safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+            path = os.path.join(directory, safe_name)
+            if callable(artifact):
+                artifact = artifact()
+            if isinstance(artifact, (dict, list)):
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(artifact, f, ensure_ascii=False, indent=2)
+            elif artifact is not None and getattr(artifact, 'size', 0):
+                cv2.imwrite(path, artifact)
+        self.stats['requests_written'] += 1
+
+    def enforce_quota(self):
+        """Delete request directories past retention, then the oldest ones until under max_bytes"""
+        if not os.path.isdir(self.root_dir):
+            return
+        now = time.time()
+        directories = []
+        for entry in os.scandir(self.root_dir):
+            if not entry.is_dir():
+                continue
+            mtime = entry.stat().st_mtime
+            if now - mtime > self.retention_seconds:
+                self.remove_directory(entry.path)
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            directories.append((mtime, size, entry.path))
+
+        total = sum(size for _, size, _ in directories)
+        for mtime, size, path in sorted(directories):
+            if total <= self.max_bytes:
+                break
+            self.remove_directory(path)
+            total -= size
+
+    def remove_directory(self, path):
+        shutil.rmtree(path, ignore_errors=True)
+        self.stats['directories_removed'] += 1
+
+    def flush(self):
+        """Wait until every queued request is on disk"""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import cv2
+import numpy as np
+
+RECORD_DTYPE = np.dtype([('hash', '<u8'), ('offset', '<u8')])
+_BYTE_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+def perceptual_hash(image):
+    """
+    64-bit DCT hash of a warped page. Long ruling lines are removed first so the hash
+    follows the printed text, which differs between quittances of the same format.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    height, width = ink.shape
+    lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 20, 10), 1)))
+    lines |= cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(height // 20, 10))))
+    ink[lines > 0] = 0
+
+    small = cv2.resize(ink, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_frequencies = cv2.dct(small)[:8, :8].flatten()
+    bits = low_frequencies > np.median(low_frequencies[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+def popcount(values):
+    """Number of set bits of every uint64 in an array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _BYTE_POPCOUNT[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+class DuplicateIndex:
+    """
+    Persistent multi-index hash table of 64-bit page hashes.
+
+    The hash is split into `chunks` substrings. Two hashes within distance r agree to
+    within r // chunks bits on at least one substring, so a query only probes the buckets
+    near each of its substrings and verifies those candidates with a popcount. Every
+    substring table is a sorted numpy array searched with searchsorted, which keeps
+    millions of entries compact in memory. Recent additions sit in a small unsorted tail
+    that is scanned directly and merged into the tables once it grows.
+
+    On disk: `<path>.hashes` holds fixed-size (hash, offset) records and `<path>.jsonl`
+    the payload of each entry (e.g. the earlier extraction) at that offset.
+    """
+
+    def __init__(self, path, chunks=4, merge_every=4096):
+        self.path = path
+        self.chunks = chunks
+        self.chunk_bits = 64 // chunks
+        self.merge_every = merge_every
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        loaded = self.load_records()
+        # Growable buffer: `records` is a view of its first `count` rows
+        self.buffer = np.zeros(max(len(loaded) * 2, 1024), dtype=RECORD_DTYPE)
+        self.buffer[:len(loaded)] = loaded
+        self.count = len(loaded)
+        self.sorted_count = 0
+        self.tables = []
+        self.merge()
+
+    def load_records(self):
+        hashes_file = self.path + '.hashes'
+        if not os.path.exists(hashes_file):
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        size = os.path.getsize(hashes_file)
+        complete = size - size % RECORD_DTYPE.itemsize
+        if complete != size:
+            # A crash while appending left half a record: drop it
+            with open(hashes_file, 'r+b') as f:
+                f.truncate(complete)
+        return np.fromfile(hashes_file, dtype=RECORD_DTYPE)
+
+    @property
+    def records(self):
+        return self.buffer[:self.count]
+
+    def chunk_values(self, hashes, chunk):
+        mask = np.uint64((1 << self.chunk_bits) - 1)
+        return (hashes >> np.uint64(chunk * self.chunk_bits)) & mask
+
+    def merge(self):
+        """Rebuild the sorted substring tables so they cover every record"""
+        hashes = self.records['hash']
+        self.tables = []
+        for chunk in range(self.chunks):
+            values = self.chunk_values(hashes, chunk)
+            order = np.argsort(values, kind='stable')
+            self.tables.append((values[order], order))
+        self.sorted_count = len(self.records)
+
+    def neighbours(self, value, radius):
+        """Every chunk value within `radius` bits of `value`"""
+        values = [value]
+        for _ in range(radius):
+            values = {v ^ (1 << bit) for v in values for bit in range(self.chunk_bits)} | set(values)
+        return list(values)
+
+    def find(self, page_hash, max_distance=6, limit=5):
+        """Return up to `limit` (distance, entry_id) pairs within max_distance, closest first"""
+        query = np.uint64(page_hash)
+        radius = max_distance // self.chunks
+        with self.lock:
+            candidates = [np.arange(self.sorted_count, len(self.records))]
+            for chunk, (values, order) in enumerate(self.tables):
+                probes = np.array(self.neighbours(int(self.chunk_values(query, chunk)), radius), dtype=np.uint64)
+                starts = np.searchsorted(values, probes, side='left')
+                ends = np.searchsorted(values, probes, side='right')
+                for start, end in zip(starts, ends):
+                    if end > start:
+                        candidates.append(order[start:end])
+            candidates = np.unique(np.concatenate(candidates))
+            if not len(candidates):
+                return []
+            distances = popcount(self.records['hash'][candidates] ^ query)
+        close = distances <= max_distance
+        matches = sorted(zip(distances[close].tolist(), candidates[close].tolist()))
+        return matches[:limit]
+
+    def add(self, page_hash, payload):
+        """Store a hash and its payload; returns the entry id"""
+        with self.lock:
+            with open(self.path + '.jsonl', 'ab') as f:
+                offset = f.tell()
+                f.write((json.dumps(payload, ensure_ascii=False) + '\n').encode('utf-8'))
+            record = np.array([(page_hash, offset)], dtype=RECORD_DTYPE)
+            # Payload first, then the record, so a record never points at a missing payload
+            with open(self.path + '.hashes', 'ab') as f:
+                record.tofile(f)
+            if self.count == len(self.buffer):
+                grown = np.zeros(len(self.buffer) * 2, dtype=RECORD_DTYPE)
+                grown[:self.count] = self.buffer[:self.count]
+                self.buffer = grown
+            self.buffer[self.count] = record[0]
+            self.count += 1
+            # The unsorted tail is scanned on every query, so it may grow with the index
+            if self.count - self.sorted_count >= max(self.merge_every, self.count // 64):
+                self.merge()
+            return self.count - 1
+
+    def get(self, entry_id):
+        """Payload stored with an entry"""
+        offset = int(self.records['offset'][entry_id])
+        with open(self.path + '.jsonl', 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline().decode('utf-8'))
+
+    def __len__(self):
+        return self.count
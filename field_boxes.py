@@ -0,0 +1,112 @@
+"""
+Field box configurations of the quittance formats: for each format, the (x, y, w, h) box
+of every field on the warped page (see TableExtractor). Kept apart from QuittanceProcessor
+so the API can list the formats without importing OpenCV or building an OCR engine.
+"""
+
+# Width of the warped page the boxes were drawn on: TableExtractor's page for a 1275x1650 scan.
+# Pages of any other width get the boxes scaled by their width over this one.
+FIELD_BOXES_PAGE_WIDTH = 1477
+
+# Format configurations for different quittance types
+FIELD_BOXES_CONFIGS = {
+    'format_1': {  # Original format
+        'assurance': (193, 171, 331, 33),
+        'num_contrat': (203, 268, 112, 42),
+        "Periode d'assurance_date_debut": (268, 412, 112, 25),
+        "Periode d'assurance_date_fin": (480, 406, 117, 31),
+        'numero quittance': (575, 174, 126, 31),
+        'risque': (356, 266, 122, 31),
+        'prime': (588, 265, 89, 36),
+        'code': (693, 410, 84, 22),
+        'COUT DE CONTRAT': (748, 270, 93, 32),
+        'assure_nom et prenom': (701, 575, 222, 34),
+        'assure_adresse': (704, 609, 198, 52),
+        'assure_code postal': (699, 663, 78, 33),
+        'PER': (853, 407, 79, 30),
+        'taxe_taxe': (967, 267, 111, 29),
+        'taxe_fg': (991, 319, 93, 34),
+        'somme a payer': (1206, 405, 101, 48),
+        'total': (1197, 308, 109, 49),
+    },
+
+    'carte_assurances': {  # CARTE ASSURANCES format
+        'assurance': (109, 70, 130, 85),
+        'numero_quittance': (681, 234, 156, 31),
+        'agence': (278, 286, 62, 54),
+        'souscripteur': (277, 343, 339, 41),
+        'adresse': (269, 376, 272, 43),
+        'ville': (276, 412, 246, 36),
+        'assure': (272, 448, 335, 43),
+        'num_contrat': (263, 486, 149, 39),
+        'fractionnement': (677, 476, 152, 54),
+        'numero_aliment': (255, 522, 214, 37),
+        'date_effet_debut': (253, 556, 145, 46),
+        'date_effet_fin': (627, 549, 143, 54),
+        'prime_base': (96, 644, 125, 56),
+        'prime_annexe': (253, 636, 109, 61),
+        'frais': (388, 631, 92, 69),
+        'taxe_base': (498, 646, 112, 64),
+        'taxes_annexes': (626, 641, 132, 72),
+        'fpcsr': (760, 644, 91, 64),
+        'fpac': (855, 657, 91, 49),
+        'fga': (948, 656, 85, 62),
+        'prime_totale': (1040, 656, 121, 67),
+        'categorie_risque': (284, 706, 162, 45),
+        'immatriculation': (293, 754, 155, 29),
+        'marque': (284, 778, 167, 38),
+        'type_vehicule': (280, 811, 161, 49),
+        'date_emission': (1036, 958, 145, 49),  # Fixed: was 1385, now 958
+        'commission': (1028, 948, 155, 59),     # Fixed: was 1385, now 948
+    },
+
+    'format_3': {  # Third format (you can customize this)
+        # Add your third format field boxes here
+        'example_field': (100, 100, 200, 50),
+    },
+
+    'hp0012_custom': {  # HP0012 custom format
+        'assurance': (541, 188, 234, 35),
+        'numero_quittance': (789, 189, 153, 32),
+        'agence': (362, 263, 90, 28),
+        'souscripteur': (361, 314, 354, 27),
+        'adresse': (362, 353, 297, 19),
+        'ville': (468, 379, 145, 30),
+        'code_postal': (364, 386, 81, 25),
+        'assure': (364, 419, 351, 32),
+        'num_contrat': (361, 461, 141, 28),
+        'fractionnement': (784, 455, 154, 32),
+        'numero_aliment': (361, 495, 183, 30),
+        'date_effet_debut': (358, 528, 134, 35),
+        'date_effet_fin': (746, 526, 138, 37),
+        'prime_base': (194, 620, 125, 56),
+        'prime_annexe': (337, 623, 135, 51),
+        'frais': (494, 623, 100, 57),
+        'taxe_base': (608, 624, 122, 53),
+        'taxes_annexes': (736, 620, 146, 59),
+        'fpcsr': (885, 622, 91, 55),
+        'fpac': (980, 625, 87, 47),
+        'fga': (1077, 629, 76, 41),
+        'prime_totale': (1187, 621, 106, 56),
+        'categorie_risque': (382, 689, 168, 31),
+        'immatriculation': (382, 726, 136, 29),
+        'marque': (381, 763, 129, 30),
+        'type_vehicule': (380, 798, 150, 35),
+        'date_emission': (1089, 733, 150, 44),
+    }
+}
+
+def resolve_fields(format_name, requested, configs=FIELD_BOXES_CONFIGS):
+    """
+    Map requested names to the box fields of a format. A name is either a box field
+    ('num_contrat') or the prefix of a group of them ('taxe' -> taxe_taxe, taxe_fg).
+    Raises ValueError for a name that matches no field.
+    """
+    field_boxes = configs[format_name]
+    resolved = []
+    for name in requested:
+        matches = [name] if name in field_boxes else [field for field in field_boxes if field.startswith(name + '_')]
+        if not matches:
+            raise ValueError(f"Unknown field '{name}' for format {format_name}. Available fields: {list(field_boxes.keys())}")
+        resolved.extend(field for field in matches if field not in resolved)
+    return resolved
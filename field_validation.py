@@ -0,0 +1,191 @@
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+# Characters PaddleOCR commonly reads in place of digits inside amounts
+DIGIT_CONFUSIONS = str.maketrans({'O': '0', 'o': '0', 'Q': '0', 'l': '1', 'I': '1', '|': '1', 'S': '5'})
+AMOUNT_TOLERANCE = Decimal('0.005')
+
+def parse_amount(text):
+    """
+    Parse a dinar amount such as "8,002D", "1 250,000 DT" or "1.250,000" into a Decimal.
+    A single separator is read as the decimal point (amounts carry millimes); when both
+    are present the last one is. Returns None when the text is not an amount.
+    Letters commonly misread for digits are only corrected when real digits make up at
+    least half of the number, so words such as "SO" or "Oil" are not taken for amounts.
+    """
+    if not text:
+        return None
+    value = re.sub(r'\s*(?:TND|DT|D)\s*\.?$', '', text.strip(), flags=re.IGNORECASE).replace(' ', '')
+    digits = sum(c.isdigit() for c in value)
+    confusions = sum(ord(c) in DIGIT_CONFUSIONS for c in value)
+    if digits == 0 or confusions > digits:
+        return None
+    value = value.translate(DIGIT_CONFUSIONS)
+    if not re.fullmatch(r'\d+(?:[.,]\d+)*', value):
+        return None
+
+    separators = [c for c in value if c in '.,']
+    if not separators:
+        number = value
+    elif len(separators) == 1:
+        number = value.replace(',', '.')
+    else:
+        decimal_separator = separators[-1]
+        integer_part, _, decimal_part = value.rpartition(decimal_separator)
+        if decimal_separator in integer_part:
+            # "1.234.567": every separator is a thousands separator
+            integer_part, decimal_part = value, ''
+        number = re.sub(r'[.,]', '', integer_part) + ('.' + decimal_part if decimal_part else '')
+    try:
+        return Decimal(number)
+    except InvalidOperation:
+        return None
+
+def parse_date(text):
+    """Parse "08/06/2024", "8-6-24" or "08.06.2024" (day first) into a date, or None"""
+    if not text:
+        return None
+    match = re.search(r'(\d{1,2})\s*[/.-]\s*(\d{1,2})\s*[/.-]\s*(\d{2,4})', text.translate(DIGIT_CONFUSIONS))
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def digits_distance(a, b):
+    """Edit distance between the digit sequences of two strings"""
+    a = re.sub(r'\D', '', a)
+    b = re.sub(r'\D', '', b)
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class FieldValidator:
+    """
+    Parse amount and date fields into typed values and check the cross-field rules of a
+    format, e.g. that the premium columns add up to prime_totale or that the period
+    starts before it ends.
+
+    Every failure is narrowed down to the fewest fields that could explain it, so the
+    caller only re-reads those. Rules are dicts:
+        {'type': 'sum', 'terms': [...], 'total': field}
+        {'type': 'date_order', 'before': field, 'after': field}
+    """
+
+    PARSERS = {'amount': parse_amount, 'date': parse_date}
+
+    def __init__(self, field_formats, rules):
+        self.field_formats = field_formats
+        self.rules = rules
+
+    def parse_fields(self, data):
+        """Return ({field: typed value or None}, [unparseable fields]) for the typed fields present in data"""
+        values = {}
+        unparseable = []
+        for field, text in data.items():
+            parser = self.PARSERS.get(self.field_formats.get(field))
+            if parser is None:
+                continue
+            values[field] = parser(text)
+            if values[field] is None and text:
+                unparseable.append(field)
+        return values, unparseable
+
+    def check_sum(self, rule, values, data, confidences):
+        fields = rule['terms'] + [rule['total']]
+        missing = [field for field in fields if values.get(field) is None]
+        if missing:
+            return {'rule': 'sum', 'total': rule['total'], 'status': 'incomplete', 'suspects': missing}
+
+        computed = sum(values[field] for field in rule['terms'])
+        difference = values[rule['total']] - computed
+        check = {
+            'rule': 'sum',
+            'total': rule['total'],
+            'computed': float(computed),
+            'read': float(values[rule['total']]),
+        }
+        if abs(difference) <= AMOUNT_TOLERANCE:
+            check.update(status='passed', suspects=[])
+            return check
+
+        # Any single field can balance the sum; prefer the one whose implied value is a
+        # one-character misread of what was printed, then the least confident read
+        candidates = []
+        for field in fields:
+            implied = values[field] + difference if field != rule['total'] else computed
+            if implied < 0:
+                continue
+            distance = digits_distance(data.get(field, ''), f"{implied:.3f}")
+            candidates.append((distance > 1, confidences.get(field, 0.0), field))
+        candidates.sort()
+        check.update(status='failed', difference=float(difference), suspects=[field for _, _, field in candidates[:1]])
+        return check
+
+    def check_date_order(self, rule, values, confidences):
+        before, after = rule['before'], rule['after']
+        missing = [field for field in (before, after) if values.get(field) is None]
+        if missing:
+            return {'rule': 'date_order', 'fields': [before, after], 'status': 'incomplete', 'suspects': missing}
+        if values[before] < values[after]:
+            return {'rule': 'date_order', 'fields': [before, after], 'status': 'passed', 'suspects': []}
+        suspect = min((before, after), key=lambda field: confidences.get(field, 0.0))
+        return {'rule': 'date_order', 'fields': [before, after], 'status': 'failed', 'suspects': [suspect]}
+
+    def validate(self, data, confidences=None):
+        """
+        Validate the raw field texts of one page.
+        Returns status ('valid', 'incomplete' or 'invalid'), the typed values, every check,
+        and the suspect fields ordered by how cheaply re-reading them could fix the page.
+        """
+        confidences = confidences or {}
+        values, unparseable = self.parse_fields(data)
+        checks = []
+        for rule in self.rules:
+            if rule['type'] == 'sum':
+                checks.append(self.check_sum(rule, values, data, confidences))
+            elif rule['type'] == 'date_order':
+                checks.append(self.check_date_order(rule, values, confidences))
+
+        suspects = list(unparseable)
+        for status in ('failed', 'incomplete'):
+            for check in checks:
+                if check['status'] == status:
+                    suspects.extend(field for field in check['suspects'] if field not in suspects)
+
+        if unparseable or any(check['status'] == 'failed' for check in checks):
+            status = 'invalid'
+        elif any(check['status'] == 'incomplete' for check in checks):
+            status = 'incomplete'
+        else:
+            status = 'valid'
+
+        return {
+            'status': status,
+            'values': {field: self.serialize(value) for field, value in values.items()},
+            'unparseable': unparseable,
+            'checks': checks,
+            'suspects': suspects,
+        }
+
+    def serialize(self, value):
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def score(self, report):
+        """Lower is better: used to decide whether a re-read improved the page"""
+        failed = sum(1 for check in report['checks'] if check['status'] == 'failed')
+        incomplete = sum(1 for check in report['checks'] if check['status'] == 'incomplete')
+        return (failed + len(report['unparseable']), incomplete)
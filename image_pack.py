@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Image Pack
+Stores many quittance images in one file: the encoded images back to back, then an index
+with the offset, length, SHA-256, format and original name of each. Reading a pack is one
+open and one mmap; every image is decoded straight from a slice of the mapping, so bulk
+reprocessing is not slowed down by opening thousands of small files.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+# Set before numpy/cv2 load, as in quittance_processor
+from thread_budget import ThreadBudget
+ThreadBudget.from_env().set_thread_env()
+import cv2
+import numpy as np
+
+from page_source import MULTI_PAGE_EXTENSIONS, count_pages, iter_pages, read_image
+
+PACK_MAGIC = b'QPACK\x00\x01\x00'
+# magic, index offset, index length
+PACK_HEADER = struct.Struct('<8sQQ')
+PACK_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.pdf']
+
+class ImagePack:
+    """
+    Read-only view of a pack. Entries are dicts with name, offset, length, sha256,
+    format (None if unknown) and page_index (None for single-page files).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_length = PACK_HEADER.unpack_from(self.mapping, 0)
+        if magic != PACK_MAGIC:
+            self.close()
+            raise ValueError(f"Not an image pack: {path}")
+        index = json.loads(self.mapping[index_offset:index_offset + index_length].decode('utf-8'))
+        self.entries = index['entries']
+        self.created_at = index.get('created_at')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def encoded(self, entry):
+        """The encoded bytes of an entry as a uint8 array over the mapping (no copy)"""
+        if self.mapping is None:
+            raise ValueError(f"Image pack is closed: {self.path}")
+        return np.frombuffer(self.mapping, dtype=np.uint8, count=entry['length'], offset=entry['offset'])
+
+    def decode(self, entry):
+        """Decode an entry to a BGR image"""
+        image = cv2.imdecode(self.encoded(entry), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode {entry['name']} from {self.path}")
+        return image
+
+    def decode_scaled(self, entry, target_height=None):
+        """Decode an entry at reduced resolution if it is large (see page_source.read_image)"""
+        return read_image(data=self.encoded(entry), target_height=target_height)
+
+    def close(self):
+        """
+        Release the pack. Arrays returned by encoded() are views of the mapping: while one
+        of them is alive the mapping cannot be closed, so it is unmapped when the last view
+        is freed instead, and the views stay valid until then.
+        """
+        if self.mapping is not None:
+            try:
+                self.mapping.close()
+            except BufferError:
+                pass
+            self.mapping = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def list_source_files(source_dir, extensions=PACK_EXTENSIONS):
+    """Image files under a directory, recursively, as paths relative to it"""
+    names = []
+    for root, _, filenames in os.walk(source_dir):
+        for filename in filenames:
+            if not filename.startswith('.') and filename.lower().endswith(tuple(extensions)):
+                names.append(os.path.relpath(os.path.join(root, filename), source_dir))
+    return sorted(names)
+
+def build_pack(source_dir, pack_path, format_name=None, formats=None, dpi=None):
+    """
+    Write every image under source_dir to a pack. Single images are stored as they are
+    (no re-encoding); pages of TIFF/PDF documents are rasterized and stored as PNG.
+    `format_name` sets the format of every entry, `formats` maps a SHA-256 to the format
+    detected earlier (see formats_from_results). Identical files are stored once.
+    Returns the number of entries.
+    """
+    formats = formats or {}
+    entries = []
+    stored = {}
+    temp_path = pack_path + '.tmp'
+    directory = os.path.dirname(pack_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(temp_path, 'wb') as pack:
+        pack.write(PACK_HEADER.pack(PACK_MAGIC, 0, 0))
+        for name in list_source_files(source_dir):
+            path = os.path.join(source_dir, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            file_sha256 = hashlib.sha256(data).hexdigest()
+            extension = os.path.splitext(name)[1].lower()
+            if extension == '.pdf' or (extension in MULTI_PAGE_EXTENSIONS and count_pages(path) > 1):
+                blobs = [(page_index, cv2.imencode('.png', page)[1].tobytes()) for page_index, page in iter_pages(path, dpi=dpi)]
+            else:
+                blobs = [(None, data)]
+
+            for page_index, blob in blobs:
+                sha256 = hashlib.sha256(blob).hexdigest()
+                if sha256 not in stored:
+                    stored[sha256] = (pack.tell(), len(blob))
+                    pack.write(blob)
+                offset, length = stored[sha256]
+                entries.append({
+                    'name': name,
+                    'page_index': page_index,
+                    'offset': offset,
+                    'length': length,
+                    'sha256': file_sha256,
+                    'format': format_name or formats.get(file_sha256),
+                })
+
+        index = json.dumps({'version': 1, 'created_at': time.time(), 'entries': entries}, ensure_ascii=False).encode('utf-8')
+        index_offset = pack.tell()
+        pack.write(index)
+        pack.seek(0)
+        pack.write(PACK_HEADER.pack(PACK_MAGIC, index_offset, len(index)))
+    os.replace(temp_path, pack_path)
+    return len(entries)
+
+def formats_from_results(results_db):
+    """SHA-256 -> most recently detected format, from the results store"""
+    from results_store import ResultsStore
+    store = ResultsStore(results_db)
+    with store.lock:
+        rows = store.connection.execute(
+            "SELECT file_hash, format FROM results WHERE file_hash IS NOT NULL AND format IS NOT NULL "
+            "AND status = 'success' ORDER BY id").fetchall()
+    store.close()
+    return {file_hash: format_name for file_hash, format_name in rows}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, inspect or reprocess packs of quittance images")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help=build_pack.__doc__.strip().splitlines()[0])
+    build_parser.add_argument('source_dir')
+    build_parser.add_argument('pack')
+    build_parser.add_argument('--format', default=None, help="Format of every image")
+    build_parser.add_argument('--formats-from', default=None, metavar='RESULTS_DB',
+                              help="Take the format detected earlier for each file from a results store")
+
+    info_parser = subparsers.add_parser('info', help="List the entries of a pack")
+    info_parser.add_argument('pack')
+
+    process_parser = subparsers.add_parser('process', help="Extract every image of a pack into the results store")
+    process_parser.add_argument('pack')
+    process_parser.add_argument('--format', default=None, help="Override the format of every entry")
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        start = time.perf_counter()
+        formats = formats_from_results(args.formats_from) if args.formats_from else None
+        count = build_pack(args.source_dir, args.pack, args.format, formats)
+        print(f"Packed {count} image(s) into {args.pack} ({os.path.getsize(args.pack) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f} s")
+    elif args.command == 'info':
+        with ImagePack(args.pack) as pack:
+            for entry in pack.entries:
+                page = '' if entry['page_index'] is None else f" p{entry['page_index']}"
+                print(f"{entry['name']}{page}  {entry['length']} B  {entry['format'] or '-'}  {entry['sha256'][:12]}")
+            print(f"{len(pack)} entries")
+    else:
+        from quittance_processor import QuittanceProcessor
+        QuittanceProcessor().process_pack(args.pack, args.format)
+
+if __name__ == "__main__":
+    main()
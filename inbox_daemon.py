@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Inbox Watch Daemon
+Watches an inbox directory, processes every new or changed quittance file once with a
+warm QuittanceProcessor, moves it to done/failed and appends the results to a JSONL file.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+class InboxDaemon:
+    def __init__(self, inbox_dir='./inbox', output_file='inbox_results.jsonl',
+                 manifest_file=None, poll_interval=2.0, settle_time=2.0, processor=None):
+        self.inbox_dir = inbox_dir
+        self.done_dir = os.path.join(inbox_dir, 'done')
+        self.failed_dir = os.path.join(inbox_dir, 'failed')
+        self.output_file = output_file
+        self.manifest_file = manifest_file or os.path.join(inbox_dir, '.manifest.jsonl')
+        self.poll_interval = poll_interval
+        # A file must keep the same size and mtime for this long before it is considered fully written
+        self.settle_time = settle_time
+        self.processor = processor
+        self.pending = {}
+        self.running = False
+
+        for directory in (self.inbox_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        """
+        Load the manifest of already handled files, keyed by content hash. The manifest is a
+        log of JSON lines, one per handled file; the last line for a hash wins. A line cut
+        short by a crash is skipped, and the log is rewritten without stale lines on startup.
+        """
+        manifest = {}
+        lines = 0
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        manifest[entry.pop('sha256')] = entry
+                    except (ValueError, KeyError, AttributeError):
+                        print(f"Warning: Skipping unreadable line {lines} of manifest {self.manifest_file}")
+        # Compacting also drops a torn last line, so the next append starts on a fresh line
+        if lines > len(manifest):
+            self.save_manifest(manifest)
+        return manifest
+
+    def save_manifest(self, manifest):
+        """Rewrite the whole manifest atomically, one line per file"""
+        temp_file = self.manifest_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for file_hash, entry in manifest.items():
+                f.write(json.dumps(dict(entry, sha256=file_hash), ensure_ascii=False) + '\n')
+        os.replace(temp_file, self.manifest_file)
+
+    def record(self, file_hash, entry):
+        """Append one handled file to the manifest, flushed to disk before the file is moved"""
+        self.manifest[file_hash] = entry
+        with open(self.manifest_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(entry, sha256=file_hash), ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def get_processor(self):
+        """Build the processor once so the OCR engine stays warm between files"""
+        if self.processor is None:
+            from quittance_processor import QuittanceProcessor
+            self.processor = QuittanceProcessor()
+        return self.processor
+
+    def hash_file(self, path):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def is_supported(self, filename):
+        extensions = self.get_processor().IMAGE_EXTENSIONS
+        return not filename.startswith('.') and any(filename.lower().endswith(ext) for ext in extensions)
+
+    def find_ready_files(self):
+        """Return inbox files whose size and mtime have been stable for settle_time seconds"""
+        now = time.time()
+        ready = []
+        seen = set()
+        for filename in sorted(os.listdir(self.inbox_dir)):
+            path = os.path.join(self.inbox_dir, filename)
+            if not os.path.isfile(path) or not self.is_supported(filename):
+                continue
+            seen.add(path)
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self.pending.get(path)
+            if previous is None or previous[0] != signature:
+                self.pending[path] = (signature, now)
+                continue
+            if now - previous[1] >= self.settle_time and now - stat.st_mtime >= self.settle_time:
+                ready.append((path, stat))
+
+        # Forget files that disappeared before they settled
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        return ready
+
+    def move_to(self, path, directory, file_hash):
+        """Move a handled file out of the inbox without overwriting an earlier one of the same name"""
+        filename = os.path.basename(path)
+        destination = os.path.join(directory, filename)
+        if os.path.exists(destination):
+            name, extension = os.path.splitext(filename)
+            destination = os.path.join(directory, f"{name}_{file_hash[:12]}{extension}")
+        shutil.move(path, destination)
+        return destination
+
+    def append_results(self, results):
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def handle_file(self, path, stat):
+        """Process one settled file, or just move it if the manifest says it was already handled"""
+        self.pending.pop(path, None)
+        file_hash = self.hash_file(path)
+        entry = self.manifest.get(file_hash)
+
+        if entry and entry.get('status') == 'done':
+            # Processed before a restart (or a duplicate upload): do not redo the OCR
+            print(f"Already done: {os.path.basename(path)} (sha256 {file_hash[:12]})")
+            self.move_to(path, self.done_dir, file_hash)
+            return 'done'
+
+        print(f"Processing inbox file: {path}")
+        start = time.perf_counter()
+        try:
+            results = []
+            for result in self.get_processor().process_document(path):
+                result['source_sha256'] = file_hash
+                results.append(result)
+            status = 'failed' if not results or all('error' in result for result in results) else 'done'
+            error = None
+        except Exception as e:
+            results = []
+            status = 'failed'
+            error = str(e)
+            print(f"Error processing {path}: {e}")
+
+        self.append_results(results)
+        entry = {
+            'path': os.path.basename(path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'status': status,
+            'pages': len(results),
+            'processed_at': time.time(),
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        if error:
+            entry['error'] = error
+        self.record(file_hash, entry)
+        self.move_to(path, self.done_dir if status == 'done' else self.failed_dir, file_hash)
+        print(f"{status.upper()}: {os.path.basename(path)} ({len(results)} page(s))")
+        return status
+
+    def run_once(self):
+        """Scan the inbox once and process every file that is ready"""
+        handled = 0
+        for path, stat in self.find_ready_files():
+            self.handle_file(path, stat)
+            handled += 1
+        return handled
+
+    def run(self):
+        """Poll the inbox until interrupted"""
+        self.get_processor()
+        self.running = True
+        print(f"Watching {os.path.abspath(self.inbox_dir)} (Ctrl+C to stop)")
+        try:
+            while self.running:
+                if not self.run_once():
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping inbox daemon")
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch an inbox directory and extract every quittance dropped into it")
+    parser.add_argument('--inbox', default='./inbox')
+    parser.add_argument('--output', default='inbox_results.jsonl')
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--settle-time', type=float, default=2.0)
+    args = parser.parse_args()
+
+    daemon = InboxDaemon(args.inbox, args.output, poll_interval=args.poll_interval, settle_time=args.settle_time)
+    daemon.run()
+
+if __name__ == "__main__":
+    main()
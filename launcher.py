@@ -22,7 +22,8 @@ def print_menu():
     print("5. Visualize existing box configuration")
     print("6. Run original box picker")
     print("7. Run original OCR extractor")
-    print("8. Exit")
+    print("8. Watch inbox directory (daemon mode)")
+    print("9. Exit")
     print()
 
 def check_images():
@@ -34,7 +35,7 @@ def check_images():
     
     image_files = []
     for filename in os.listdir(image_dir):
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.tiff', '.bmp')):
+        if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.pdf')):
             image_files.append(filename)
     
     if not image_files:
@@ -114,10 +115,11 @@ def run_single_quittance():
                 image_path = os.path.join(processor.IMAGE_DIR, selected_image)
                 
                 print(f"🔄 Processing: {selected_image}")
-                fields = processor.process_single_image(image_path)
+                for fields in processor.process_document(image_path):
+                    page = f" (page {fields['page_index']})" if 'page_index' in fields else ""
+                    print(f"Detected format{page}: {fields.get('detected_format', 'Unknown')}")
                 
                 print("✅ Processing complete!")
-                print(f"Detected format: {fields.get('detected_format', 'Unknown')}")
                 return True
             else:
                 print("❌ Invalid image selection")
@@ -223,6 +225,22 @@ def run_original_ocr_extractor():
         print(f"❌ Error running original OCR extractor: {e}")
         return False
 
+def run_inbox_daemon():
+    """Watch ./inbox and process new files as they arrive"""
+    try:
+        from inbox_daemon import InboxDaemon
+        
+        daemon = InboxDaemon()
+        daemon.run()
+        return True
+        
+    except ImportError as e:
+        print(f"❌ Error importing inbox_daemon: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Error running inbox daemon: {e}")
+        return False
+
 def main():
     print_banner()
     
@@ -233,7 +251,7 @@ def main():
     
     while True:
         print_menu()
-        choice = input("Select operation (1-8): ").strip()
+        choice = input("Select operation (1-9): ").strip()
         
         if choice == "1":
             print("\n" + "="*40)
@@ -271,11 +289,16 @@ def main():
             print("="*40 + "\n")
             
         elif choice == "8":
+            print("\n" + "="*40)
+            run_inbox_daemon()
+            print("="*40 + "\n")
+            
+        elif choice == "9":
             print("👋 Goodbye!")
             break
             
         else:
-            print("❌ Invalid choice. Please select 1-8.")
+            print("❌ Invalid choice. Please select 1-9.")
             print()
 
 if __name__ == "__main__":
@@ -1,24 +1,141 @@
+import time
+
+# Startup timings are logged so import regressions show up in the service logs
+_module_start = time.perf_counter()
+
+# BLAS/OpenMP size their pools when numpy loads, so the thread budget is set first
+from thread_budget import ThreadBudget
+ThreadBudget.from_env().set_thread_env()
+
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import numpy as np
-import cv2
-import cloudinary
-import cloudinary.uploader
+from fastapi.concurrency import run_in_threadpool
 import os
-from dotenv import load_dotenv
+import threading
 
-# Load environment variables
-load_dotenv()
+# Heavy modules (cloudinary, paddleocr via quittance_processor) are imported lazily so the
+# HTTP server can bind immediately; the OCR engine is loaded and warmed up in the background.
+engine_state = {
+    'status': 'starting',
+    'error': None,
+    'timings': {},
+}
+_engine_ready = threading.Event()
+_processor = None
+_cloudinary_configured = False
+_results_store = None
+# The OCR engine is not thread-safe, so pages are extracted one at a time. The lock is
+# only ever taken on worker threads (run_in_threadpool/run_in_executor), never on the event loop
+_processor_lock = threading.Lock()
 
-# === CONFIGURATION CLOUDINARY ===
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
+# Seconds a request may spend before returning a partial result; kept under the
+# 60 s timeout of the calling backend so the answer still reaches it
+DEFAULT_TIME_BUDGET = float(os.getenv('API_TIME_BUDGET_SECONDS', '50'))
+
+# Every extraction is kept in the results store (RESULTS_DB) so it can be looked up later
+STORE_RESULTS = os.getenv('API_STORE_RESULTS', '1') == '1'
+MAX_QUERY_LIMIT = 1000
+MAX_EXPORT_PAGE = 5000
+
+# Queue mode: this process loads no OCR engine; uploads are enqueued for `python work_queue.py
+# worker` processes (any number on this machine, sharing RESULTS_DB) and fetched with GET /jobs/{job_id}
+QUEUE_MODE = os.getenv('API_QUEUE_MODE', '0') == '1'
+_work_queue = None
+
+def log_timing(name, seconds):
+    engine_state['timings'][name] = round(seconds, 3)
+    print(f"[startup] {name}: {seconds:.3f} s")
+
+def load_environment():
+    """Load .env variables (cheap, but kept out of module import)"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def get_cloudinary_uploader():
+    """Import and configure cloudinary on first upload"""
+    global _cloudinary_configured
+    import cloudinary
+    import cloudinary.uploader
+    
+    if not _cloudinary_configured:
+        # === CONFIGURATION CLOUDINARY ===
+        cloudinary.config(
+            cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+            api_key=os.getenv('CLOUDINARY_API_KEY'),
+            api_secret=os.getenv('CLOUDINARY_API_SECRET')
+        )
+        _cloudinary_configured = True
+    return cloudinary.uploader
+
+def get_results_store():
+    """Open the SQLite results store on first use (independent of the OCR engine)"""
+    global _results_store
+    if _results_store is None:
+        from results_store import ResultsStore
+        _results_store = ResultsStore()
+    return _results_store
+
+def get_work_queue():
+    """Open the durable work queue on first use"""
+    global _work_queue
+    if _work_queue is None:
+        from work_queue import WorkQueue
+        _work_queue = WorkQueue(visibility_timeout=float(os.getenv('QUEUE_VISIBILITY_TIMEOUT', '120')),
+                                max_attempts=int(os.getenv('QUEUE_MAX_ATTEMPTS', '3')))
+    return _work_queue
+
+def check_queued_fields(format_name, requested):
+    """
+    Reject field names a queue worker could not resolve, before the job is queued: for the format
+    when it is known, otherwise names that match no single format. Raises HTTPException 400.
+    """
+    from field_boxes import FIELD_BOXES_CONFIGS, resolve_fields
+    if format_name and format_name not in FIELD_BOXES_CONFIGS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format_name}")
+    errors = []
+    for name in [format_name] if format_name else list(FIELD_BOXES_CONFIGS):
+        try:
+            resolve_fields(name, requested)
+            return
+        except ValueError as e:
+            errors.append(str(e))
+    raise HTTPException(status_code=400, detail=errors[0] if format_name else
+                        f"Fields {requested} do not all belong to one format; pass format_name")
 
-from quittance_processor import QuittanceProcessor
+def load_engine():
+    """Import the processor, build the OCR engine and run a warmup inference"""
+    global _processor
+    try:
+        engine_state['status'] = 'loading'
+        start = time.perf_counter()
+        from quittance_processor import QuittanceProcessor
+        log_timing('import_quittance_processor', time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        processor = QuittanceProcessor()
+        log_timing('engine_init', time.perf_counter() - start)
+        
+        log_timing('engine_warmup', processor.warm_up())
+        _processor = processor
+        engine_state['status'] = 'ready'
+    except Exception as e:
+        engine_state['status'] = 'failed'
+        engine_state['error'] = str(e)
+        print(f"[startup] Engine failed to load: {e}")
+    finally:
+        _engine_ready.set()
+
+def get_processor(timeout=0):
+    """
+    Return the warm processor. Callers on the event loop keep the default timeout of 0 and
+    answer 503 while the engine is loading, instead of blocking the server.
+    """
+    if not _engine_ready.wait(timeout):
+        raise HTTPException(status_code=503, detail="OCR engine is still loading")
+    if _processor is None:
+        raise HTTPException(status_code=503, detail=f"OCR engine failed to load: {engine_state['error']}")
+    return _processor
 
 app = FastAPI(
     title="Quittance OCR Extractor",
@@ -35,11 +152,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def start_engine_warmup():
+    load_environment()
+    log_timing('module_import', time.perf_counter() - _module_start)
+    if QUEUE_MODE:
+        engine_state['status'] = 'ready'
+        return
+    threading.Thread(target=load_engine, name="ocr-warmup", daemon=True).start()
+
 @app.post("/extract_quittance/")
 async def extract_quittance(
     file: UploadFile = File(...),
     company_name: str = Form(None),  # Company name for format detection
-    format_name: str = Form(None)    # Optional manual format override
+    format_name: str = Form(None),   # Optional manual format override
+    time_budget: float = Form(None), # Optional time budget in seconds (default API_TIME_BUDGET_SECONDS)
+    fields: str = Form(None)         # Optional comma-separated subset, e.g. "numero_quittance,num_contrat,prime_totale"
 ):
     """
     Extract quittance data from uploaded image.
@@ -47,6 +175,9 @@ async def extract_quittance(
     Returns only the extracted data and Cloudinary URL.
     Your existing backend can consume this and save to your database.
     """
+    # The budget starts when the request arrives, so the upload counts against it too
+    from deadline import Deadline
+    deadline = Deadline(time_budget or DEFAULT_TIME_BUDGET)
     try:
         # Validate file type
         if not file.content_type.startswith('image/'):
@@ -55,59 +186,173 @@ async def extract_quittance(
         # Read file content
         contents = await file.read()
         
-        # Upload to Cloudinary first
-        result = cloudinary.uploader.upload(contents, resource_type="image")
+        # Manual format first, else mapped from the company name
+        detected_format = format_name or (map_company_to_format(company_name) if company_name else None)
+        requested_fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+        if QUEUE_MODE and requested_fields:
+            # The worker resolves them much later: a typo must fail this request, not the job
+            check_queued_fields(detected_format, requested_fields)
+        
+        # Upload to Cloudinary first (a blocking client, so off the event loop)
+        result = await run_in_threadpool(get_cloudinary_uploader().upload, contents, resource_type="image")
         image_url = result['secure_url']
         public_id = result.get('public_id')
         
-        # Process image directly from memory
-        import tempfile
+        if QUEUE_MODE:
+            # A worker extracts it; the client polls GET /jobs/{job_id}
+            job_id = await run_in_threadpool(
+                get_work_queue().enqueue,
+                contents, file.filename, format_name=detected_format, fields=requested_fields,
+                time_budget=time_budget or DEFAULT_TIME_BUDGET,
+                cloudinary_url=image_url, cloudinary_public_id=public_id)
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued",
+                                                          "cloudinary_url": image_url, "cloudinary_public_id": public_id})
         
-        # Create a temporary file that auto-deletes
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(contents)
-            temp_path = temp_file.name
+        # Use the warm processor loaded at startup
+        processor = get_processor()
         
-        try:
-            # Initialize the smart processor
-            processor = QuittanceProcessor()
-            
-            # Determine format to use
-            detected_format = None
-            if format_name:
-                # Use manual format if provided
-                detected_format = format_name
-            elif company_name:
-                # Map company name to format
-                detected_format = map_company_to_format(company_name)
-            
-            # Process with OCR using smart processor
-            fields = processor.process_single_image(temp_path, detected_format)
-            
-            # Extract the actual data (remove metadata)
-            extracted_data = {k: v for k, v in fields.items() 
-                            if k not in ['source_file', 'detected_format']}
-            
-        finally:
-            # Always clean up the temporary file
-            if os.path.exists(temp_path):
+        # Only the requested boxes are cropped and read
+        if requested_fields and detected_format in processor.FIELD_BOXES_CONFIGS:
+            try:
+                processor.resolve_fields(detected_format, requested_fields)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        def extract():
+            # Runs on a worker thread: waiting for the lock or the OCR never blocks the event loop
+            import tempfile
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+                temp_file.write(contents)
+                temp_path = temp_file.name
+            try:
+                with _processor_lock:
+                    page = processor.process_single_image(temp_path, detected_format, deadline=deadline, fields=requested_fields)
+                return page, store_result(page, file.filename, contents, image_url)
+            finally:
+                # Always clean up the temporary file
                 os.unlink(temp_path)
         
-        return {
-            "cloudinary_url": image_url,
-            "cloudinary_public_id": public_id,
-            "extracted_data": extracted_data,
-            "format_used": fields.get('detected_format', 'auto_detected'),
-            "status": "success",
-            "message": "Quittance processed successfully"
-        }
+        fields, result_id = await run_in_threadpool(extract)
+        return build_response(fields, image_url, public_id, result_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing quittance: {str(e)}"
         )
 
+def store_result(fields, filename, contents, image_url):
+    """Keep the extraction in the results store; returns its id (None when storing is off)"""
+    if not STORE_RESULTS:
+        return None
+    from results_store import file_hash
+    stored = dict(fields, source_file=filename, cloudinary_url=image_url)
+    return get_results_store().add(stored, file_hash(contents=contents))
+
+def build_response(fields, image_url, public_id, result_id):
+    """Response body of an extraction: the data without the processor metadata, and the metadata"""
+    # Extract the actual data (remove metadata)
+    extracted_data = {k: v for k, v in fields.items() 
+                    if k not in ['source_file', 'detected_format', 'field_confidence', 'ocr_metrics', 'validation',
+                                 'partial', 'unfinished_fields', 'stopped_before', 'deadline']}
+    return {
+        "cloudinary_url": image_url,
+        "cloudinary_public_id": public_id,
+        "extracted_data": extracted_data,
+        "format_used": fields.get('detected_format', 'auto_detected'),
+        "field_confidence": fields.get('field_confidence', {}),
+        "ocr_metrics": fields.get('ocr_metrics', {}),
+        "validation": fields.get('validation', {}),
+        "partial": fields.get('partial', False),
+        "unfinished_fields": fields.get('unfinished_fields', []),
+        "deadline": fields.get('deadline', {}),
+        "result_id": result_id,
+        "status": "partial" if fields.get('partial') else "success",
+        "message": "Time budget exhausted, partial result returned" if fields.get('partial') else "Quittance processed successfully"
+    }
+
+def sse_event(event, data):
+    """One Server-Sent Event"""
+    import json
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/extract_quittance/stream")
+async def extract_quittance_stream(
+    file: UploadFile = File(...),
+    company_name: str = Form(None),
+    format_name: str = Form(None),
+    time_budget: float = Form(None),
+    fields: str = Form(None)
+):
+    """
+    Same extraction as /extract_quittance/, streamed as Server-Sent Events while the page
+    is read: `format` once the format is known, `field` for every field as soon as it is
+    read (again with "reread": true if validation replaces it), then `result` with the
+    body /extract_quittance/ would return, or `error`. The Cloudinary upload runs
+    alongside the OCR instead of before it.
+    """
+    import asyncio
+    import tempfile
+    from fastapi.responses import StreamingResponse
+    from deadline import Deadline
+    
+    deadline = Deadline(time_budget or DEFAULT_TIME_BUDGET)
+    if QUEUE_MODE:
+        raise HTTPException(status_code=400, detail="Streaming needs the OCR engine in this process; poll GET /jobs/{job_id} in queue mode")
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    processor = get_processor()
+    detected_format = format_name or (map_company_to_format(company_name) if company_name else None)
+    requested_fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+    if requested_fields and detected_format in processor.FIELD_BOXES_CONFIGS:
+        try:
+            processor.resolve_fields(detected_format, requested_fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    contents = await file.read()
+    
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    
+    def on_progress(event, data):
+        # Called on the OCR thread
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+    
+    def extract():
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+            temp_file.write(contents)
+            temp_path = temp_file.name
+        try:
+            with _processor_lock:
+                return processor.process_single_image(temp_path, detected_format, deadline=deadline,
+                                                      fields=requested_fields, on_progress=on_progress)
+        finally:
+            os.unlink(temp_path)
+    
+    upload = loop.run_in_executor(None, lambda: get_cloudinary_uploader().upload(contents, resource_type="image"))
+    extraction = loop.run_in_executor(None, extract)
+    extraction.add_done_callback(lambda _: events.put_nowait(None))
+    
+    async def stream():
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            yield sse_event(*item)
+        try:
+            result = extraction.result()
+            uploaded = await upload
+            result_id = await loop.run_in_executor(None, store_result, result, file.filename, contents, uploaded['secure_url'])
+            yield sse_event('result', build_response(result, uploaded['secure_url'], uploaded.get('public_id'), result_id))
+        except Exception as e:
+            yield sse_event('error', {'detail': f"Error processing quittance: {str(e)}"})
+    
+    # No proxy buffering, or the events would only arrive together at the end
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 from company_mappings import get_format_for_company
 
 def map_company_to_format(company_name):
@@ -116,17 +361,104 @@ def map_company_to_format(company_name):
     """
     return get_format_for_company(company_name)
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Status of a queued extraction: queued, leased (being extracted), done or dead (failed
+    QUEUE_MAX_ATTEMPTS times). Once done, the body also holds the /extract_quittance/
+    response. With `wait`, the request waits up to that many seconds for the job to finish.
+    """
+    import asyncio
+    queue = get_work_queue()
+    give_up_at = time.monotonic() + min(max(wait, 0), 60)
+    while True:
+        # SQLite read under the queue lock: off the event loop
+        job = await run_in_threadpool(queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+        if job['status'] in ('done', 'dead') or time.monotonic() >= give_up_at:
+            break
+        await asyncio.sleep(0.25)
+    
+    body = {key: job[key] for key in ('job_id', 'status', 'attempts', 'last_error', 'created_at', 'finished_at')}
+    if job['result'] is not None:
+        options = job['options']
+        body.update(build_response(job['result'], options.get('cloudinary_url'), options.get('cloudinary_public_id'), job['result_id']))
+        body['status'] = job['status']
+    return body
+
+@app.get("/results")
+def query_results(
+    numero_quittance: str = None,
+    num_contrat: str = None,
+    file_hash: str = None,
+    format: str = None,
+    since: float = None,   # Unix time, inclusive
+    until: float = None,   # Unix time, exclusive
+    after_id: int = 0,
+    after_time: float = None,
+    limit: int = 100
+):
+    """
+    Look stored results up by quittance number, contract number, source file hash
+    (SHA-256), format and processing time. Pass `next_after_id` back as `after_id`, and
+    with since/until also `next_after_time` as `after_time`, for the next page.
+    """
+    results = get_results_store().query(
+        after_id=after_id, limit=max(1, min(limit, MAX_QUERY_LIMIT)), since=since, until=until, after_time=after_time,
+        numero_quittance=numero_quittance, num_contrat=num_contrat, file_hash=file_hash, format=format)
+    return {
+        "results": results,
+        "next_after_id": results[-1]['_store']['id'] if results else None,
+        "next_after_time": results[-1]['_store']['processed_at'] if results else None,
+    }
+
+@app.get("/results/export")
+def export_results(format: str = None, since: float = None, until: float = None, after_id: int = 0,
+                   after_time: float = None, limit: int = MAX_EXPORT_PAGE):
+    """
+    Export stored results as JSON lines, one page at a time. The id and processing time
+    of the last row are returned in the X-Next-After-Id and X-Next-After-Time headers
+    (pass the time back as `after_time` with since/until); an empty page means the export is complete.
+    """
+    import json
+    from fastapi.responses import Response
+    results = get_results_store().query(
+        after_id=after_id, limit=max(1, min(limit, MAX_EXPORT_PAGE)), since=since, until=until,
+        after_time=after_time, format=format)
+    body = ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results)
+    headers = {
+        "X-Next-After-Id": str(results[-1]['_store']['id']),
+        "X-Next-After-Time": repr(results[-1]['_store']['processed_at']),
+    } if results else {}
+    return Response(content=body, media_type="application/x-ndjson", headers=headers)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness endpoint: the HTTP server is up (the engine may still be loading)"""
     return {"status": "healthy", "message": "Quittance OCR Extractor is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 only once the OCR engine is loaded and warmed up"""
+    body = {
+        "status": engine_state['status'],
+        "timings": engine_state['timings'],
+    }
+    if engine_state['error']:
+        body["error"] = engine_state['error']
+    return JSONResponse(status_code=200 if engine_state['status'] == 'ready' else 503, content=body)
+
 @app.get("/formats")
 async def get_available_formats():
-    """Get list of available quittance formats"""
-    processor = QuittanceProcessor()
+    """
+    Get list of available quittance formats. They come from the box configurations, so
+    this also answers in queue mode (no engine in this process) and while the engine loads.
+    """
+    from field_boxes import FIELD_BOXES_CONFIGS
+    configs = _processor.FIELD_BOXES_CONFIGS if _processor is not None else FIELD_BOXES_CONFIGS
     return {
-        "available_formats": list(processor.FIELD_BOXES_CONFIGS.keys()),
+        "available_formats": list(configs.keys()),
         "default_format": "format_1"
     }
 
@@ -140,6 +472,7 @@ async def get_company_mappings():
     }
 
 if __name__ == "__main__":
+    load_environment()
     import uvicorn
     port = int(os.getenv('PORT', 8001))
     uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
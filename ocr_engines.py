@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import threading
+import queue
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# One recognized word (or line). `box` is the detected quadrilateral, None for recognition-only calls
+OcrWord = namedtuple('OcrWord', ['text', 'confidence', 'box'])
+
+class OcrEngine:
+    """
+    What the extraction pipeline needs from an OCR engine. Every method returns plain
+    Python values, so callers never depend on the nested result layout of a library.
+    """
+
+    def recognize(self, image, det=True, cls=False):
+        """Return the words of an image as OcrWords; with det=False the image is read as one line"""
+        raise NotImplementedError
+
+    def recognize_batch(self, crops):
+        """Recognize single-line crops in as few calls as possible; one OcrWord per crop, in order"""
+        results = []
+        for crop in crops:
+            words = self.recognize(crop, det=False)
+            results.append(words[0] if words else OcrWord('', 0.0, None))
+        return results
+
+    def classify_orientation(self, image):
+        """Return (label, confidence) of the angle classifier for a text line, label '0' or '180'"""
+        raise NotImplementedError
+
+class PaddleEngine(OcrEngine):
+    """OcrEngine backed by a PaddleOCR instance, built from PaddleOCR options"""
+
+    def __init__(self, **options):
+        from paddleocr import PaddleOCR
+        from onnx_models import apply_onnx_threads
+        self.options = options
+        self.ocr = PaddleOCR(**options)
+        apply_onnx_threads(self.ocr, options)
+
+    def recognize(self, image, det=True, cls=False):
+        result = self.ocr.ocr(image, det=det, cls=cls)
+        words = []
+        if not result:
+            return words
+        for line in result:
+            if not line:
+                continue
+            for word_info in line:
+                if isinstance(word_info[1], (list, tuple)):
+                    box, (text, confidence) = [[float(v) for v in point] for point in word_info[0]], word_info[1]
+                else:
+                    box, (text, confidence) = None, word_info
+                if text and text.strip():
+                    words.append(OcrWord(text.strip(), float(confidence), box))
+        return words
+
+    def recognize_batch(self, crops):
+        if not crops:
+            return []
+        recognizer = getattr(self.ocr, 'text_recognizer', None)
+        if recognizer is None:
+            return super().recognize_batch(crops)
+        # The recognizer batches internally (rec_batch_num), skipping the det/cls stages entirely
+        results, _ = recognizer(list(crops))
+        return [OcrWord(text.strip(), float(confidence), None) for text, confidence in results]
+
+    def classify_orientation(self, image):
+        result = self.ocr.ocr(image, det=False, rec=False, cls=True)
+        if not result or not result[0]:
+            return None, 0.0
+        label, confidence = result[0][0]
+        return str(label), float(confidence)
+
+class RecordReplayEngine(OcrEngine):
+    """
+    Serve OCR results saved earlier, keyed by a hash of the crop pixels and the call.
+
+    mode='record' forwards every call to `engine` and saves its result and latency;
+    mode='replay' needs no model at all, so the rest of the pipeline can be load-tested
+    and profiled deterministically. With replay_latency=True each hit sleeps for the
+    recorded inference time, to reproduce realistic timings without the model.
+    """
+
+    def __init__(self, path, engine=None, mode='replay', replay_latency=False):
+        if mode == 'record' and engine is None:
+            raise ValueError("Recording needs an engine to forward calls to")
+        self.path = path
+        self.engine = engine
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.lock = threading.Lock()
+        # replayed_ms: recorded inference time of every result served, i.e. the model time saved
+        self.stats = {'hits': 0, 'misses': 0, 'recorded': 0, 'replayed_ms': 0.0}
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        elif mode == 'replay':
+            raise FileNotFoundError(f"No OCR recording at {path}")
+
+    def key(self, kind, image, *flags):
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+        digest.update(repr((image.shape, image.dtype.str, flags)).encode())
+        return f"{kind}:{digest.hexdigest()}"
+
+    def lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            self.stats['hits' if entry else 'misses'] += 1
+            if entry:
+                self.stats['replayed_ms'] += entry['ms']
+        if entry and self.replay_latency:
+            time.sleep(entry['ms'] / 1000)
+        return entry
+
+    def store(self, key, result, ms):
+        with self.lock:
+            self.entries[key] = {'result': result, 'ms': round(ms, 3)}
+            self.stats['recorded'] += 1
+
+    def recognize(self, image, det=True, cls=False):
+        key = self.key('recognize', image, det, cls)
+        if self.mode == 'record':
+            start = time.perf_counter()
+            words = self.engine.recognize(image, det=det, cls=cls)
+            self.store(key, [list(word) for word in words], (time.perf_counter() - start) * 1000)
+            return words
+        entry = self.lookup(key)
+        return [OcrWord(*word) for word in entry['result']] if entry else []
+
+    def recognize_batch(self, crops):
+        # Stored per crop under the recognition-only key, so batched and single calls share entries
+        keys = [self.key('recognize', crop, False, False) for crop in crops]
+        if self.mode == 'record':
+            start = time.perf_counter()
+            words = self.engine.recognize_batch(crops)
+            ms = (time.perf_counter() - start) * 1000 / max(len(crops), 1)
+            for key, word in zip(keys, words):
+                self.store(key, [list(word)], ms)
+            return words
+        results = []
+        for key in keys:
+            entry = self.lookup(key)
+            results.append(OcrWord(*entry['result'][0]) if entry and entry['result'] else OcrWord('', 0.0, None))
+        return results
+
+    def classify_orientation(self, image):
+        key = self.key('classify', image)
+        if self.mode == 'record':
+            start = time.perf_counter()
+            label, confidence = self.engine.classify_orientation(image)
+            self.store(key, [label, confidence], (time.perf_counter() - start) * 1000)
+            return label, confidence
+        entry = self.lookup(key)
+        return tuple(entry['result']) if entry else (None, 0.0)
+
+    def save(self):
+        """Write the recording atomically"""
+        with self.lock:
+            temp_file = self.path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(temp_file, self.path)
+
+def create_ocr_engine(engine='paddle', recording=None, **options):
+    """
+    Build the OCR engine selected by configuration: 'paddle', 'record' (paddle, saving
+    every result to `recording`) or 'replay' (results from `recording`, no model loaded).
+    """
+    if engine == 'paddle':
+        return PaddleEngine(**options)
+    if engine == 'record':
+        return RecordReplayEngine(recording, PaddleEngine(**options), mode='record')
+    if engine == 'replay':
+        return RecordReplayEngine(recording, mode='replay')
+    raise ValueError(f"Unknown OCR engine: {engine}. Available engines: ['paddle', 'record', 'replay']")
+
+class OcrEnginePool:
+    """
+    Fixed-size pool of OCR engines built with the same options.
+    Engines are created lazily and handed out one caller at a time, since a
+    PaddleOCR instance is not safe to use from several threads at once.
+    """
+
+    def __init__(self, size=1, **options):
+        self.size = size
+        self.options = options
+        self.available = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def create_engine(self):
+        return PaddleEngine(**self.options)
+
+    def acquire(self, timeout=None):
+        """Take an engine from the pool, building a new one while under the size limit"""
+        try:
+            return self.available.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                build = True
+            else:
+                build = False
+        if build:
+            try:
+                return self.create_engine()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        return self.available.get(timeout=timeout)
+
+    def release(self, engine):
+        """Give an engine back to the pool"""
+        self.available.put(engine)
+
+    @contextmanager
+    def engine(self, timeout=None):
+        """Context manager around acquire/release"""
+        engine = self.acquire(timeout)
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_engine_pool(size=1, **options):
+    """Return the process-wide pool for these PaddleOCR options, creating it on first use"""
+    key = tuple(sorted(options.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = OcrEnginePool(size=size, **options)
+            _pools[key] = pool
+        return pool
@@ -2,7 +2,7 @@ import os
 import json
 import cv2
 from TableExtractor import TableExtractor
-from paddleocr import PaddleOCR
+from ocr_engines import PaddleEngine
 
 IMAGE_DIR = './images'
 OUTPUT_FILE = 'extracted_quittances.json'
@@ -77,23 +77,16 @@ def extract_field_from_box(image, box, ocr, field):
     crop = image[y:y+h, x:x+w]
     cv2.imwrite(f"debug_crop_{field}.jpg", crop)
     print(f"Cropping field at ({x}, {y}, {w}, {h}), crop shape: {crop.shape}")
-    result = ocr.ocr(crop, cls=True)
-    text = ''
-    if not result:
+    words = ocr.recognize(crop, cls=True)
+    if not words:
         print(f"No OCR result for field at ({x}, {y}, {w}, {h})")
-        return text
-    for line in result:
-        if not line:
-            continue
-        for word_info in line:
-            text += word_info[1][0] + ' '
-    return text.strip()
+    return ' '.join(word.text for word in words)
 
 def extract_all_fields(image, field_boxes=None):
     if field_boxes is None:
         field_boxes = FIELD_BOXES
     
-    ocr = PaddleOCR(use_angle_cls=True, lang='fr')
+    ocr = PaddleEngine(use_angle_cls=True, lang='fr')
     data = {}
     for field, box in field_boxes.items():
         data[field] = extract_field_from_box(image, box, ocr, field)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+ONNX Models for the OCR Engine
+Exports the PaddleOCR det/rec/cls inference models to ONNX, quantizes the recognizer
+to int8 and builds the PaddleOCR options that run them with ONNX Runtime on CPU.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+
+ONNX_MODEL_DIR = './models/onnx'
+ONNX_MODEL_FILES = {'det': 'det.onnx', 'rec': 'rec.onnx', 'cls': 'cls.onnx'}
+INT8_RECOGNIZER_FILE = 'rec_int8.onnx'
+OCR_BACKENDS = ['paddle', 'onnx', 'onnx_int8']
+
+# Where PaddleOCR downloads its inference models; the French recognizer is the latin one
+PADDLE_MODEL_PATTERNS = {
+    'det': '~/.paddleocr/whl/det/*/*_det_infer',
+    'rec': '~/.paddleocr/whl/rec/latin/*_rec_infer',
+    'cls': '~/.paddleocr/whl/cls/*_cls_infer',
+}
+
+def backend_options(backend='paddle', model_dir=ONNX_MODEL_DIR):
+    """
+    Extra PaddleOCR options for a backend: nothing for 'paddle', local ONNX files for
+    'onnx', and the same with the int8 recognizer for 'onnx_int8'.
+    """
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {backend}. Available backends: {OCR_BACKENDS}")
+    if backend == 'paddle':
+        return {}
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        raise ImportError(f"The '{backend}' OCR backend requires onnxruntime (pip install -r requirements-onnx.txt)")
+
+    files = dict(ONNX_MODEL_FILES)
+    if backend == 'onnx_int8':
+        files['rec'] = INT8_RECOGNIZER_FILE
+    paths = {stage: os.path.join(model_dir, filename) for stage, filename in files.items()}
+    missing = [path for path in paths.values() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(
+            f"Missing ONNX model(s): {missing}. Run `python onnx_models.py export` "
+            f"(and `python onnx_models.py quantize` for onnx_int8) first."
+        )
+    return {
+        'use_onnx': True,
+        'det_model_dir': paths['det'],
+        'rec_model_dir': paths['rec'],
+        'cls_model_dir': paths['cls'],
+    }
+
+def onnx_session(model_path, threads=None):
+    """ONNX Runtime CPU session limited to `threads` intra-op threads (by default it uses every core)"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+def apply_onnx_threads(paddle_ocr, options):
+    """
+    PaddleOCR builds its ONNX sessions without session options, so `cpu_threads` never
+    reaches ONNX Runtime. Rebuild the det/rec/cls sessions of a PaddleOCR instance with
+    intra_op_num_threads = cpu_threads. Does nothing for the Paddle backend.
+    """
+    threads = options.get('cpu_threads')
+    if not options.get('use_onnx') or not threads:
+        return
+    for attribute, model_option in (('text_detector', 'det_model_dir'),
+                                    ('text_recognizer', 'rec_model_dir'),
+                                    ('text_classifier', 'cls_model_dir')):
+        predictor = getattr(paddle_ocr, attribute, None)
+        if predictor is None:
+            continue
+        session = onnx_session(options[model_option], threads)
+        predictor.predictor = session
+        predictor.input_tensor = session.get_inputs()[0]
+
+def find_paddle_model(stage):
+    """Locate a downloaded Paddle inference model directory for det, rec or cls"""
+    matches = sorted(glob.glob(os.path.expanduser(PADDLE_MODEL_PATTERNS[stage])))
+    if not matches:
+        raise FileNotFoundError(f"No Paddle {stage} model found in {PADDLE_MODEL_PATTERNS[stage]}; "
+                                f"run the processor once to download it or pass --{stage}-dir")
+    return matches[-1]
+
+def export_models(model_dirs, output_dir=ONNX_MODEL_DIR, opset_version=11):
+    """Convert the Paddle inference models to ONNX with the paddle2onnx CLI"""
+    if shutil.which('paddle2onnx') is None:
+        raise FileNotFoundError("Export requires the paddle2onnx CLI (pip install -r requirements-onnx.txt)")
+    os.makedirs(output_dir, exist_ok=True)
+    for stage, filename in ONNX_MODEL_FILES.items():
+        source = model_dirs.get(stage) or find_paddle_model(stage)
+        destination = os.path.join(output_dir, filename)
+        print(f"Exporting {stage}: {source} -> {destination}")
+        subprocess.run([
+            'paddle2onnx',
+            '--model_dir', source,
+            '--model_filename', 'inference.pdmodel',
+            '--params_filename', 'inference.pdiparams',
+            '--save_file', destination,
+            '--opset_version', str(opset_version),
+            '--enable_onnx_checker', 'True',
+        ], check=True)
+
+def quantize_recognizer(model_dir=ONNX_MODEL_DIR):
+    """Write an int8 copy of the recognizer with dynamic quantization (no calibration data needed)"""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise ImportError("int8 quantization requires onnxruntime (pip install -r requirements-onnx.txt)")
+
+    source = os.path.join(model_dir, ONNX_MODEL_FILES['rec'])
+    destination = os.path.join(model_dir, INT8_RECOGNIZER_FILE)
+    # The CPU ConvInteger kernel only takes unsigned 8-bit weights
+    quantize_dynamic(source, destination, weight_type=QuantType.QUInt8)
+    print(f"Quantized recognizer: {os.path.getsize(source) / 1e6:.1f} MB -> {os.path.getsize(destination) / 1e6:.1f} MB")
+    return destination
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare ONNX models for the 'onnx' and 'onnx_int8' OCR backends")
+    parser.add_argument('--model-dir', default=ONNX_MODEL_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help=export_models.__doc__)
+    for stage in ONNX_MODEL_FILES:
+        export_parser.add_argument(f'--{stage}-dir', default=None, help=f"Paddle {stage} inference model directory")
+    export_parser.add_argument('--opset', type=int, default=11)
+
+    subparsers.add_parser('quantize', help=quantize_recognizer.__doc__)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_models({'det': args.det_dir, 'rec': args.rec_dir, 'cls': args.cls_dir}, args.model_dir, args.opset)
+    else:
+        quantize_recognizer(args.model_dir)
+
+if __name__ == "__main__":
+    main()
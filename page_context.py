@@ -0,0 +1,22 @@
+class PageContext:
+    """
+    State of the extraction of one page: its OCR counters and the debug request collecting
+    its crops. It is passed down the calls explicitly, so pages processed at the same time
+    by one QuittanceProcessor (API threads, batch pipeline) never share it.
+    """
+
+    def __init__(self, debug_request=None):
+        self.debug_request = debug_request
+        self.ocr_stats = {'fields': 0, 'escalated': 0, 'calls': 0}
+
+    def count(self, key, amount=1):
+        self.ocr_stats[key] += amount
+
+    def add_image(self, name, image):
+        """Keep an image for the debug sink, only if this page is being collected"""
+        if self.debug_request is not None:
+            self.debug_request.add_image(name, image)
+
+    def add_json(self, name, data):
+        if self.debug_request is not None:
+            self.debug_request.add_json(name, data)
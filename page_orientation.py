@@ -0,0 +1,54 @@
+import time
+import cv2
+
+def find_text_line_samples(image, max_samples=5):
+    """Return a few wide text-line crops of the page, widest first"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 3))
+    merged = cv2.dilate(binary, kernel, iterations=1)
+    contours = cv2.findContours(merged, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)[0]
+
+    page_width = image.shape[1]
+    candidates = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # Keep shapes that look like a single line of text, not table borders or noise
+        if not (12 <= h <= 80 and 3 * h <= w <= 0.6 * page_width):
+            continue
+        ink_ratio = cv2.countNonZero(binary[y:y + h, x:x + w]) / float(w * h)
+        if 0.08 <= ink_ratio <= 0.6:
+            candidates.append((x, y, w, h))
+    candidates.sort(key=lambda box: box[2], reverse=True)
+
+    samples = []
+    for x, y, w, h in candidates[:max_samples]:
+        samples.append(image[y:y + h, x:x + w])
+    return samples
+
+def detect_page_orientation(ocr, image, max_samples=5, min_confidence=0.9):
+    """
+    Decide once per page whether it is upside down.
+    Runs only the angle classifier of the OCR engine on a handful of text lines
+    and returns 180 when a confident majority of them is flipped, 0 otherwise.
+    """
+    flipped_votes = 0
+    upright_votes = 0
+    for sample in find_text_line_samples(image, max_samples):
+        label, confidence = ocr.classify_orientation(sample)
+        if label is None or confidence < min_confidence:
+            continue
+        if str(label) == '180':
+            flipped_votes += 1
+        else:
+            upright_votes += 1
+    return 180 if flipped_votes > upright_votes else 0
+
+def correct_page_orientation(ocr, image, max_samples=5):
+    """Rotate the page upright if needed; returns (image, angle, elapsed_ms)"""
+    start = time.perf_counter()
+    angle = detect_page_orientation(ocr, image, max_samples)
+    if angle == 180:
+        image = cv2.rotate(image, cv2.ROTATE_180)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return image, angle, elapsed_ms
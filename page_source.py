@@ -0,0 +1,127 @@
+import io
+import os
+import cv2
+import numpy as np
+
+MULTI_PAGE_EXTENSIONS = ['.tif', '.tiff', '.pdf']
+
+# Width in pixels of the scans the field box configurations were drawn on (8.5 in at 150 dpi)
+REFERENCE_PAGE_WIDTH = 1275
+
+# Decode flags by reduction factor. JPEG is scaled inside the decoder (fewer DCT
+# coefficients), other formats are decoded and then resized by OpenCV
+REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def image_size(path=None, data=None):
+    """(width, height) from the image header, without decoding the pixels; None if unreadable"""
+    from PIL import Image
+
+    try:
+        with Image.open(path if data is None else io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+def decode_reduction(size, target_height):
+    """
+    Largest reduction factor (1, 2, 4 or 8) that keeps the long side of the image at
+    `target_height` pixels or more. The long side is used so landscape photos of a
+    portrait page, or files rotated by their EXIF tag, are reduced alike.
+    """
+    if not target_height or size is None:
+        return 1
+    for factor in (8, 4, 2):
+        if max(size) / factor >= target_height:
+            return factor
+    return 1
+
+def read_image(path=None, data=None, target_height=None):
+    """
+    Decode an image file (or its bytes) at the coarsest reduction that keeps its long
+    side at `target_height` pixels or more. Returns (BGR image, scale of the decoded
+    image relative to the full-resolution one).
+    """
+    size = image_size(path, data) if target_height else None
+    factor = decode_reduction(size, target_height)
+    if data is None:
+        image = cv2.imread(path, REDUCED_COLOR_FLAGS[factor])
+    else:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_COLOR_FLAGS[factor])
+    if image is None:
+        raise ValueError(f"Could not read image: {path or 'image bytes'}")
+    if factor == 1:
+        return image, 1.0
+    return image, max(image.shape[:2]) / max(size)
+
+def iter_pages(path, dpi=None):
+    """
+    Yield (page_index, BGR image) for every page of a file, one page at a time.
+    Multi-page TIFFs and PDFs are decoded lazily so a 200-page batch never sits in memory at once.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        yield from iter_pdf_pages(path, dpi)
+    elif extension in ('.tif', '.tiff'):
+        yield from iter_tiff_pages(path)
+    else:
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"Could not read image: {path}")
+        yield 0, image
+
+def iter_tiff_pages(path):
+    """Seek through the frames of a (multi-page) TIFF without loading the others"""
+    from PIL import Image
+
+    with Image.open(path) as tiff:
+        for page_index in range(getattr(tiff, 'n_frames', 1)):
+            tiff.seek(page_index)
+            page = np.asarray(tiff.convert('RGB'))
+            yield page_index, cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+
+def iter_pdf_pages(path, dpi=None):
+    """
+    Rasterize a PDF locally, one page at a time. Without a DPI, every page is rendered
+    REFERENCE_PAGE_WIDTH pixels wide so it lines up with the field box configurations
+    whatever the page size or the resolution it was scanned at.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ImportError("PDF ingestion requires pypdfium2 (pip install pypdfium2)")
+
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for page_index in range(len(pdf)):
+            page = pdf[page_index]
+            scale = dpi / 72 if dpi else REFERENCE_PAGE_WIDTH / page.get_width()
+            bitmap = page.render(scale=scale)
+            try:
+                image = np.asarray(bitmap.to_pil().convert('RGB'))
+                yield page_index, cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            finally:
+                bitmap.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def count_pages(path):
+    """Number of pages in a file without rasterizing any of them"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if extension in ('.tif', '.tiff'):
+        from PIL import Image
+        with Image.open(path) as tiff:
+            return getattr(tiff, 'n_frames', 1)
+    return 1
@@ -1,105 +1,188 @@
 import os
-import json
+import re
+import threading
+import time
+# BLAS/OpenMP size their pools when numpy/cv2 load, so the thread budget goes first
+from thread_budget import ThreadBudget
+ThreadBudget.from_env().set_thread_env()
 import cv2
 import numpy as np
 from TableExtractor import TableExtractor
-from paddleocr import PaddleOCR
+from box_aligner import BoxAligner
+from page_orientation import correct_page_orientation
+from page_source import MULTI_PAGE_EXTENSIONS, iter_pages, count_pages, read_image
+from debug_sink import DebugArtifactSink
+from field_boxes import FIELD_BOXES_CONFIGS, FIELD_BOXES_PAGE_WIDTH, resolve_fields
+from page_context import PageContext
+from field_validation import FieldValidator
+from batch_pipeline import BatchPipeline
+from onnx_models import ONNX_MODEL_DIR, backend_options
+from ocr_engines import create_ocr_engine
+from deadline import Deadline, DeadlineExceeded
+from duplicate_index import DuplicateIndex, perceptual_hash
+from results_store import RESULTS_DB, ResultsStore, file_hash
+from image_pack import ImagePack
+from crop_planner import plan_row_strips, split_strip_words, union_box
+
+# Placeholder for boxes that were not requested, removed from the output by prune_skipped
+SKIPPED_FIELD = object()
+
+def prune_skipped(output):
+    pruned = {}
+    for key, value in output.items():
+        if isinstance(value, dict):
+            value = prune_skipped(value)
+            if value:
+                pruned[key] = value
+        elif value is not SKIPPED_FIELD:
+            pruned[key] = value
+    return pruned
 
 class QuittanceProcessor:
     def __init__(self):
+        # Threads for Paddle, OpenCV and BLAS/OpenMP, shared out between OCR_WORKERS processes
+        # (OCR_THREADS_PER_WORKER, OCR_PIN_CPUS); applied before the engine is built
+        self.thread_budget = ThreadBudget.from_env()
+        print(f"Thread budget: {self.thread_budget.apply()}")
         self.IMAGE_DIR = './images'
-        self.OUTPUT_FILE = 'extracted_quittances.json'
-        self.IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']
-        
-        # Format configurations for different quittance types
-        self.FIELD_BOXES_CONFIGS = {
-            'format_1': {  # Original format
-                'assurance': (193, 171, 331, 33),
-                'num_contrat': (203, 268, 112, 42),
-                "Periode d'assurance_date_debut": (268, 412, 112, 25),
-                "Periode d'assurance_date_fin": (480, 406, 117, 31),
-                'numero quittance': (575, 174, 126, 31),
-                'risque': (356, 266, 122, 31),
-                'prime': (588, 265, 89, 36),
-                'code': (693, 410, 84, 22),
-                'COUT DE CONTRAT': (748, 270, 93, 32),
-                'assure_nom et prenom': (701, 575, 222, 34),
-                'assure_adresse': (704, 609, 198, 52),
-                'assure_code postal': (699, 663, 78, 33),
-                'PER': (853, 407, 79, 30),
-                'taxe_taxe': (967, 267, 111, 29),
-                'taxe_fg': (991, 319, 93, 34),
-                'somme a payer': (1206, 405, 101, 48),
-                'total': (1197, 308, 109, 49),
-            },
-            
-            'carte_assurances': {  # CARTE ASSURANCES format
-                'assurance': (109, 70, 130, 85),
-                'numero_quittance': (681, 234, 156, 31),
-                'agence': (278, 286, 62, 54),
-                'souscripteur': (277, 343, 339, 41),
-                'adresse': (269, 376, 272, 43),
-                'ville': (276, 412, 246, 36),
-                'assure': (272, 448, 335, 43),
-                'num_contrat': (263, 486, 149, 39),
-                'fractionnement': (677, 476, 152, 54),
-                'numero_aliment': (255, 522, 214, 37),
-                'date_effet_debut': (253, 556, 145, 46),
-                'date_effet_fin': (627, 549, 143, 54),
-                'prime_base': (96, 644, 125, 56),
-                'prime_annexe': (253, 636, 109, 61),
-                'frais': (388, 631, 92, 69),
-                'taxe_base': (498, 646, 112, 64),
-                'taxes_annexes': (626, 641, 132, 72),
-                'fpcsr': (760, 644, 91, 64),
-                'fpac': (855, 657, 91, 49),
-                'fga': (948, 656, 85, 62),
-                'prime_totale': (1040, 656, 121, 67),
-                'categorie_risque': (284, 706, 162, 45),
-                'immatriculation': (293, 754, 155, 29),
-                'marque': (284, 778, 167, 38),
-                'type_vehicule': (280, 811, 161, 49),
-                'date_emission': (1036, 958, 145, 49),  # Fixed: was 1385, now 958
-                'commission': (1028, 948, 155, 59),     # Fixed: was 1385, now 948
-            },
-            
-            'format_3': {  # Third format (you can customize this)
-                # Add your third format field boxes here
-                'example_field': (100, 100, 200, 50),
-            },
-            
-            'hp0012_custom': {  # HP0012 custom format
-                'assurance': (541, 188, 234, 35),
-                'numero_quittance': (789, 189, 153, 32),
-                'agence': (362, 263, 90, 28),
-                'souscripteur': (361, 314, 354, 27),
-                'adresse': (362, 353, 297, 19),
-                'ville': (468, 379, 145, 30),
-                'code_postal': (364, 386, 81, 25),
-                'assure': (364, 419, 351, 32),
-                'num_contrat': (361, 461, 141, 28),
-                'fractionnement': (784, 455, 154, 32),
-                'numero_aliment': (361, 495, 183, 30),
-                'date_effet_debut': (358, 528, 134, 35),
-                'date_effet_fin': (746, 526, 138, 37),
-                'prime_base': (194, 620, 125, 56),
-                'prime_annexe': (337, 623, 135, 51),
-                'frais': (494, 623, 100, 57),
-                'taxe_base': (608, 624, 122, 53),
-                'taxes_annexes': (736, 620, 146, 59),
-                'fpcsr': (885, 622, 91, 55),
-                'fpac': (980, 625, 87, 47),
-                'fga': (1077, 629, 76, 41),
-                'prime_totale': (1187, 621, 106, 56),
-                'categorie_risque': (382, 689, 168, 31),
-                'immatriculation': (382, 726, 136, 29),
-                'marque': (381, 763, 129, 30),
-                'type_vehicule': (380, 798, 150, 35),
-                'date_emission': (1089, 733, 150, 44),
-            }
+        # Results are appended to an indexed SQLite store (see results_store.py) rather than
+        # overwriting a JSON file on every run
+        self.RESULTS_DB = RESULTS_DB
+        self.results_store = None
+        self.IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.pdf']
+        # Resolution used to rasterize PDF pages; None renders them at the width the box configs were drawn for
+        self.PDF_DPI = None
+        # Run TableExtractor in compact mode: no intermediate images kept or written to disk
+        self.LOW_MEMORY_PREPROCESSING = True
+        # Image files whose long side is at least 2x this are decoded at 1/2, 1/4 or 1/8 size
+        # (phone photos, 300-600 dpi scans). 0 disables. The field boxes follow the warped page width.
+        self.DECODE_TARGET_HEIGHT = int(os.getenv('DECODE_TARGET_HEIGHT', '1600'))
+        # Batch mode overlaps decoding, preprocessing (thread pool) and OCR through bounded queues
+        self.BATCH_PIPELINE = True
+        self.PIPELINE_PREPROCESS_WORKERS = 2
+        self.PIPELINE_QUEUE_DEPTH = 4
+        # Debug crops/box previews are written in the background for a sample of pages only.
+        # With DEBUG_SAMPLE_RATE = 0 and the error/low-confidence triggers off nothing is collected.
+        self.debug_sink = DebugArtifactSink(
+            root_dir='debug_artifacts',
+            sample_rate=float(os.getenv('DEBUG_SAMPLE_RATE', '0')),
+            keep_errors=os.getenv('DEBUG_KEEP_ERRORS', '0') == '1',
+            low_confidence=float(os.getenv('DEBUG_LOW_CONFIDENCE')) if os.getenv('DEBUG_LOW_CONFIDENCE') else None,
+        )
+        # Snap boxes to the table ruling lines before OCR: 'cell', 'offset' or None to disable
+        self.BOX_ALIGNMENT_MODE = 'cell'
+        # Largest move of a box side, in pixels of the reference page (scaled with the boxes)
+        self.BOX_ALIGNMENT_MAX_SHIFT = 12
+        # 'tiered' runs a recognition-only pass first and escalates weak fields, 'full' always runs det + cls
+        self.OCR_MODE = 'tiered'
+        self.CONFIDENCE_THRESHOLD = 0.85
+        # Orientation is decided once per page, so crops skip the per-call angle classifier.
+        # CROP_ANGLE_CLS = None follows PAGE_ORIENTATION_CHECK (crops are classified only when
+        # the page is not); True or False forces it either way, see crop_angle_cls()
+        self.PAGE_ORIENTATION_CHECK = True
+        self.CROP_ANGLE_CLS = None
+        # Totals since the processor started; each page counts in its own PageContext and
+        # adds its counts here under the lock, so concurrent pages never mix their metrics
+        self.ocr_stats = {'fields': 0, 'escalated': 0, 'calls': 0}
+        self.ocr_stats_lock = threading.Lock()
+        # Read the boxes sharing a table row as one strip (one det + rec call) and split the
+        # words back by x; fields the strip cannot settle are read on their own crop as before.
+        # Off by default: a strip is not the same OCR call as the per-field read, so a field
+        # can come out differently (check with `python benchmark.py strips` before enabling)
+        self.ROW_STRIP_OCR = os.getenv('ROW_STRIP_OCR', '0') == '1'
+        self.row_strip_plans = {}
+        # Inference backend: 'paddle' (FP32 Paddle Inference), 'onnx' (ONNX Runtime on CPU)
+        # or 'onnx_int8' (ONNX Runtime with the int8 recognizer), see onnx_models.py
+        self.OCR_BACKEND = os.getenv('OCR_BACKEND', 'paddle')
+        self.ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', ONNX_MODEL_DIR)
+        # 'paddle', 'record' (paddle + save every result to OCR_RECORDING) or 'replay'
+        # (serve the saved results by crop hash, no model loaded), see ocr_engines.py
+        self.OCR_ENGINE = os.getenv('OCR_ENGINE', 'paddle')
+        self.OCR_RECORDING = os.getenv('OCR_RECORDING', 'ocr_recording.json')
+        
+        # Expected patterns used to decide whether a fast-pass result is trustworthy
+        self.FORMAT_PATTERNS = {
+            'date': r'\d{1,2}\s*[/.-]\s*\d{1,2}\s*[/.-]\s*\d{2,4}',
+            'amount': r'^\d{1,3}(?:[\s.,]?\d{3})*(?:[.,]\d{1,3})?\s*(?:DT|D|TND)?$',
+            'plate': r'\d{1,4}\s*(?:TU|TN|RS)\s*\d{1,4}',
         }
+        self.FIELD_FORMATS = {
+            'date_effet_debut': 'date',
+            'date_effet_fin': 'date',
+            'date_emission': 'date',
+            "Periode d'assurance_date_debut": 'date',
+            "Periode d'assurance_date_fin": 'date',
+            'prime_base': 'amount',
+            'prime_annexe': 'amount',
+            'frais': 'amount',
+            'taxe_base': 'amount',
+            'taxes_annexes': 'amount',
+            'fpcsr': 'amount',
+            'fpac': 'amount',
+            'fga': 'amount',
+            'prime_totale': 'amount',
+            'commission': 'amount',
+            'prime': 'amount',
+            'COUT DE CONTRAT': 'amount',
+            'taxe_taxe': 'amount',
+            'taxe_fg': 'amount',
+            'total': 'amount',
+            'somme a payer': 'amount',
+            'immatriculation': 'plate',
+        }
+        
+        # Cross-field rules checked after extraction; fields that break them are re-read
+        # with the strongest OCR settings, at most MAX_REOCR_FIELDS per page
+        premium_columns = ['prime_base', 'prime_annexe', 'frais', 'taxe_base', 'taxes_annexes', 'fpcsr', 'fpac', 'fga']
+        self.VALIDATION_RULES = {
+            'format_1': [
+                {'type': 'date_order', 'before': "Periode d'assurance_date_debut", 'after': "Periode d'assurance_date_fin"},
+            ],
+            'carte_assurances': [
+                {'type': 'sum', 'terms': premium_columns, 'total': 'prime_totale'},
+                {'type': 'date_order', 'before': 'date_effet_debut', 'after': 'date_effet_fin'},
+            ],
+            'hp0012_custom': [
+                {'type': 'sum', 'terms': premium_columns, 'total': 'prime_totale'},
+                {'type': 'date_order', 'before': 'date_effet_debut', 'after': 'date_effet_fin'},
+            ],
+        }
+        self.VALIDATION_ENABLED = True
+        self.MAX_REOCR_FIELDS = 3
+        
+        # Per-page time budget in seconds (None: no limit). When it runs out, the fields read so
+        # far are returned with 'partial': True and the rest listed in 'unfinished_fields',
+        # so fields are read in FIELD_PRIORITY order first, then in box configuration order.
+        self.TIME_BUDGET = float(os.getenv('TIME_BUDGET_SECONDS', '0')) or None
+        self.FIELD_PRIORITY = [
+            'numero_quittance', 'numero quittance', 'num_contrat', 'prime_totale', 'total', 'somme a payer',
+            'date_effet_debut', 'date_effet_fin', "Periode d'assurance_date_debut", "Periode d'assurance_date_fin",
+        ]
         
-        self.ocr = PaddleOCR(use_angle_cls=True, lang='fr')
+        # Near-duplicate pages (rescans, new photos of the same paper) are found by a perceptual
+        # hash of the warped page before OCR. None (default) disables the check, 'flag' still
+        # extracts and adds 'duplicate_of', 'reuse' returns the earlier extraction once
+        # DUPLICATE_VERIFY_FIELDS read from the new page match it. The index keeps every result
+        # on disk under DUPLICATE_INDEX_PATH, so it is only written when the check is enabled.
+        self.DUPLICATE_ACTION = os.getenv('DUPLICATE_ACTION') or None
+        self.DUPLICATE_MAX_DISTANCE = 6
+        self.DUPLICATE_INDEX_PATH = os.getenv('DUPLICATE_INDEX_PATH', 'duplicate_index/pages')
+        self.DUPLICATE_VERIFY_FIELDS = ['numero_quittance', 'numero quittance']
+        self.duplicate_index = None
+        
+        # Format configurations for different quittance types (field_boxes.py), copied so a
+        # processor can add or change formats without touching the module
+        self.FIELD_BOXES_CONFIGS = {name: dict(boxes) for name, boxes in FIELD_BOXES_CONFIGS.items()}
+        
+        self.ocr = self.load_ocr_engine()
+    
+    def load_ocr_engine(self):
+        """Build the OCR engine selected by OCR_ENGINE / OCR_BACKEND"""
+        options = {'use_angle_cls': True, 'lang': 'fr'}
+        if self.OCR_ENGINE != 'replay':
+            options.update(self.thread_budget.engine_options())
+            options.update(backend_options(self.OCR_BACKEND, self.ONNX_MODEL_DIR))
+        return create_ocr_engine(self.OCR_ENGINE, self.OCR_RECORDING, **options)
     
     def detect_quittance_format(self, image):
         """
@@ -110,15 +193,8 @@ class QuittanceProcessor:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
         # Extract some text from the image to help with format detection
-        result = self.ocr.ocr(image, cls=True)
-        text_content = ""
-        if result:
-            for line in result:
-                if line:
-                    for word_info in line:
-                        text_content += word_info[1][0] + " "
-        
-        text_content = text_content.lower()
+        words = self.ocr.recognize(image, cls=self.crop_angle_cls())
+        text_content = " ".join(word.text for word in words).lower()
         
         # Format detection logic
         if "carte assurances" in text_content or "agence" in text_content:
@@ -133,69 +209,335 @@ class QuittanceProcessor:
             # Default to format_1 if unsure, or you can add more detection logic
             return 'format_1'
     
-    def preprocess_image(self, image_path):
+    def preprocess_image(self, image_path, image=None, deadline=None):
         """Preprocess image using TableExtractor"""
-        table_extractor = TableExtractor(image_path)
+        table_extractor = TableExtractor(image_path, image=image, compact=self.LOW_MEMORY_PREPROCESSING, deadline=deadline)
         processed_img = table_extractor.execute()
         return processed_img
     
-    def extract_field_from_box(self, image, box, field):
-        """Extract text from a specific box in the image"""
+    def preprocess_page(self, image_path, image=None, image_scale=1.0, deadline=None):
+        """
+        Preprocess a page, decoding the file at reduced resolution when it is larger than
+        DECODE_TARGET_HEIGHT needs. Returns (page, decode scale relative to the file's resolution).
+        """
+        if image is None and self.DECODE_TARGET_HEIGHT:
+            image, image_scale = read_image(image_path, target_height=self.DECODE_TARGET_HEIGHT)
+        return self.preprocess_image(image_path, image=image, deadline=deadline), image_scale
+    
+    def page_box_scale(self, page):
+        """Scale of the field boxes for a warped page: its width over the width they were drawn on"""
+        return page.shape[1] / FIELD_BOXES_PAGE_WIDTH
+    
+    def scaled_field_boxes(self, format_name, scale=1.0):
+        """Boxes of a format for a page at `scale` of the resolution they were drawn at"""
+        field_boxes = self.FIELD_BOXES_CONFIGS[format_name]
+        if scale == 1.0:
+            return field_boxes
+        return {field: tuple(int(round(value * scale)) for value in box) for field, box in field_boxes.items()}
+    
+    def crop_angle_cls(self):
+        """Whether crops go through the angle classifier: only when pages are not turned upright first"""
+        if self.CROP_ANGLE_CLS is not None:
+            return self.CROP_ANGLE_CLS
+        return not self.PAGE_ORIENTATION_CHECK
+    
+    def words_to_text(self, words):
+        """Join recognized words and keep the weakest word confidence for the field"""
+        if not words:
+            return '', 0.0
+        text = ' '.join(word.text for word in words)
+        confidence = min(word.confidence for word in words)
+        return text, confidence
+    
+    def matches_field_format(self, field, text):
+        """Check the text against the expected pattern of the field, if it has one"""
+        field_format = self.FIELD_FORMATS.get(field)
+        if field_format is None:
+            return True
+        return re.search(self.FORMAT_PATTERNS[field_format], text, re.IGNORECASE) is not None
+    
+    def enhance_crop(self, crop):
+        """Upscale and boost the contrast of a crop for the expensive OCR tier"""
+        upscaled = cv2.resize(crop, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+        gray = cv2.cvtColor(upscaled, cv2.COLOR_BGR2GRAY)
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return cv2.cvtColor(clahe.apply(gray), cv2.COLOR_GRAY2BGR)
+    
+    def recognize_crop(self, crop, field, context):
+        """Run OCR on a field crop, escalating to the expensive pass only when needed"""
+        context.count('calls')
+        if self.OCR_MODE != 'tiered':
+            text, confidence = self.words_to_text(self.ocr.recognize(crop, cls=self.crop_angle_cls()))
+            return text, confidence, False
+        
+        # Fast tier: recognition only, no detection and no angle classification
+        text, confidence = self.words_to_text(self.ocr.recognize(crop, det=False))
+        if confidence >= self.CONFIDENCE_THRESHOLD and self.matches_field_format(field, text):
+            return text, confidence, False
+        
+        # Expensive tier: detection (plus angle classification if enabled) on an enhanced crop
+        context.count('calls')
+        strong_text, strong_confidence = self.words_to_text(
+            self.ocr.recognize(self.enhance_crop(crop), cls=self.crop_angle_cls())
+        )
+        fast_valid = bool(text) and self.matches_field_format(field, text)
+        strong_valid = bool(strong_text) and self.matches_field_format(field, strong_text)
+        if strong_valid and not fast_valid:
+            return strong_text, strong_confidence, True
+        if fast_valid and not strong_valid:
+            return text, confidence, True
+        if strong_confidence >= confidence:
+            return strong_text, strong_confidence, True
+        return text, confidence, True
+    
+    def crop_field(self, image, box, field):
+        """Return the crop of a field box, or None if the box does not fit in the image"""
         x, y, w, h = box
         
         # Check if coordinates are within image bounds
         img_height, img_width = image.shape[:2]
         if x < 0 or y < 0 or x + w > img_width or y + h > img_height:
             print(f"Warning: Box coordinates out of bounds for field '{field}' at ({x}, {y}, {w}, {h}). Image size: {img_width}x{img_height}")
-            return ''
+            return None
         
-        crop = image[y:y+h, x:x+w]
+        return image[y:y+h, x:x+w]
+    
+    def get_row_strips(self, format_name, fields):
+        """Row strips of a format (or of a field subset), planned once and cached"""
+        key = (format_name, tuple(fields))
+        if key not in self.row_strip_plans:
+            field_boxes = self.FIELD_BOXES_CONFIGS[format_name]
+            self.row_strip_plans[key] = plan_row_strips({field: field_boxes[field] for field in fields})
+        return self.row_strip_plans[key]
+    
+    def read_row_strip(self, image, field_boxes, strip, context):
+        """
+        OCR the union of the boxes of a strip in one call and split the words by field.
+        Returns {field: (text, confidence)} for the fields whose reading would be accepted
+        by the fast tier on its own crop; the others are left out.
+        """
+        strip_box = union_box([field_boxes[field] for field in strip])
+        crop = self.crop_field(image, strip_box, '+'.join(strip))
+        if crop is None or crop.size == 0:
+            return {}
+        context.add_image(f"strip_{'+'.join(strip)}.jpg", crop)
+        
+        context.count('calls')
+        words = self.ocr.recognize(crop, cls=self.crop_angle_cls())
+        assigned, unresolved = split_strip_words(words, field_boxes, strip, strip_box[0])
+        readings = {}
+        for field in strip:
+            text, confidence = self.words_to_text(assigned[field])
+            if field in unresolved or not text:
+                continue
+            if self.OCR_MODE == 'tiered' and (confidence < self.CONFIDENCE_THRESHOLD or not self.matches_field_format(field, text)):
+                continue
+            readings[field] = (text, confidence)
+        print(f"Row strip {strip}: {len(readings)}/{len(strip)} field(s) read in one call")
+        return readings
+    
+    def extract_field_from_box(self, image, box, field, context):
+        """Extract text and confidence from a specific box in the image"""
+        x, y, w, h = box
+        crop = self.crop_field(image, box, field)
+        if crop is None:
+            return '', 0.0
         
         # Check if crop is valid
-        if crop is None or crop.size == 0:
+        if crop.size == 0:
             print(f"Warning: Invalid crop for field '{field}' at ({x}, {y}, {w}, {h})")
-            return ''
+            return '', 0.0
         
-        # Save debug crop only if crop is valid
-        try:
-            debug_dir = "debug_crops"
-            os.makedirs(debug_dir, exist_ok=True)
-            cv2.imwrite(f"{debug_dir}/crop_{field}.jpg", crop)
-        except Exception as e:
-            print(f"Warning: Could not save debug crop for field '{field}': {e}")
+        # Keep the crop for the debug sink only if this page is being collected
+        context.add_image(f"crop_{field}.jpg", crop)
         
         print(f"Cropping field '{field}' at ({x}, {y}, {w}, {h}), crop shape: {crop.shape}")
         
-        result = self.ocr.ocr(crop, cls=True)
-        text = ''
+        text, confidence, escalated = self.recognize_crop(crop, field, context)
+        context.count('fields')
+        if escalated:
+            context.count('escalated')
+            print(f"Field '{field}' escalated to the expensive OCR pass (confidence {confidence:.2f})")
         
-        if not result:
+        if not text:
             print(f"No OCR result for field '{field}' at ({x}, {y}, {w}, {h})")
-            return text
-            
-        for line in result:
-            if not line:
-                continue
-            for word_info in line:
-                text += word_info[1][0] + ' '
         
-        return text.strip()
+        return text, confidence
+    
+    def reocr_field(self, image, box, field, context, padding=6, box_scale=1.0):
+        """
+        Re-read one field with the strongest settings: a slightly larger crop (in case the
+        box clipped a character), enhanced, with detection and angle classification.
+        `padding` is in reference page pixels and is scaled with the boxes.
+        """
+        x, y, w, h = box
+        padding = int(round(padding * box_scale))
+        img_height, img_width = image.shape[:2]
+        x0, y0 = max(x - padding, 0), max(y - padding, 0)
+        x1, y1 = min(x + w + padding, img_width), min(y + h + padding, img_height)
+        crop = self.crop_field(image, (x0, y0, x1 - x0, y1 - y0), field)
+        if crop is None or crop.size == 0:
+            return '', 0.0
+        context.count('calls')
+        return self.words_to_text(self.ocr.recognize(self.enhance_crop(crop), cls=True))
+    
+    def validate_fields(self, image, field_boxes, format_name, data, confidences, deadline=None, on_progress=None, context=None, box_scale=1.0):
+        """
+        Check the cross-field rules of the format and re-OCR only the suspect fields,
+        keeping a new reading when it makes the page more consistent.
+        Updates data/confidences in place and returns the validation report.
+        """
+        if context is None:
+            context = PageContext()
+        # Only the rules whose fields were all extracted apply to a field subset
+        rules = [rule for rule in self.VALIDATION_RULES.get(format_name, [])
+                 if all(field in field_boxes for field in rule.get('terms', []) + [rule.get('total'), rule.get('before'), rule.get('after')] if field)]
+        validator = FieldValidator(self.FIELD_FORMATS, rules)
+        report = validator.validate(data, confidences)
+        attempts = []
+        
+        while len(attempts) < self.MAX_REOCR_FIELDS and not (deadline and deadline.expired()):
+            tried = {attempt['field'] for attempt in attempts}
+            pending = [field for field in report['suspects'] if field not in tried and field in data and field in field_boxes]
+            if not pending:
+                break
+            field = pending[0]
+            text, confidence = self.reocr_field(image, field_boxes[field], field, context, box_scale=box_scale)
+            candidate = dict(data, **{field: text})
+            candidate_confidences = dict(confidences, **{field: confidence})
+            candidate_report = validator.validate(candidate, candidate_confidences)
+            accepted = text != data[field] and validator.score(candidate_report) < validator.score(report)
+            attempts.append({'field': field, 'before': data[field], 'after': text, 'accepted': accepted})
+            print(f"Re-OCR of '{field}': '{data[field]}' -> '{text}' ({'kept' if accepted else 'discarded'})")
+            if accepted:
+                data[field] = text
+                confidences[field] = confidence
+                report = candidate_report
+                if on_progress is not None:
+                    on_progress('field', {'field': field, 'value': text, 'confidence': round(confidence, 4), 'reread': True})
+        
+        report['reocr'] = attempts
+        return report
+    
+    def get_escalation_rate(self):
+        """Share of fields that needed the expensive OCR pass since the processor started"""
+        with self.ocr_stats_lock:
+            if not self.ocr_stats['fields']:
+                return 0.0
+            return self.ocr_stats['escalated'] / self.ocr_stats['fields']
     
-    def extract_all_fields(self, image, format_name):
-        """Extract all fields using the specified format"""
+    def add_ocr_stats(self, page_stats):
+        """Add the counts of a page to the processor totals"""
+        with self.ocr_stats_lock:
+            for key, value in page_stats.items():
+                self.ocr_stats[key] += value
+    
+    def align_field_boxes(self, image, field_boxes, box_scale=1.0):
+        """Adjust the configured boxes to the cell borders found on this page"""
+        max_shift = max(1, int(round(self.BOX_ALIGNMENT_MAX_SHIFT * box_scale)))
+        aligner = BoxAligner(image, max_shift=max_shift, mode=self.BOX_ALIGNMENT_MODE)
+        aligned_boxes = aligner.align_boxes(field_boxes)
+        moved = sum(1 for field in field_boxes if aligned_boxes[field] != field_boxes[field])
+        print(f"Box alignment ({self.BOX_ALIGNMENT_MODE}): {moved}/{len(field_boxes)} boxes adjusted in {aligner.elapsed_ms:.1f} ms")
+        return aligned_boxes
+    
+    def resolve_fields(self, format_name, requested):
+        """Box fields of a format for the requested names (see field_boxes.resolve_fields)"""
+        return resolve_fields(format_name, requested, self.FIELD_BOXES_CONFIGS)
+    
+    def order_fields(self, field_boxes):
+        """Field names with FIELD_PRIORITY first, then the rest in configuration order"""
+        priority = [field for field in self.FIELD_PRIORITY if field in field_boxes]
+        return priority + [field for field in field_boxes if field not in priority]
+    
+    def extract_all_fields(self, image, format_name, deadline=None, fields=None, on_progress=None, box_scale=1.0, context=None):
+        """
+        Extract all fields using the specified format, or only `fields` (see resolve_fields),
+        in which case only those boxes are cropped and read and only their keys are returned.
+        With a Deadline, no field is started once the remaining time is shorter than an
+        average field so far; the fields left are reported in 'unfinished_fields'.
+        `on_progress(event, data)` is called with a 'field' event as soon as each field is read.
+        `box_scale` is the page_box_scale of the page.
+        `context` is the PageContext of the page (a new one when not given).
+        """
+        if context is None:
+            context = PageContext()
         if format_name not in self.FIELD_BOXES_CONFIGS:
             raise ValueError(f"Unknown format: {format_name}. Available formats: {list(self.FIELD_BOXES_CONFIGS.keys())}")
         
-        field_boxes = self.FIELD_BOXES_CONFIGS[format_name]
+        field_boxes = self.scaled_field_boxes(format_name, box_scale)
+        if fields is not None:
+            field_boxes = {field: field_boxes[field] for field in self.resolve_fields(format_name, fields)}
+        if self.BOX_ALIGNMENT_MODE:
+            field_boxes = self.align_field_boxes(image, field_boxes, box_scale)
         data = {}
+        confidences = {}
+        stats_before = dict(context.ocr_stats)
         
-        for field, box in field_boxes.items():
-            data[field] = self.extract_field_from_box(image, box, field)
+        # Strips are read when their first field comes up in priority order
+        strip_of = {}
+        if self.ROW_STRIP_OCR:
+            for strip in self.get_row_strips(format_name, list(field_boxes)):
+                strip_of.update((field, strip) for field in strip)
+        strip_readings = {}
         
-        return self.format_output_data(data, format_name)
+        ordered_fields = self.order_fields(field_boxes)
+        fields_start = time.perf_counter()
+        for field in ordered_fields:
+            # A field already read with its row strip costs nothing more, whatever time is left
+            if deadline is not None and data and field not in strip_readings:
+                average_field = (time.perf_counter() - fields_start) / len(data)
+                if deadline.remaining() < average_field:
+                    continue
+            strip = strip_of.pop(field, None)
+            if strip is not None:
+                strip_readings.update(self.read_row_strip(image, field_boxes, strip, context))
+                for other in strip:
+                    strip_of.pop(other, None)
+            if field in strip_readings:
+                data[field], confidences[field] = strip_readings.pop(field)
+                context.count('fields')
+            else:
+                data[field], confidences[field] = self.extract_field_from_box(image, field_boxes[field], field, context)
+            if on_progress is not None:
+                on_progress('field', {'field': field, 'value': data[field], 'confidence': round(confidences[field], 4)})
+        unfinished = [field for field in ordered_fields if field not in data]
+        if unfinished:
+            print(f"Time budget exhausted: {len(unfinished)} field(s) left unread: {unfinished}")
+        
+        validation = None
+        if self.VALIDATION_ENABLED:
+            validation = self.validate_fields(image, field_boxes, format_name, data, confidences, deadline, on_progress, context, box_scale)
+            print(f"Validation: {validation['status']} ({len(validation['reocr'])} field(s) re-read)")
+        
+        output = self.format_output_data(data, format_name, list(field_boxes) if fields is not None else None)
+        if validation is not None:
+            output['validation'] = validation
+        output['field_confidence'] = {field: round(confidence, 4) for field, confidence in confidences.items()}
+        page_stats = {key: value - stats_before[key] for key, value in context.ocr_stats.items()}
+        self.add_ocr_stats(page_stats)
+        page_fields = page_stats['fields']
+        page_escalated = page_stats['escalated']
+        output['ocr_metrics'] = {
+            'ocr_mode': self.OCR_MODE,
+            'fields': page_fields,
+            'escalated': page_escalated,
+            'escalation_rate': round(page_escalated / page_fields, 4) if page_fields else 0.0,
+            'ocr_calls': page_stats['calls'],
+        }
+        output['partial'] = bool(unfinished)
+        output['unfinished_fields'] = unfinished
+        return output
     
-    def format_output_data(self, data, format_name):
-        """Format the extracted data based on the quittance type"""
+    def format_output_data(self, data, format_name, fields=None):
+        """
+        Format the extracted data based on the quittance type.
+        With `fields` (box field names), only the keys filled from those boxes are kept.
+        """
+        if fields is not None:
+            marked = {field: data.get(field, '') if field in fields else SKIPPED_FIELD for field in self.FIELD_BOXES_CONFIGS[format_name]}
+            return prune_skipped(self.format_output_data(marked, format_name))
+        
         if format_name == 'carte_assurances':
             return {
                 'assurance': data.get('assurance', ''),
@@ -287,56 +629,240 @@ class QuittanceProcessor:
                 'total': data.get('total', ''),
             }
     
-    def visualize_boxes(self, image, format_name, output_path='boxes_preview.jpg'):
-        """Visualize the boxes for the specified format"""
+    def warm_up(self):
+        """
+        Run every OCR path once on a synthetic crop so graph initialisation is paid
+        before the first real request. Returns the elapsed seconds.
+        """
+        start = time.perf_counter()
+        crop = np.full((48, 320, 3), 255, dtype=np.uint8)
+        cv2.putText(crop, "QUITTANCE 01/06/2024", (8, 34), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        self.ocr.recognize(crop, det=False)
+        self.ocr.recognize(crop, cls=self.crop_angle_cls())
+        if self.PAGE_ORIENTATION_CHECK:
+            self.ocr.classify_orientation(crop)
+        return time.perf_counter() - start
+    
+    def render_boxes(self, image, format_name, box_scale=1.0):
+        """Draw the boxes of the specified format on a copy of the image"""
         if format_name not in self.FIELD_BOXES_CONFIGS:
             raise ValueError(f"Unknown format: {format_name}")
         
-        field_boxes = self.FIELD_BOXES_CONFIGS[format_name]
+        field_boxes = self.scaled_field_boxes(format_name, box_scale)
         img_copy = image.copy()
         
         for field, (x, y, w, h) in field_boxes.items():
             cv2.rectangle(img_copy, (x, y), (x + w, y + h), (0, 255, 0), 2)
             cv2.putText(img_copy, field, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         
-        cv2.imwrite(output_path, img_copy)
+        return img_copy
+    
+    def visualize_boxes(self, image, format_name, output_path='boxes_preview.jpg'):
+        """Visualize the boxes for the specified format"""
+        cv2.imwrite(output_path, self.render_boxes(image, format_name))
         print(f"Box visualization saved to {output_path}")
     
-    def process_single_image(self, image_path, format_name=None):
-        """Process a single image with automatic or manual format detection"""
-        print(f"Processing: {image_path}")
+    def find_duplicate(self, image):
+        """Return (page hash, closest earlier page within DUPLICATE_MAX_DISTANCE or None)"""
+        if self.duplicate_index is None:
+            self.duplicate_index = DuplicateIndex(self.DUPLICATE_INDEX_PATH)
+        start = time.perf_counter()
+        page_hash = perceptual_hash(image)
+        matches = self.duplicate_index.find(page_hash, self.DUPLICATE_MAX_DISTANCE, limit=1)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if not matches:
+            return page_hash, None
+        distance, entry_id = matches[0]
+        earlier = self.duplicate_index.get(entry_id)
+        print(f"Near-duplicate of {earlier['source_file']} (distance {distance}, found in {elapsed_ms:.2f} ms)")
+        return page_hash, dict(earlier, distance=distance)
+    
+    def reuse_duplicate(self, image, duplicate, deadline, box_scale=1.0, context=None):
+        """
+        Return the earlier extraction if the verification fields read from this page match it,
+        otherwise None (a different quittance that happens to look alike).
+        """
+        earlier = duplicate['result']
+        format_name = earlier['detected_format']
+        verify_fields = [field for field in self.DUPLICATE_VERIFY_FIELDS if field in self.FIELD_BOXES_CONFIGS.get(format_name, {})]
+        if verify_fields:
+            check = self.extract_all_fields(image, format_name, deadline, verify_fields, box_scale=box_scale, context=context)
+            for field in verify_fields:
+                if check.get(field, '').replace(' ', '') != earlier.get(field, '').replace(' ', ''):
+                    print(f"Not reusing {duplicate['source_file']}: '{field}' differs")
+                    return None
+        return dict(earlier)
+    
+    def get_results_store(self):
+        """Open the results store on first use"""
+        if self.results_store is None:
+            self.results_store = ResultsStore(self.RESULTS_DB)
+        return self.results_store
+    
+    def build_error_result(self, image_path, format_name, error, page_index=None):
+        """Result returned for a page that could not be processed"""
+        result = {
+            'source_file': os.path.basename(image_path),
+            'detected_format': format_name or 'unknown',
+            'error': str(error)
+        }
+        if page_index is not None:
+            result['page_index'] = page_index
+        return result
+    
+    def build_partial_result(self, image_path, format_name, error, page_index=None, fields=None):
+        """Result for a page whose budget ran out before field extraction: every field is unfinished"""
+        if format_name in self.FIELD_BOXES_CONFIGS:
+            requested = self.resolve_fields(format_name, fields) if fields is not None else None
+            result = self.format_output_data({}, format_name, requested)
+            result['source_file'] = os.path.basename(image_path)
+            result['detected_format'] = format_name
+            if page_index is not None:
+                result['page_index'] = page_index
+            unfinished = self.order_fields(requested or self.FIELD_BOXES_CONFIGS[format_name])
+        else:
+            result = self.build_error_result(image_path, format_name, error, page_index)
+            unfinished = []
+        result['partial'] = True
+        result['unfinished_fields'] = unfinished
+        result['stopped_before'] = error.stage
+        return result
+    
+    def process_single_image(self, image_path, format_name=None, image=None, page_index=None, preprocessed=None,
+                             deadline=None, fields=None, on_progress=None, image_scale=1.0):
+        """
+        Process a single image with automatic or manual format detection.
+        `image` and `page_index` are set when the page comes from a multi-page document;
+        `preprocessed` when TableExtractor already ran (batch pipeline). `image_scale` is the
+        scale of either when it was decoded at reduced resolution (reported only: the boxes
+        are scaled by the width of the warped page, see page_box_scale). `deadline` defaults
+        to a new Deadline(TIME_BUDGET) and is checked between stages and fields. `fields`
+        restricts extraction to a subset of the fields, e.g. ['numero_quittance', 'num_contrat'].
+        `on_progress(event, data)` receives a 'format' event once the format is known and
+        a 'field' event per field read, so callers can stream the page as it is extracted.
+        """
+        page_label = os.path.basename(image_path) if page_index is None else f"{os.path.basename(image_path)}_p{page_index}"
+        print(f"Processing: {image_path}" + ("" if page_index is None else f" (page {page_index})"))
+        context = PageContext(self.debug_sink.start_request(page_label))
+        if deadline is None:
+            deadline = Deadline(self.TIME_BUDGET)
         
         try:
+            # Reject unknown field names before any image work
+            if fields is not None and format_name in self.FIELD_BOXES_CONFIGS:
+                self.resolve_fields(format_name, fields)
+            
             # Preprocess the image
-            processed_img = self.preprocess_image(image_path)
-            print(f"Preprocessed image shape: {processed_img.shape}")
+            decode_scale = image_scale
+            if preprocessed is None:
+                deadline.check("preprocessing")
+                processed_img, decode_scale = self.preprocess_page(image_path, image, image_scale, deadline)
+            else:
+                processed_img = preprocessed
+            print(f"Preprocessed image shape: {processed_img.shape}" + ("" if decode_scale == 1.0 else f" (decoded at {decode_scale:.3f}x)"))
+            
+            # Decide the page orientation once instead of classifying every crop
+            page_rotation = 0
+            if self.PAGE_ORIENTATION_CHECK:
+                deadline.check("orientation check")
+                processed_img, page_rotation, orientation_ms = correct_page_orientation(self.ocr, processed_img)
+                print(f"Page orientation: rotated {page_rotation} degrees (checked in {orientation_ms:.1f} ms)")
+            
+            # Boxes follow the upright page, whatever resolution the file was decoded at
+            page_scale = self.page_box_scale(processed_img)
+            
+            # Look for an earlier scan of the same paper before any field OCR
+            page_hash = duplicate = None
+            if self.DUPLICATE_ACTION:
+                page_hash, duplicate = self.find_duplicate(processed_img)
+            if duplicate is not None and self.DUPLICATE_ACTION == 'reuse' and fields is None:
+                result = self.reuse_duplicate(processed_img, duplicate, deadline, page_scale, context)
+                if result is not None:
+                    result['source_file'] = os.path.basename(image_path)
+                    result.pop('page_index', None)
+                    if page_index is not None:
+                        result['page_index'] = page_index
+                    result['reused'] = True
+                    result['duplicate_of'] = {key: duplicate[key] for key in ('source_file', 'page_index', 'distance')}
+                    result['deadline'] = deadline.report()
+                    if on_progress is not None:
+                        # Streaming clients get the same 'format' event before the result
+                        on_progress('format', {'format': result.get('detected_format'),
+                                               'elapsed_s': round(deadline.elapsed(), 3), 'reused': True})
+                    if context.debug_request is not None:
+                        context.add_json("result.json", dict(result))
+                        self.debug_sink.finish(context.debug_request)
+                    return result
             
             # Detect format if not specified
             if format_name is None:
+                deadline.check("format detection")
                 format_name = self.detect_quittance_format(processed_img)
                 print(f"Detected format: {format_name}")
+            if on_progress is not None:
+                on_progress('format', {'format': format_name, 'elapsed_s': round(deadline.elapsed(), 3)})
             
-            # Visualize boxes
-            try:
-                self.visualize_boxes(processed_img, format_name, f"boxes_preview_{os.path.basename(image_path)}.jpg")
-            except Exception as e:
-                print(f"Warning: Could not save box visualization: {e}")
+            # The box preview is only rendered (on the writer thread) if the page is kept
+            if context.debug_request is not None and format_name in self.FIELD_BOXES_CONFIGS:
+                page_format = format_name
+                context.add_image("boxes_preview.jpg", lambda: self.render_boxes(processed_img, page_format, page_scale))
             
             # Extract fields
-            fields = self.extract_all_fields(processed_img, format_name)
-            fields['source_file'] = os.path.basename(image_path)
-            fields['detected_format'] = format_name
+            deadline.check("field extraction")
+            result = self.extract_all_fields(processed_img, format_name, deadline, fields, on_progress, page_scale, context)
+            result['source_file'] = os.path.basename(image_path)
+            result['detected_format'] = format_name
+            result['ocr_metrics']['page_rotation'] = page_rotation
+            result['ocr_metrics']['page_scale'] = round(page_scale, 4)
+            result['ocr_metrics']['decode_scale'] = round(decode_scale, 4)
+            result['deadline'] = deadline.report()
+            if page_index is not None:
+                result['page_index'] = page_index
+            if duplicate is not None:
+                result['duplicate_of'] = {key: duplicate[key] for key in ('source_file', 'page_index', 'distance')}
+            elif page_hash is not None and fields is None and not result['partial']:
+                # Only complete extractions are worth returning for a later rescan
+                self.duplicate_index.add(page_hash, {
+                    'source_file': result['source_file'],
+                    'page_index': page_index,
+                    'result': result,
+                })
             
-            return fields
+            if context.debug_request is not None:
+                context.add_json("result.json", dict(result))
+                confidences = result['field_confidence'].values()
+                self.debug_sink.finish(context.debug_request, min_confidence=min(confidences) if confidences else None)
+            return result
             
+        except DeadlineExceeded as e:
+            print(f"Stopping {image_path}: {e}")
+            result = self.build_partial_result(image_path, format_name, e, page_index, fields)
+            result['deadline'] = deadline.report()
+            if context.debug_request is not None:
+                context.add_json("result.json", result)
+                self.debug_sink.finish(context.debug_request, error=str(e))
+            return result
         except Exception as e:
             print(f"Error processing image {image_path}: {e}")
             # Return a basic result with error information
-            return {
-                'source_file': os.path.basename(image_path),
-                'detected_format': format_name or 'unknown',
-                'error': str(e)
-            }
+            result = self.build_error_result(image_path, format_name, e, page_index)
+            if context.debug_request is not None:
+                context.add_json("result.json", result)
+                self.debug_sink.finish(context.debug_request, error=str(e))
+            return result
+    
+    def process_document(self, document_path, format_name=None):
+        """
+        Stream the pages of a file (single image, multi-page TIFF or PDF) through
+        process_single_image, yielding one result per page as soon as it is ready.
+        """
+        if os.path.splitext(document_path)[1].lower() not in MULTI_PAGE_EXTENSIONS:
+            yield self.process_single_image(document_path, format_name)
+            return
+        
+        print(f"Streaming {count_pages(document_path)} page(s) from {document_path}")
+        for page_index, page in iter_pages(document_path, dpi=self.PDF_DPI):
+            yield self.process_single_image(document_path, format_name, image=page, page_index=page_index)
     
     def process_all_images(self, manual_format=None):
         """Process all images in the images directory"""
@@ -354,24 +880,68 @@ class QuittanceProcessor:
         
         print(f"Found {len(image_files)} image(s): {image_files}")
         
-        # Process each image
-        for filename in image_files:
-            image_path = os.path.join(self.IMAGE_DIR, filename)
-            try:
-                fields = self.process_single_image(image_path, manual_format)
-                results.append(fields)
-                print(f"Successfully processed {filename}")
-            except Exception as e:
-                print(f"Error processing {filename}: {str(e)}")
-                continue
-        
-        # Save results
-        with open(self.OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        if self.BATCH_PIPELINE:
+            pipeline = BatchPipeline(self, self.PIPELINE_PREPROCESS_WORKERS, self.PIPELINE_QUEUE_DEPTH)
+            results = pipeline.run([os.path.join(self.IMAGE_DIR, filename) for filename in image_files], manual_format)
+            pipeline.print_report()
+        else:
+            # Process each image
+            for filename in image_files:
+                image_path = os.path.join(self.IMAGE_DIR, filename)
+                try:
+                    for fields in self.process_document(image_path, manual_format):
+                        results.append(fields)
+                    print(f"Successfully processed {filename}")
+                except Exception as e:
+                    print(f"Error processing {filename}: {str(e)}")
+                    continue
         
-        print(f"Extraction complete. Results saved to {self.OUTPUT_FILE}")
+        file_hashes = {filename: file_hash(os.path.join(self.IMAGE_DIR, filename)) for filename in image_files}
+        self.save_results(results, file_hashes)
         return results
 
+    def process_pack(self, pack_path, manual_format=None):
+        """
+        Process every entry of an image pack (see image_pack.py). Each entry is decoded from
+        the memory-mapped pack and processed with manual_format, or else the format stored
+        for it when the pack was built, or else auto-detection.
+        """
+        results = []
+        with ImagePack(pack_path) as pack:
+            print(f"Found {len(pack)} image(s) in {pack_path}")
+            if self.BATCH_PIPELINE:
+                pipeline = BatchPipeline(self, self.PIPELINE_PREPROCESS_WORKERS, self.PIPELINE_QUEUE_DEPTH)
+                results = pipeline.run([], manual_format, pack=pack)
+                pipeline.print_report()
+                for entry, fields in zip(pack.entries, results):
+                    fields['source_sha256'] = entry['sha256']
+            else:
+                for entry in pack.entries:
+                    try:
+                        image, image_scale = pack.decode_scaled(entry, self.DECODE_TARGET_HEIGHT)
+                        fields = self.process_single_image(entry['name'], manual_format or entry['format'], image=image,
+                                                           page_index=entry['page_index'], image_scale=image_scale)
+                    except Exception as e:
+                        print(f"Error processing {entry['name']}: {str(e)}")
+                        continue
+                    fields['source_sha256'] = entry['sha256']
+                    results.append(fields)
+        self.save_results(results)
+        return results
+
+    def save_results(self, results, file_hashes=None):
+        """Save the results of a run to the results store, in a few transactions, and print its summary"""
+        added = self.get_results_store().add_many(results, file_hashes)
+        print(f"Extraction complete. {added} result(s) saved to {self.RESULTS_DB}")
+        if self.OCR_ENGINE == 'record':
+            self.ocr.save()
+            print(f"OCR recording saved to {self.OCR_RECORDING} ({len(self.ocr.entries)} results)")
+        elif self.OCR_ENGINE == 'replay':
+            print(f"OCR replay: {self.ocr.stats['hits']} hits, {self.ocr.stats['misses']} misses")
+        with self.ocr_stats_lock:
+            escalated, fields = self.ocr_stats['escalated'], self.ocr_stats['fields']
+        print(f"OCR escalation rate: {self.get_escalation_rate():.1%} ({escalated}/{fields} fields)")
+
 def main():
     processor = QuittanceProcessor()
     
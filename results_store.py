@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Results Store
+Keeps every extraction result in an indexed SQLite database instead of overwriting a JSON
+file, and exports or looks results up from the command line.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RESULTS_DB = os.getenv('RESULTS_DB', 'results.db')
+
+# Formats and tools name the same field differently
+QUITTANCE_KEYS = ('numero_quittance', 'numero quittance')
+CONTRACT_KEYS = ('num_contrat', 'n_du_contrat')
+
+# Columns a query may filter on, each backed by an index
+FILTER_COLUMNS = ['numero_quittance', 'num_contrat', 'file_hash', 'format']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    numero_quittance TEXT,
+    num_contrat TEXT,
+    file_hash TEXT,
+    format TEXT,
+    source_file TEXT,
+    page_index INTEGER,
+    processed_at REAL NOT NULL,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_numero_quittance ON results (numero_quittance);
+CREATE INDEX IF NOT EXISTS results_num_contrat ON results (num_contrat);
+CREATE INDEX IF NOT EXISTS results_file_hash ON results (file_hash);
+CREATE INDEX IF NOT EXISTS results_format ON results (format);
+CREATE INDEX IF NOT EXISTS results_processed_at ON results (processed_at);
+"""
+
+INSERT = ('INSERT INTO results (numero_quittance, num_contrat, file_hash, format, source_file, '
+          'page_index, processed_at, status, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+def file_hash(path=None, contents=None):
+    """SHA-256 of a source file, from its path or its bytes"""
+    digest = hashlib.sha256()
+    if contents is not None:
+        digest.update(contents)
+    else:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def normalize_key(value):
+    """Quittance and contract numbers are compared without spaces and case"""
+    if not value or not isinstance(value, str):
+        return None
+    return ''.join(value.split()).upper() or None
+
+def first_value(result, keys):
+    for key in keys:
+        if result.get(key):
+            return result[key]
+    return None
+
+def result_row(result, source_hash=None, processed_at=None):
+    """Values of the INSERT statement for one result"""
+    return (
+        normalize_key(first_value(result, QUITTANCE_KEYS)),
+        normalize_key(first_value(result, CONTRACT_KEYS)),
+        source_hash,
+        result.get('detected_format'),
+        result.get('source_file'),
+        result.get('page_index'),
+        processed_at or time.time(),
+        'error' if 'error' in result else 'partial' if result.get('partial') else 'success',
+        json.dumps(result, ensure_ascii=False),
+    )
+
+class ResultsStore:
+    """
+    Extraction results in an embedded SQLite database.
+
+    Every result is one row: the full result as JSON plus indexed columns for the
+    lookups the backend needs (quittance number, contract number, source file hash,
+    format, processing time). Inserts are batched in one transaction, and pages are
+    exported with keyset pagination on the row id, or on (processed_at, id) for a time
+    range, so both stay fast at millions of rows.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the threads of a process, serialized by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            # WAL lets readers (the API) query while a batch run is writing
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(SCHEMA)
+
+    def add_many(self, results, file_hashes=None, batch_size=1000):
+        """
+        Insert results in transactions of `batch_size` rows. `file_hashes` maps a
+        result's source_file to the hash of its file; results read from an image pack
+        carry it as source_sha256. Returns the number of rows added.
+        """
+        file_hashes = file_hashes or {}
+        processed_at = time.time()
+        added = 0
+        batch = []
+        for result in results:
+            batch.append(result_row(result, file_hashes.get(result.get('source_file')) or result.get('source_sha256'), processed_at))
+            if len(batch) >= batch_size:
+                added += self.insert(batch)
+                batch = []
+        if batch:
+            added += self.insert(batch)
+        return added
+
+    def add(self, result, source_hash=None):
+        """Insert one result; returns its row id"""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(INSERT, result_row(result, source_hash))
+            return cursor.lastrowid
+
+    def insert(self, rows):
+        with self.lock, self.connection:
+            self.connection.executemany(INSERT, rows)
+        return len(rows)
+
+    def query(self, after_id=0, limit=100, since=None, until=None, after_time=None, **filters):
+        """
+        Results matching the indexed filters (numero_quittance, num_contrat, file_hash,
+        format). Without a time range they come in insertion order: pass the `id` of the
+        last row as `after_id` to get the next page. With `since` (inclusive) and/or `until`
+        (exclusive) they are filtered on processed_at and ordered by (processed_at, id):
+        pass the `processed_at` and `id` of the last row as `after_time` and `after_id`.
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {sorted(unknown)}. Available filters: {FILTER_COLUMNS}")
+        clauses = []
+        params = []
+        if since is None and until is None and after_time is None:
+            clauses.append('id > ?')
+            params.append(after_id)
+            order = 'id'
+        else:
+            # Ids follow insertion, not processing time (a batch is stamped when it starts,
+            # an import may add older results), so the range is read on processed_at itself.
+            # Its index holds the rowid too, so (processed_at, id) is one ordered index walk
+            if after_time is not None:
+                clauses.append('(processed_at > ? OR (processed_at = ? AND id > ?))')
+                params.extend([after_time, after_time, after_id])
+            if since is not None:
+                clauses.append('processed_at >= ?')
+                params.append(since)
+            if until is not None:
+                clauses.append('processed_at < ?')
+                params.append(until)
+            order = 'processed_at, id'
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column in ('numero_quittance', 'num_contrat'):
+                value = normalize_key(value)
+            clauses.append(f'{column} = ?')
+            params.append(value)
+        params.append(limit)
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT id, file_hash, processed_at, status, data FROM results '
+                f'WHERE {" AND ".join(clauses)} ORDER BY {order} LIMIT ?', params).fetchall()
+        return [self.row_to_result(row) for row in rows]
+
+    def row_to_result(self, row):
+        result = json.loads(row['data'])
+        result['_store'] = {
+            'id': row['id'],
+            'file_hash': row['file_hash'],
+            'processed_at': row['processed_at'],
+            'status': row['status'],
+        }
+        return result
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up or export stored extraction results")
+    parser.add_argument('--db', default=RESULTS_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    find_parser = subparsers.add_parser('find', help="Print the results matching the filters")
+    for column in FILTER_COLUMNS:
+        find_parser.add_argument(f"--{column.replace('_', '-')}", dest=column, default=None)
+    find_parser.add_argument('--limit', type=int, default=100)
+
+    export_parser = subparsers.add_parser('export', help="Write every result as JSON lines, page by page")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--page-size', type=int, default=1000)
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    if args.command == 'find':
+        filters = {column: getattr(args, column) for column in FILTER_COLUMNS}
+        for result in store.query(limit=args.limit, **filters):
+            print(json.dumps(result, ensure_ascii=False))
+        return
+
+    exported = 0
+    after_id = 0
+    with open(args.output, 'w', encoding='utf-8') as f:
+        while True:
+            page = store.query(after_id=after_id, limit=args.page_size)
+            if not page:
+                break
+            for result in page:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+            exported += len(page)
+            after_id = page[-1]['_store']['id']
+    print(f"Exported {exported} result(s) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import threading
+import queue
+from multiprocessing import shared_memory
+import numpy as np
+
+def attach_shared_memory(name):
+    """
+    Open an existing block without handing its lifetime to this process.
+    Only the process that created a block unlinks it; workers just close their mapping.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the attachment with the resource tracker. Workers
+        # started by multiprocessing share the creator's tracker, so this only re-adds a
+        # name it already knows and the creator's unlink still clears it.
+        return shared_memory.SharedMemory(name=name)
+
+def make_descriptor(name, image, boxes=None, offset=0, persistent=False):
+    """The only thing that crosses the process boundary: where the pixels are and how to read them"""
+    return {
+        'name': name,
+        'persistent': persistent,
+        'offset': offset,
+        'shape': tuple(image.shape),
+        'dtype': image.dtype.str,
+        'boxes': [tuple(int(v) for v in box) for box in (boxes or [])],
+    }
+
+def view_image(buffer, descriptor):
+    """Wrap a shared buffer as a numpy array without copying"""
+    return np.ndarray(descriptor['shape'], dtype=np.dtype(descriptor['dtype']), buffer=buffer, offset=descriptor['offset'])
+
+def crops_from_descriptor(image, descriptor):
+    """Slice the crops listed in a descriptor; these are views into the shared page"""
+    return [image[y:y + h, x:x + w] for x, y, w, h in descriptor['boxes']]
+
+class SharedImage:
+    """
+    One decoded page copied once into its own shared memory block.
+    Use as a context manager in the producer: the block is unlinked on exit.
+    """
+
+    def __init__(self, image, boxes=None):
+        image = np.ascontiguousarray(image)
+        self.block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        view_image(self.block.buf, make_descriptor(self.block.name, image))[...] = image
+        self.descriptor = make_descriptor(self.block.name, image, boxes)
+
+    def close(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SharedImageRing:
+    """
+    Preallocated ring of fixed-size shared memory slots, so steady-state requests
+    neither create nor unlink blocks. A slot is held from `put` until `release`.
+    """
+
+    def __init__(self, slots=4, slot_bytes=32 * 1024 * 1024):
+        self.slot_bytes = slot_bytes
+        self.blocks = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slots)]
+        self.free_slots = queue.Queue()
+        for index in range(slots):
+            self.free_slots.put(index)
+        self.in_use = {}
+        self.lock = threading.Lock()
+
+    def put(self, image, boxes=None, timeout=None):
+        """Copy an image into a free slot and return its descriptor; blocks while the ring is full"""
+        image = np.ascontiguousarray(image)
+        if image.nbytes > self.slot_bytes:
+            raise ValueError(f"Image of {image.nbytes} bytes does not fit in a {self.slot_bytes}-byte slot")
+        index = self.free_slots.get(timeout=timeout)
+        block = self.blocks[index]
+        descriptor = make_descriptor(block.name, image, boxes, persistent=True)
+        view_image(block.buf, descriptor)[...] = image
+        with self.lock:
+            self.in_use[block.name] = index
+        return descriptor
+
+    def release(self, descriptor):
+        """Return the slot of a finished request to the ring"""
+        with self.lock:
+            index = self.in_use.pop(descriptor['name'], None)
+        if index is not None:
+            self.free_slots.put(index)
+
+    def close(self):
+        """Unlink every slot; call once when the producer shuts down"""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SharedImageReader:
+    """
+    Worker-side cache of attached blocks, so a ring slot is mapped once per worker
+    rather than once per request.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.closing = []
+
+    def open(self, descriptor):
+        """Return (page, crops) as zero-copy views for a descriptor"""
+        self.close_released()
+        block = self.blocks.get(descriptor['name'])
+        if block is None:
+            block = attach_shared_memory(descriptor['name'])
+            self.blocks[descriptor['name']] = block
+        image = view_image(block.buf, descriptor)
+        return image, crops_from_descriptor(image, descriptor)
+
+    def release(self, descriptor):
+        """
+        Done with a request. Ring slots stay mapped for reuse; one-off blocks are closed,
+        or closed on a later call if numpy views into them are still alive.
+        """
+        if descriptor.get('persistent'):
+            return
+        block = self.blocks.pop(descriptor['name'], None)
+        if block is not None:
+            self.closing.append(block)
+        self.close_released()
+
+    def close_released(self):
+        still_exported = []
+        for block in self.closing:
+            try:
+                block.close()
+            except BufferError:
+                still_exported.append(block)
+        self.closing = still_exported
+
+    def close(self):
+        self.closing.extend(self.blocks.values())
+        self.blocks = {}
+        self.close_released()
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# The modules live at the top of the repository
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from ocr_engines import OcrEngine, OcrWord
+
+SAMPLE_IMAGES = [os.path.join(ROOT, 'images', name) for name in ('HP0012.jpg', 'HP0006.jpg')]
+
+class StubOcrEngine(OcrEngine):
+    """
+    Deterministic stand-in for PaddleOCR, recording every call as (shape, det, cls).
+    With det, one word per blob of ink (with its box); without, one word for the crop.
+    The text describes the ink of the crop coarsely, so the same region read at another
+    resolution gives the same text.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def recognize(self, image, det=True, cls=False):
+        self.calls.append((image.shape, det, cls))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        ink = (gray < 128).astype(np.uint8)
+        if not ink.any():
+            return []
+        if not det:
+            return [OcrWord(self.describe(ink), 0.95, None)]
+        count, _, stats, _ = cv2.connectedComponentsWithStats(cv2.dilate(ink, np.ones((3, 9), np.uint8)))
+        words = []
+        for x, y, w, h, area in stats[1:].tolist():
+            if w > 4 and h > 4:
+                words.append(OcrWord(self.describe(ink[y:y + h, x:x + w]), 0.95,
+                                     [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]))
+        return words
+
+    def describe(self, ink):
+        return f"ink{int(ink.mean() * 5)}"
+
+    def classify_orientation(self, image):
+        self.calls.append((image.shape, 'orientation', None))
+        return '0', 0.99
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    """QuittanceProcessor without a model: replay engine swapped for StubOcrEngine, state in tmp_path"""
+    recording = tmp_path / 'recording.json'
+    recording.write_text('{}')
+    monkeypatch.setenv('OCR_ENGINE', 'replay')
+    monkeypatch.setenv('OCR_RECORDING', str(recording))
+    monkeypatch.setenv('DUPLICATE_ACTION', '')
+    monkeypatch.chdir(tmp_path)
+    from quittance_processor import QuittanceProcessor
+
+    instance = QuittanceProcessor()
+    instance.ocr = StubOcrEngine()
+    instance.RESULTS_DB = str(tmp_path / 'results.db')
+    return instance
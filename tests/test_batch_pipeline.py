@@ -0,0 +1,23 @@
+from batch_pipeline import BatchPipeline
+from conftest import SAMPLE_IMAGES
+
+def page_fields(result):
+    return {key: value for key, value in result.items() if key != 'deadline'}
+
+def test_pipeline_returns_the_sequential_results_in_input_order(processor, tmp_path):
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+    paths = SAMPLE_IMAGES * 2 + [str(broken)] + SAMPLE_IMAGES
+    sequential = [page_fields(processor.process_single_image(path)) for path in SAMPLE_IMAGES]
+
+    pipeline = BatchPipeline(processor, preprocess_workers=2, queue_depth=1)
+    results = pipeline.run(paths)
+
+    assert [page_fields(result) for result in results[:4] + results[5:]] == sequential * 3
+    assert results[4]['source_file'] == 'broken.jpg' and 'error' in results[4]
+
+    report = pipeline.report
+    assert report['pages'] == len(paths)
+    assert report['stages']['ocr']['items'] == len(paths)
+    assert report['stages']['preprocess']['items'] == len(paths) - 1
+    assert all(occupancy['peak_occupancy'] <= 1 for occupancy in report['queues'].values())
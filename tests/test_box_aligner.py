@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+from box_aligner import BoxAligner
+
+# Cells of a synthetic table (x, y, w, h); the configured boxes are drawn 4 px inside them
+CELLS = [(100 + col * 200, 100 + row * 60, 200, 60) for row in range(4) for col in range(3)]
+BOXES = {f"field_{index}": (x + 4, y + 4, w - 8, h - 8) for index, (x, y, w, h) in enumerate(CELLS)}
+
+def draw_table():
+    """
+    (page, text layer): the text runs to about 4 px from the cell borders, so a shift clips
+    it. The text layer holds the index of the cell + 1 on the text of each cell.
+    """
+    page = np.full((500, 800, 3), 255, dtype=np.uint8)
+    text = np.zeros((500, 800), dtype=np.uint8)
+    (width, height), _ = cv2.getTextSize("A1B2C3D4", cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)
+    scale = (CELLS[0][2] - 10) / width
+    for index, (x, y, w, h) in enumerate(CELLS):
+        cv2.rectangle(page, (x, y), (x + w, y + h), (0, 0, 0), 2)
+        glyphs = np.zeros_like(text)
+        cv2.putText(glyphs, "A1B2C3D4", (x + 4, y + (h + int(height * scale)) // 2), cv2.FONT_HERSHEY_SIMPLEX, scale, 255, 2)
+        text[glyphs > 127] = index + 1
+    page[text > 0] = 0
+    return page, text
+
+def shift_and_skew(image, dx, dy, angle, border):
+    matrix = cv2.getRotationMatrix2D((400, 250), angle, 1.0)
+    matrix[:, 2] += (dx, dy)
+    return cv2.warpAffine(image, matrix, (image.shape[1], image.shape[0]), flags=cv2.INTER_NEAREST, borderValue=border)
+
+def text_inside(text, index, box):
+    """Share of the text of cell `index` that lies inside `box`"""
+    x, y, w, h = box
+    return (text[y:y + h, x:x + w] == index + 1).sum() / (text == index + 1).sum()
+
+def test_cell_mode_recovers_text_clipped_by_shift_and_skew():
+    page, text = draw_table()
+    page = shift_and_skew(page, 8, 6, 0.3, (255, 255, 255))
+    text = shift_and_skew(text, 8, 6, 0.3, 0)
+    aligned = BoxAligner(page, mode='cell').align_boxes(BOXES)
+    for index, (field, box) in enumerate(BOXES.items()):
+        assert text_inside(text, index, box) < 0.97, field
+        assert text_inside(text, index, aligned[field]) == 1.0, field
+
+def test_offset_mode_measures_the_full_page_shift():
+    page, _ = draw_table()
+    page = shift_and_skew(page, 7, -5, 0.0, (255, 255, 255))
+    aligner = BoxAligner(page, mode='offset')
+    aligner.detect_lines()
+    dx, dy = aligner.page_offset(BOXES)
+    # Within the one pixel the 2 px ruling line leaves undecided
+    assert abs(dx - 7) <= 1 and abs(dy + 5) <= 1
+    aligned = aligner.align_boxes(BOXES)
+    x, y, w, h = BOXES['field_0']
+    assert aligned['field_0'] == (x + dx, y + dy, w, h)
+
+def test_unshifted_page_keeps_boxes_inside_their_cells():
+    page, _ = draw_table()
+    aligned = BoxAligner(page, mode='cell').align_boxes(BOXES)
+    for (cx, cy, cw, ch), field in zip(CELLS, BOXES):
+        x, y, w, h = aligned[field]
+        assert cx <= x and x + w <= cx + cw + 1
+        assert cy <= y and y + h <= cy + ch + 1
@@ -0,0 +1,30 @@
+import pytest
+
+from conftest import SAMPLE_IMAGES
+
+def crop_calls(engine):
+    """
+    (det, cls) of the field reads. Validation re-reads always classify and are disabled;
+    the recognition-only fast tier never does (a misread crop escalates to det + cls).
+    """
+    return [(det, cls) for shape, det, cls in engine.calls if det != 'orientation']
+
+@pytest.mark.parametrize('page_check', [True, False])
+def test_crop_angle_cls_follows_page_orientation_check(processor, page_check):
+    processor.VALIDATION_ENABLED = False
+    processor.PAGE_ORIENTATION_CHECK = page_check
+    result = processor.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom')
+
+    assert 'error' not in result
+    orientation_calls = [call for call in processor.ocr.calls if call[1] == 'orientation']
+    assert bool(orientation_calls) == page_check
+    # Crops are angle-classified exactly when the page was not turned upright first
+    assert crop_calls(processor.ocr)
+    assert {cls for det, cls in crop_calls(processor.ocr) if det} == {not page_check}
+
+@pytest.mark.parametrize('override', [True, False])
+def test_crop_angle_cls_override(processor, override):
+    processor.VALIDATION_ENABLED = False
+    processor.CROP_ANGLE_CLS = override
+    processor.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom')
+    assert {cls for det, cls in crop_calls(processor.ocr) if det} == {override}
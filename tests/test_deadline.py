@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import SAMPLE_IMAGES
+from deadline import Deadline
+
+FORMAT = 'hp0012_custom'
+
+class CountdownDeadline(Deadline):
+    """Deadline that has time left for the first `checks` calls to remaining(), then none"""
+
+    def __init__(self, checks):
+        super().__init__(60)
+        self.checks = checks
+
+    def remaining(self):
+        self.checks -= 1
+        return float('inf') if self.checks >= 0 else 0.0
+
+@pytest.fixture
+def page(processor):
+    return processor.preprocess_image(SAMPLE_IMAGES[0])
+
+def test_budget_exhausted_returns_the_priority_fields_and_flags_the_rest(processor, page):
+    processor.ROW_STRIP_OCR = False
+    processor.VALIDATION_ENABLED = False
+    ordered = processor.order_fields(processor.FIELD_BOXES_CONFIGS[FORMAT])
+
+    # The first field is always read; each of the next two needs one check of the deadline
+    result = processor.extract_all_fields(page, FORMAT, CountdownDeadline(2))
+
+    assert ordered[:3] == ['numero_quittance', 'num_contrat', 'prime_totale']
+    assert list(result['field_confidence']) == ordered[:3]
+    assert result['partial'] and result['unfinished_fields'] == ordered[3:]
+    assert result['ocr_metrics']['fields'] == 3
+
+def test_fields_read_with_their_row_strip_are_not_unfinished(processor, page, monkeypatch):
+    processor.ROW_STRIP_OCR = True
+    processor.VALIDATION_ENABLED = False
+    ordered = processor.order_fields(processor.FIELD_BOXES_CONFIGS[FORMAT])
+    # Every strip call reads all of its fields
+    monkeypatch.setattr(processor, 'read_row_strip',
+                        lambda image, field_boxes, strip, context: {field: ('1 000', 0.99) for field in strip})
+
+    # Time runs out once prime_totale is read: only its strip neighbours come for free
+    result = processor.extract_all_fields(page, FORMAT, CountdownDeadline(2))
+
+    prime_row = ['prime_base', 'prime_annexe', 'frais', 'taxe_base', 'taxes_annexes', 'fpcsr', 'fpac', 'fga']
+    read = list(result['field_confidence'])
+    assert read[:3] == ['numero_quittance', 'num_contrat', 'prime_totale']
+    assert set(read[3:]) == {'assurance'} | set(prime_row)
+    assert result['unfinished_fields'] == [field for field in ordered if field not in read]
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_IMAGES
+
+FORMAT = 'hp0012_custom'
+
+@pytest.fixture
+def oversized_sample(tmp_path):
+    """HP0012 upscaled 3x (3825x4950), as a 300-odd dpi scan of the same quittance"""
+    image = cv2.imread(SAMPLE_IMAGES[0])
+    path = tmp_path / 'HP0012_3x.jpg'
+    cv2.imwrite(str(path), cv2.resize(image, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC), [cv2.IMWRITE_JPEG_QUALITY, 95])
+    return str(path)
+
+def read_fields(processor, path, monkeypatch):
+    """ocr_metrics of the page and {field: (box, crop)} of the first read of every field, boxes in reference page pixels"""
+    crops = {}
+
+    def recording_crop_field(image, box, field):
+        crop = type(processor).crop_field(processor, image, box, field)
+        scale = processor.page_box_scale(image)
+        crops.setdefault(field, (np.array(box) / scale, crop))
+        return crop
+
+    monkeypatch.setattr(processor, 'crop_field', recording_crop_field)
+    result = processor.process_single_image(path, FORMAT)
+    return result['ocr_metrics'], crops
+
+def test_reference_scan_keeps_the_boxes_as_drawn(processor, monkeypatch):
+    processor.BOX_ALIGNMENT_MODE = None
+    metrics, crops = read_fields(processor, SAMPLE_IMAGES[0], monkeypatch)
+    assert metrics['page_scale'] == 1.0 and metrics['decode_scale'] == 1.0
+    boxes = processor.FIELD_BOXES_CONFIGS[FORMAT]
+    assert crops and all(np.array_equal(crops[field][0], boxes[field]) for field in boxes if field in crops)
+
+def test_reduced_decode_reads_the_fields_of_the_full_resolution_run(processor, monkeypatch, oversized_sample):
+    # Without snapping to the ruling lines, only the scale of the boxes decides where they land
+    processor.BOX_ALIGNMENT_MODE = None
+    processor.DECODE_TARGET_HEIGHT = 0
+    full_metrics, full = read_fields(processor, oversized_sample, monkeypatch)
+    processor.DECODE_TARGET_HEIGHT = 1600
+    reduced_metrics, reduced = read_fields(processor, oversized_sample, monkeypatch)
+
+    # The boxes follow the warped page width, not the decode factor
+    assert full_metrics['decode_scale'] == 1.0 and full_metrics['page_scale'] == pytest.approx(3, abs=0.01)
+    assert reduced_metrics['decode_scale'] == 0.5 and reduced_metrics['page_scale'] == pytest.approx(1.5, abs=0.01)
+
+    assert reduced.keys() == full.keys() and full
+    for field, (box, crop) in reduced.items():
+        full_box, full_crop = full[field]
+        assert np.abs(box - full_box).max() <= 1, field
+        # Same region of the quittance: the full-resolution crop shrunk to this one is nearly identical
+        shrunk = cv2.resize(full_crop, crop.shape[1::-1], interpolation=cv2.INTER_AREA)
+        assert np.abs(shrunk.astype(int) - crop).mean() < 6, field
@@ -0,0 +1,39 @@
+import random
+
+from duplicate_index import DuplicateIndex
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+def brute_force(hashes, query, max_distance):
+    return sorted((bin(value ^ query).count('1'), entry_id) for entry_id, value in enumerate(hashes)
+                  if bin(value ^ query).count('1') <= max_distance)
+
+def test_lookup_matches_a_brute_force_hamming_scan(tmp_path):
+    rng = random.Random(7)
+    # A small merge threshold so the queries hit both the sorted tables and the unsorted tail
+    index = DuplicateIndex(str(tmp_path / 'pages'), merge_every=300)
+    hashes = [rng.getrandbits(64) for _ in range(1000)]
+    for value in hashes:
+        index.add(value, {'hash': value})
+    assert 0 < index.sorted_count < len(index)
+
+    near = [flip_bits(rng.choice(hashes), rng.randint(0, 6), rng) for _ in range(200)]
+    far = [rng.getrandbits(64) for _ in range(200)]
+    for query in near + far:
+        assert index.find(query, max_distance=6, limit=len(hashes)) == brute_force(hashes, query, 6)
+    assert all(index.find(query, max_distance=6) for query in near)
+    assert not any(index.find(query, max_distance=6) for query in far)
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'pages')
+    index = DuplicateIndex(path)
+    first = index.add(0x0123456789ABCDEF, {'source_file': 'a.jpg'})
+    index.add(0xFEDCBA9876543210, {'source_file': 'b.jpg'})
+
+    reopened = DuplicateIndex(path)
+    assert len(reopened) == 2
+    assert reopened.find(0x0123456789ABCDEF ^ 0b101) == [(2, first)]
+    assert reopened.get(first) == {'source_file': 'a.jpg'}
@@ -0,0 +1,26 @@
+from conftest import SAMPLE_IMAGES
+
+def test_reused_page_still_streams_its_format(processor, tmp_path):
+    processor.DUPLICATE_ACTION = 'reuse'
+    processor.DUPLICATE_INDEX_PATH = str(tmp_path / 'duplicates')
+    first_events = []
+    first = processor.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom',
+                                           on_progress=lambda event, data: first_events.append((event, data)))
+    assert 'reused' not in first
+
+    events = []
+    second = processor.process_single_image(SAMPLE_IMAGES[0], on_progress=lambda event, data: events.append((event, data)))
+    assert second['reused']
+    assert [event for event, _ in events] == ['format']
+    assert events[0][1]['format'] == first_events[0][1]['format'] == 'hp0012_custom'
+
+def test_duplicate_check_is_off_by_default(processor, tmp_path, monkeypatch):
+    monkeypatch.delenv('DUPLICATE_ACTION')
+    fresh = type(processor)()
+    fresh.ocr = processor.ocr
+    fresh.RESULTS_DB = processor.RESULTS_DB
+    assert fresh.DUPLICATE_ACTION is None
+
+    result = fresh.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom')
+    assert 'duplicate_of' not in result
+    assert not (tmp_path / 'duplicate_index').exists()
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, SAMPLE_IMAGES
+from field_boxes import FIELD_BOXES_CONFIGS, resolve_fields
+
+def test_formats_are_listed_without_opencv_or_an_engine():
+    code = "import sys, field_boxes; print(sorted(field_boxes.FIELD_BOXES_CONFIGS)); print('cv2' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    formats, cv2_loaded = output.strip().splitlines()
+    assert formats == str(sorted(FIELD_BOXES_CONFIGS)) and cv2_loaded == 'False'
+
+def test_processor_gets_its_own_copy_of_the_configs(processor):
+    assert processor.FIELD_BOXES_CONFIGS == FIELD_BOXES_CONFIGS
+    processor.FIELD_BOXES_CONFIGS['hp0012_custom']['prime_totale'] = (0, 0, 1, 1)
+    assert FIELD_BOXES_CONFIGS['hp0012_custom']['prime_totale'] != (0, 0, 1, 1)
+
+def test_requested_names_resolve_to_box_fields():
+    assert resolve_fields('hp0012_custom', ['numero_quittance', 'num_contrat']) == ['numero_quittance', 'num_contrat']
+    # A group name expands to its box fields, once each
+    assert resolve_fields('hp0012_custom', ['date_effet', 'date_effet_fin', 'prime']) == [
+        'date_effet_debut', 'date_effet_fin', 'prime_base', 'prime_annexe', 'prime_totale']
+    with pytest.raises(ValueError, match="Unknown field 'montant'"):
+        resolve_fields('hp0012_custom', ['numero_quittance', 'montant'])
+
+def test_field_subset_reads_and_returns_only_those_fields(processor):
+    result = processor.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom', fields=['numero_quittance', 'date_effet'])
+
+    assert list(result['field_confidence']) == ['numero_quittance', 'date_effet_debut', 'date_effet_fin']
+    extracted = {key for key in result if key not in ('validation', 'field_confidence', 'ocr_metrics', 'partial',
+                                                      'unfinished_fields', 'source_file', 'detected_format', 'deadline')}
+    assert extracted == {'numero_quittance', 'periode_assurance'}
+    assert set(result['periode_assurance']) == {'date_debut', 'date_fin'}
+    assert result['ocr_metrics']['fields'] == 3
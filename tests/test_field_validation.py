@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+import pytest
+
+from field_validation import parse_amount
+
+@pytest.mark.parametrize('text, expected', [
+    ('8,002D', Decimal('8.002')),
+    ('1 250,000 DT', Decimal('1250.000')),
+    ('1.250,000', Decimal('1250.000')),
+    # Misread digits next to real ones are corrected
+    ('8,OO2D', Decimal('8.002')),
+    ('1O', Decimal('10')),
+    ('l0', Decimal('10')),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+@pytest.mark.parametrize('text', ['S', 'O', 'SO', 'Oil', 'SOS1', 'D', '', None])
+def test_letters_alone_are_not_amounts(text):
+    assert parse_amount(text) is None
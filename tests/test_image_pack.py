@@ -0,0 +1,44 @@
+import gc
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_IMAGES
+from image_pack import ImagePack, build_pack
+
+@pytest.fixture
+def pack_path(tmp_path):
+    source_dir = tmp_path / 'images'
+    source_dir.mkdir()
+    for image_path in SAMPLE_IMAGES:
+        shutil.copy(image_path, source_dir)
+    path = str(tmp_path / 'samples.qpack')
+    assert build_pack(str(source_dir), path) == len(SAMPLE_IMAGES)
+    return path
+
+def test_close_with_live_views_keeps_them_valid(pack_path):
+    with ImagePack(pack_path) as pack:
+        views = [pack.encoded(entry) for entry in pack.entries]
+        names = [entry['name'] for entry in pack.entries]
+    # Leaving the block closed the pack without a BufferError
+    for name, view in zip(names, views):
+        with open(next(path for path in SAMPLE_IMAGES if path.endswith(name)), 'rb') as f:
+            assert view.tobytes() == f.read()
+    del views
+    gc.collect()
+
+def test_closed_pack_refuses_new_reads(pack_path):
+    pack = ImagePack(pack_path)
+    entry = pack.entries[0]
+    assert pack.decode(entry).shape[2] == 3
+    pack.close()
+    pack.close()
+    with pytest.raises(ValueError, match='closed'):
+        pack.decode(entry)
+
+def test_decoded_images_do_not_hold_the_mapping(pack_path):
+    pack = ImagePack(pack_path)
+    image, scale = pack.decode_scaled(pack.entries[0])
+    pack.close()
+    assert isinstance(image, np.ndarray) and scale == 1.0
@@ -0,0 +1,51 @@
+import json
+import os
+
+from inbox_daemon import InboxDaemon
+
+class FakeProcessor:
+    IMAGE_EXTENSIONS = ['.jpg']
+
+    def __init__(self):
+        self.processed = []
+
+    def process_document(self, path):
+        self.processed.append(path)
+        yield {'numero_quittance': 'Q1', 'page_index': 0}
+
+def drop(daemon, name, content):
+    path = f"{daemon.inbox_dir}/{name}"
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+def test_manifest_is_appended_one_line_per_file(tmp_path):
+    daemon = InboxDaemon(str(tmp_path / 'inbox'), str(tmp_path / 'out.jsonl'), processor=FakeProcessor())
+    for index in range(3):
+        path = drop(daemon, f"q{index}.jpg", bytes([index]) * 10)
+        daemon.handle_file(path, os.stat(path))
+
+    with open(daemon.manifest_file, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['path'] for line in lines] == ['q0.jpg', 'q1.jpg', 'q2.jpg']
+    assert all(line['status'] == 'done' for line in lines)
+
+def test_restart_skips_done_files_and_drops_a_torn_line(tmp_path):
+    processor = FakeProcessor()
+    daemon = InboxDaemon(str(tmp_path / 'inbox'), str(tmp_path / 'out.jsonl'), processor=processor)
+    path = drop(daemon, 'q.jpg', b'same content')
+    daemon.handle_file(path, os.stat(path))
+    # A crash in the middle of the next append
+    with open(daemon.manifest_file, 'a', encoding='utf-8') as f:
+        f.write('{"path": "other.jpg", "sta')
+
+    restarted = InboxDaemon(str(tmp_path / 'inbox'), str(tmp_path / 'out.jsonl'), processor=processor)
+    assert len(restarted.manifest) == 1
+    path = drop(restarted, 'again.jpg', b'same content')
+    assert restarted.handle_file(path, os.stat(path)) == 'done'
+    assert len(processor.processed) == 1
+
+    path = drop(restarted, 'new.jpg', b'new content')
+    restarted.handle_file(path, os.stat(path))
+    with open(restarted.manifest_file, encoding='utf-8') as f:
+        assert [json.loads(line)['path'] for line in f] == ['q.jpg', 'new.jpg']
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import StubOcrEngine
+from ocr_engines import OcrWord, RecordReplayEngine
+
+def text_crop(text):
+    crop = np.full((40, 300, 3), 255, np.uint8)
+    cv2.putText(crop, text, (8, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return crop
+
+@pytest.fixture(scope='module')
+def crops():
+    return [text_crop(text) for text in ('Q-2024-0012', '01/06/2024', '12 500,00 DA')]
+
+def test_replay_serves_what_was_recorded(tmp_path, crops):
+    path = str(tmp_path / 'recording.json')
+    recorder = RecordReplayEngine(path, StubOcrEngine(), mode='record')
+    recorded = [recorder.recognize(crop) for crop in crops] + [recorder.recognize(crops[0], det=False)]
+    orientation = recorder.classify_orientation(crops[1])
+    recorder.save()
+    assert recorder.stats['recorded'] == 5
+
+    replay = RecordReplayEngine(path, mode='replay')
+    assert [replay.recognize(crop) for crop in crops] + [replay.recognize(crops[0], det=False)] == recorded
+    assert replay.classify_orientation(crops[1]) == orientation
+    assert replay.stats['hits'] == 5 and replay.stats['misses'] == 0
+
+    # Other flags, or other pixels, are a different call
+    assert replay.recognize(crops[0], cls=True) == []
+    assert replay.recognize(np.ascontiguousarray(crops[0][:, ::-1])) == []
+    assert replay.classify_orientation(crops[0]) == (None, 0.0)
+    assert replay.stats['misses'] == 3
+
+def test_batched_and_single_calls_share_their_entries(tmp_path, crops):
+    path = str(tmp_path / 'recording.json')
+    recorder = RecordReplayEngine(path, StubOcrEngine(), mode='record')
+    batch = recorder.recognize_batch(crops[:2])
+    single = recorder.recognize(crops[2], det=False)
+    recorder.save()
+
+    replay = RecordReplayEngine(path, mode='replay')
+    assert [replay.recognize(crop, det=False) for crop in crops[:2]] == [[word] for word in batch]
+    assert replay.recognize_batch(crops) == batch + single
+    assert replay.recognize_batch([crops[0][:10]]) == [OcrWord('', 0.0, None)]
+
+def test_replay_needs_a_recording_and_record_an_engine(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        RecordReplayEngine(str(tmp_path / 'missing.json'), mode='replay')
+    with pytest.raises(ValueError):
+        RecordReplayEngine(str(tmp_path / 'recording.json'), mode='record')
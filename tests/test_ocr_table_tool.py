@@ -0,0 +1,128 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_IMAGES, StubOcrEngine
+from benchmark import prepare_table_inputs
+from ocr_engines import OcrEnginePool
+from OcrToTableTool import OcrToTableTool
+
+class RecordingEngine(StubOcrEngine):
+    """StubOcrEngine that also keeps every image it was given, in order"""
+
+    def __init__(self):
+        super().__init__()
+        self.images = []
+
+    def recognize(self, image, det=True, cls=False):
+        self.images.append(image.copy())
+        return super().recognize(image, det=det, cls=cls)
+
+class StubEnginePool(OcrEnginePool):
+    def create_engine(self):
+        self.engine = RecordingEngine()
+        return self.engine
+
+@pytest.fixture(scope='module')
+def table_inputs(tmp_path_factory):
+    """(thresholded, page) of each sample, as `python benchmark.py table` builds them"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp('inputs'))
+        return [prepare_table_inputs(image_path) for image_path in SAMPLE_IMAGES]
+
+def run_tool(thresholded, page, **kwargs):
+    pool = StubEnginePool()
+    tool = OcrToTableTool(thresholded, page.copy(), engine_pool=pool, **kwargs)
+    tool.execute()
+    return tool, pool.engine
+
+def test_page_enhancement_runs_once_and_slices_every_crop(table_inputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    thresholded, page = table_inputs[0]
+    enhanced = []
+    preprocess_image = OcrToTableTool.preprocess_image
+
+    def counting_preprocess(tool, image):
+        enhanced.append(image.shape)
+        return preprocess_image(tool, image)
+
+    monkeypatch.setattr(OcrToTableTool, 'preprocess_image', counting_preprocess)
+    crop_tool, crop_engine = run_tool(thresholded, page, enhance_mode='crop')
+    crop_calls = len(enhanced)
+    enhanced.clear()
+    page_tool, page_engine = run_tool(thresholded, page, enhance_mode='page')
+
+    assert crop_calls == len(crop_engine.images) > 1 and len(enhanced) == 1
+    region_top, region_left, region = page_tool.enhanced_region
+    assert region.shape == enhanced[0]
+    # Same crops, read from the enhanced region
+    boxes = [box for row in page_tool.rows for box in row]
+    bounds = [page_tool.crop_bounds(box) for box in boxes]
+    expected = [region[top - region_top:bottom - region_top, left - region_left:right - region_left]
+                for top, bottom, left, right in bounds]
+    assert Counter(image.shape for image in page_engine.images) == Counter(image.shape for image in crop_engine.images)
+    assert all(any(np.array_equal(image, crop) for crop in expected) for image in page_engine.images)
+
+def baseline_rows(boxes):
+    """Row grouping of the original implementation: sort by top, 20 px from the row's first box"""
+    boxes = sorted(boxes, key=lambda box: box[1])
+    rows = []
+    current_row = [boxes[0]]
+    current_y = boxes[0][1]
+    for box in boxes[1:]:
+        if abs(box[1] - current_y) < 20:
+            current_row.append(box)
+        else:
+            rows.append(sorted(current_row, key=lambda b: b[0]))
+            current_row = [box]
+            current_y = box[1]
+    rows.append(sorted(current_row, key=lambda b: b[0]))
+    return rows
+
+@pytest.mark.parametrize('sample', range(len(SAMPLE_IMAGES)))
+def test_rows_and_crops_match_the_original_grouping(table_inputs, tmp_path, monkeypatch, sample):
+    monkeypatch.chdir(tmp_path)
+    thresholded, page = table_inputs[sample]
+    tool, engine = run_tool(thresholded, page, enhance_mode='crop')
+
+    boxes = [tuple(int(v) for v in box) for box in tool.bounding_boxes]
+    expected = baseline_rows(boxes)
+    assert [[tuple(int(v) for v in box) for box in row] for row in tool.rows] == expected
+
+    # Every box is read once, from the same crop as the original
+    expected_shapes = [page[y - 5:y - 5 + h, x:x + w].shape for row in expected for x, y, w, h in row]
+    assert Counter(image.shape for image in engine.images) == Counter(expected_shapes)
+
+@pytest.mark.parametrize('sample', range(len(SAMPLE_IMAGES)))
+def test_only_single_line_crops_skip_detection(table_inputs, tmp_path, monkeypatch, sample):
+    monkeypatch.chdir(tmp_path)
+    thresholded, page = table_inputs[sample]
+    tool, engine = run_tool(thresholded, page, enhance_mode='crop')
+
+    boxes = [box for row in tool.rows for box in row]
+    lines = [tool.count_text_lines(tool.crop_bounds(box)) for box in boxes]
+    shapes = [image.shape for image in engine.images]
+    dets = [det for shape, det, cls in engine.calls if det != 'orientation']
+    median_height = np.median(tool.bounding_boxes[:, 3])
+
+    single_line = [i for i, box in enumerate(boxes) if lines[i] == 1 and box[3] <= 1.8 * median_height]
+    multi_line = Counter(shapes_of(tool, boxes, i) for i in range(len(boxes)) if lines[i] > 1)
+    detected = Counter(shape for shape, det in zip(shapes, dets) if det)
+    assert multi_line and all(detected[shape] >= count for shape, count in multi_line.items())
+    assert [shape for shape, det in zip(shapes, dets) if not det] == [shapes_of(tool, boxes, i) for i in single_line]
+
+def shapes_of(tool, boxes, index):
+    top, bottom, left, right = tool.crop_bounds(boxes[index])
+    return (bottom - top, right - left, 3)
+
+def test_two_line_crop_of_median_height_keeps_detection():
+    # Two short lines in a box barely taller than the others: not a rec-only crop
+    thresholded = np.zeros((200, 400), np.uint8)
+    page = np.full((200, 400, 3), 255, np.uint8)
+    tool = OcrToTableTool(thresholded, page, engine_pool=StubEnginePool())
+    thresholded[30:37, 20:200] = 255
+    thresholded[40:47, 20:200] = 255
+    thresholded[120:134, 20:200] = 255
+    assert tool.count_text_lines((25, 50, 20, 200)) == 2
+    assert tool.count_text_lines((115, 140, 20, 200)) == 1
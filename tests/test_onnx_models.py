@@ -0,0 +1,15 @@
+import sys
+
+import pytest
+
+from onnx_models import backend_options
+
+def test_paddle_backend_needs_no_onnxruntime(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'onnxruntime', None)
+    assert backend_options('paddle') == {}
+
+@pytest.mark.parametrize('backend', ['onnx', 'onnx_int8'])
+def test_onnx_backends_explain_the_missing_extra(monkeypatch, backend):
+    monkeypatch.setitem(sys.modules, 'onnxruntime', None)
+    with pytest.raises(ImportError, match='requirements-onnx.txt'):
+        backend_options(backend)
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import SAMPLE_IMAGES
+from debug_sink import DebugArtifactSink
+
+class CapturingSink(DebugArtifactSink):
+    """Collects every page and keeps the finished requests in memory instead of writing them"""
+
+    def __init__(self):
+        super().__init__(sample_rate=1.0)
+        self.finished = []
+
+    def finish(self, request, error=None, min_confidence=None):
+        self.finished.append(request)
+        return True
+
+def artifact_names(sink):
+    return {request.label: sorted(name for name, _ in request.artifacts) for request in sink.finished}
+
+def test_concurrent_pages_keep_their_own_metrics_and_debug_crops(processor):
+    processor.debug_sink = CapturingSink()
+    expected = {path: processor.process_single_image(path)['ocr_metrics'] for path in SAMPLE_IMAGES}
+    expected_artifacts = artifact_names(processor.debug_sink)
+    expected_totals = dict(processor.ocr_stats)
+    assert all(metrics['ocr_calls'] for metrics in expected.values())
+
+    processor.debug_sink = CapturingSink()
+    paths = SAMPLE_IMAGES * 4
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(processor.process_single_image, paths))
+
+    for path, result in zip(paths, results):
+        assert result['ocr_metrics'] == expected[path]
+    assert len(processor.debug_sink.finished) == len(paths)
+    for request in processor.debug_sink.finished:
+        assert sorted(name for name, _ in request.artifacts) == expected_artifacts[request.label]
+    assert processor.ocr_stats == {key: value * 5 for key, value in expected_totals.items()}
@@ -0,0 +1,28 @@
+import pytest
+from PIL import Image
+
+from conftest import SAMPLE_IMAGES
+from page_source import REFERENCE_PAGE_WIDTH, iter_pages
+
+pytest.importorskip('pypdfium2')
+
+@pytest.mark.parametrize('scan_dpi', [100, 300])
+def test_pdf_pages_render_at_the_reference_width(tmp_path, scan_dpi):
+    # The same scan embedded at different resolutions gives pages of different sizes in points
+    pdf_path = tmp_path / 'quittance.pdf'
+    with Image.open(SAMPLE_IMAGES[0]) as scan:
+        scan.convert('RGB').save(pdf_path, resolution=scan_dpi)
+        aspect = scan.height / scan.width
+
+    pages = list(iter_pages(str(pdf_path)))
+    assert len(pages) == 1
+    height, width = pages[0][1].shape[:2]
+    assert width == REFERENCE_PAGE_WIDTH
+    assert abs(height - REFERENCE_PAGE_WIDTH * aspect) <= 1
+
+def test_pdf_dpi_overrides_the_reference_width(tmp_path):
+    pdf_path = tmp_path / 'quittance.pdf'
+    with Image.open(SAMPLE_IMAGES[0]) as scan:
+        scan.convert('RGB').save(pdf_path, resolution=150)
+    page = next(iter_pages(str(pdf_path), dpi=75))[1]
+    assert abs(page.shape[1] - REFERENCE_PAGE_WIDTH / 2) <= 1
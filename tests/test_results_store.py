@@ -0,0 +1,42 @@
+from results_store import INSERT, ResultsStore, result_row
+
+def make_store(tmp_path, processed_times):
+    """Store with one row per processing time, inserted in the order given"""
+    store = ResultsStore(str(tmp_path / 'results.db'))
+    store.insert([result_row({'numero_quittance': f'Q{index}', 'detected_format': 'hp0012_custom'}, None, processed_at)
+                  for index, processed_at in enumerate(processed_times)])
+    return store
+
+def page_through(store, page_size, **kwargs):
+    seen = []
+    after_id, after_time = 0, None
+    while True:
+        page = store.query(after_id=after_id, after_time=after_time, limit=page_size, **kwargs)
+        if not page:
+            return seen
+        seen.extend(page)
+        after_id, after_time = page[-1]['_store']['id'], page[-1]['_store']['processed_at']
+
+def test_time_range_filters_rows_inserted_out_of_order(tmp_path):
+    # Ids do not follow processing time: a late import of older results, then ties
+    times = [300.0, 100.0, 250.0, 200.0, 200.0, 50.0, 400.0, 200.0, 150.0]
+    store = make_store(tmp_path, times)
+
+    rows = page_through(store, 2, since=100.0, until=300.0)
+    expected = sorted((t, i + 1) for i, t in enumerate(times) if 100.0 <= t < 300.0)
+    assert [(row['_store']['processed_at'], row['_store']['id']) for row in rows] == expected
+
+    assert page_through(store, 3, since=500.0) == []
+    assert [row['numero_quittance'] for row in page_through(store, 1, until=100.0)] == ['Q5']
+
+def test_time_range_combines_with_filters(tmp_path):
+    store = make_store(tmp_path, [30.0, 10.0, 20.0])
+    with store.lock, store.connection:
+        store.connection.execute(INSERT, result_row({'numero_quittance': 'Q9', 'detected_format': 'format_1'}, None, 15.0))
+    rows = page_through(store, 1, since=10.0, format='hp0012_custom')
+    assert [row['numero_quittance'] for row in rows] == ['Q1', 'Q2', 'Q0']
+
+def test_without_time_range_pages_by_id(tmp_path):
+    store = make_store(tmp_path, [30.0, 10.0, 20.0])
+    ids = [row['_store']['id'] for row in store.query(after_id=1)]
+    assert ids == [2, 3]
@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import SAMPLE_IMAGES, StubOcrEngine
+from crop_planner import plan_row_strips, split_strip_words
+from field_boxes import FIELD_BOXES_CONFIGS
+from ocr_engines import OcrWord, RecordReplayEngine
+
+def word(text, left, right):
+    return OcrWord(text, 0.95, [[left, 2], [right, 2], [right, 20], [left, 20]])
+
+BOXES = {'prime': (100, 10, 80, 30), 'taxe': (200, 10, 60, 30), 'total': (280, 10, 70, 30)}
+
+def test_prime_row_of_hp0012_is_planned_as_one_strip():
+    strips = plan_row_strips(FIELD_BOXES_CONFIGS['hp0012_custom'])
+    assert ('prime_base', 'prime_annexe', 'frais', 'taxe_base', 'taxes_annexes',
+            'fpcsr', 'fpac', 'fga', 'prime_totale') in strips
+
+def test_words_go_to_the_box_holding_them():
+    # Word boxes are relative to the strip, whose left edge is at x=100 on the page
+    words = [word('12', 5, 30), word('500', 35, 70), word('80', 110, 150), word('LABEL', 162, 176), word('1 000', 185, 240)]
+    assigned, unresolved = split_strip_words(words, BOXES, list(BOXES), 100)
+
+    assert {field: [w.text for w in found] for field, found in assigned.items()} == {
+        'prime': ['12', '500'], 'taxe': ['80'], 'total': ['1 000']}
+    assert unresolved == set()
+
+def test_word_across_a_border_leaves_both_fields_to_their_own_crop():
+    words = [word('12', 5, 30), word('5080', 60, 130)]
+    assigned, unresolved = split_strip_words(words, BOXES, list(BOXES), 100)
+    assert unresolved == {'prime', 'taxe'}
+    assert [w.text for w in assigned['prime']] == ['12'] and assigned['taxe'] == []
+
+def test_words_without_boxes_resolve_nothing():
+    assigned, unresolved = split_strip_words([OcrWord('12 80', 0.95, None)], BOXES, list(BOXES), 100)
+    assert unresolved == set(BOXES)
+
+def page_fields(result):
+    return {key: value for key, value in result.items() if key not in ('ocr_metrics', 'deadline')}
+
+def test_replayed_pages_give_the_same_fields_with_and_without_strips(processor, tmp_path):
+    recording = str(tmp_path / 'pages.json')
+    processor.ROW_STRIP_OCR = False
+    processor.ocr = RecordReplayEngine(recording, StubOcrEngine(), mode='record')
+    recorded = [page_fields(processor.process_single_image(path)) for path in SAMPLE_IMAGES]
+    processor.ocr.save()
+
+    processor.ocr = RecordReplayEngine(recording, mode='replay')
+    for row_strips in (False, True):
+        processor.ROW_STRIP_OCR = row_strips
+        replayed = [page_fields(processor.process_single_image(path)) for path in SAMPLE_IMAGES]
+        assert replayed == recorded
+    assert processor.ocr.stats['hits'] and processor.ocr.stats['misses']
@@ -0,0 +1,60 @@
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_IMAGES
+from shared_images import SharedImage, SharedImageReader, SharedImageRing, attach_shared_memory
+
+BOXES = [(10, 20, 300, 40), (400, 500, 120, 30)]
+
+def crop_sums(descriptor):
+    """Worker side: read the page and its crops from shared memory, return checksums"""
+    reader = SharedImageReader()
+    page, crops = reader.open(descriptor)
+    sums = int(page.sum()), [int(crop.sum()) for crop in crops]
+    del page, crops
+    reader.release(descriptor)
+    reader.close()
+    return sums
+
+@pytest.fixture(scope='module')
+def page():
+    return cv2.imread(SAMPLE_IMAGES[0])
+
+def expected_sums(page):
+    return int(page.sum()), [int(page[y:y + h, x:x + w].sum()) for x, y, w, h in BOXES]
+
+def test_worker_process_reads_the_page_and_crops_from_a_shared_image(page):
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork')) as pool:
+        with SharedImage(page, BOXES) as shared:
+            assert pool.submit(crop_sums, shared.descriptor).result() == expected_sums(page)
+            name = shared.descriptor['name']
+    # The producer unlinked the block on exit
+    with pytest.raises(FileNotFoundError):
+        attach_shared_memory(name)
+
+def test_ring_reuses_its_slots_and_blocks_while_full(page):
+    with SharedImageRing(slots=2, slot_bytes=page.nbytes) as ring:
+        first = ring.put(page, BOXES)
+        second = ring.put(page[::-1].copy(), BOXES)
+        with pytest.raises(queue.Empty):
+            ring.put(page, timeout=0.01)
+        with pytest.raises(ValueError):
+            ring.put(np.zeros(page.nbytes + 1, np.uint8))
+
+        reader = SharedImageReader()
+        assert crop_sums(second) == expected_sums(page[::-1])
+        image, crops = reader.open(first)
+        assert np.array_equal(image, page) and np.array_equal(crops[1], page[500:530, 400:520])
+        # Ring slots stay mapped in the reader after the request
+        del image, crops
+        reader.release(first)
+        assert first['name'] in reader.blocks
+
+        ring.release(first)
+        assert ring.put(page)['name'] == first['name']
+        reader.close()
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import ROOT
+
+def test_warm_up_runs_every_ocr_path_once(processor):
+    processor.warm_up()
+    assert [call[1:] for call in processor.ocr.calls] == [(False, False), (True, False), ('orientation', None)]
+
+    processor.ocr.calls.clear()
+    processor.PAGE_ORIENTATION_CHECK = False
+    processor.warm_up()
+    # Without the page check, crops go through the angle classifier instead
+    assert [call[1:] for call in processor.ocr.calls] == [(False, False), (True, True)]
+
+def test_api_module_loads_without_the_heavy_modules():
+    pytest.importorskip('fastapi')
+    code = ("import sys, main_simple; "
+            "print([name for name in ('cv2', 'cloudinary', 'paddleocr', 'quittance_processor') if name in sys.modules])")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]'
+
+@pytest.fixture
+def api(monkeypatch):
+    """main_simple with its engine state reset"""
+    pytest.importorskip('fastapi')
+    import main_simple
+    monkeypatch.setattr(main_simple, '_processor', None)
+    monkeypatch.setattr(main_simple, '_engine_ready', threading.Event())
+    monkeypatch.setattr(main_simple, 'engine_state', {'status': 'starting', 'error': None, 'timings': {}})
+    return main_simple
+
+def test_requests_wait_for_the_warm_processor(api, processor, monkeypatch):
+    from fastapi import HTTPException
+    import quittance_processor
+
+    with pytest.raises(HTTPException) as loading:
+        api.get_processor()
+    assert loading.value.status_code == 503
+
+    monkeypatch.setattr(quittance_processor, 'QuittanceProcessor', lambda: processor)
+    api.load_engine()
+    assert api.engine_state['status'] == 'ready' and api.get_processor() is processor
+    assert {'import_quittance_processor', 'engine_init', 'engine_warmup'} <= set(api.engine_state['timings'])
+    assert processor.ocr.calls
+
+def test_failed_engine_load_is_reported(api, monkeypatch):
+    from fastapi import HTTPException
+    import quittance_processor
+
+    def broken():
+        raise RuntimeError('no model files')
+
+    monkeypatch.setattr(quittance_processor, 'QuittanceProcessor', broken)
+    api.load_engine()
+    assert api.engine_state == {'status': 'failed', 'error': 'no model files', 'timings': api.engine_state['timings']}
+    with pytest.raises(HTTPException) as failed:
+        api.get_processor()
+    assert failed.value.status_code == 503 and 'no model files' in failed.value.detail
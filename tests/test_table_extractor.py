@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_IMAGES
+from TableExtractor import TableExtractor
+
+@pytest.mark.parametrize('image_path', SAMPLE_IMAGES)
+def test_compact_mode_warps_the_same_page(tmp_path, monkeypatch, image_path):
+    monkeypatch.chdir(tmp_path)
+    full = TableExtractor(image_path)
+    page = full.execute()
+    compact = TableExtractor(image_path, compact=True)
+    compact_page = compact.execute()
+
+    assert np.array_equal(compact.contour_with_max_area, full.contour_with_max_area)
+    assert np.array_equal(compact_page, page)
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+from conftest import ROOT
+from onnx_models import apply_onnx_threads
+from thread_budget import THREAD_ENV_VARS
+
+# Records the BLAS/OpenMP variables at the moment numpy and cv2 are first imported
+WATCH_IMPORTS = """
+import json, os, sys
+seen = {}
+class Watch:
+    def find_spec(self, name, path=None, target=None):
+        if name in ('numpy', 'cv2') and name not in seen:
+            seen[name] = {var: os.environ.get(var) for var in %r}
+        return None
+sys.meta_path.insert(0, Watch())
+import %s
+print(json.dumps(seen))
+"""
+
+def test_entry_point_sets_thread_env_before_numpy_loads():
+    env = dict(os.environ, OCR_WORKERS='1', OCR_THREADS_PER_WORKER='3')
+    for name in THREAD_ENV_VARS:
+        env.pop(name, None)
+    output = subprocess.run([sys.executable, '-c', WATCH_IMPORTS % (THREAD_ENV_VARS, 'quittance_processor')],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    seen = json.loads(output.strip().splitlines()[-1])
+    assert set(seen) == {'numpy', 'cv2'}
+    for variables in seen.values():
+        assert variables == {name: '3' for name in THREAD_ENV_VARS}
+
+def test_thread_variables_set_by_the_operator_are_kept():
+    env = dict(os.environ, OMP_NUM_THREADS='2')
+    for name in THREAD_ENV_VARS[1:] + ['OCR_WORKERS', 'OCR_THREADS_PER_WORKER']:
+        env.pop(name, None)
+    script = WATCH_IMPORTS % (THREAD_ENV_VARS, 'quittance_processor') + """
+from thread_budget import ThreadBudget
+ThreadBudget.from_env().apply()
+print(json.dumps({var: os.environ.get(var) for var in %r}))
+""" % THREAD_ENV_VARS
+    lines = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                           capture_output=True, text=True, check=True).stdout.strip().splitlines()
+    seen, after_apply = json.loads(lines[-2]), json.loads(lines[-1])
+    default = str(os.cpu_count() or 1)
+    for variables in list(seen.values()) + [after_apply]:
+        assert variables == dict({name: default for name in THREAD_ENV_VARS}, OMP_NUM_THREADS='2')
+
+class FakeSession:
+    def __init__(self, path, sess_options=None, providers=None):
+        self.path = path
+        self.options = sess_options
+
+    def get_inputs(self):
+        return ['input']
+
+def test_onnx_sessions_get_the_thread_budget(monkeypatch):
+    fake_ort = types.SimpleNamespace(SessionOptions=types.SimpleNamespace, InferenceSession=FakeSession)
+    monkeypatch.setitem(sys.modules, 'onnxruntime', fake_ort)
+    paddle_ocr = types.SimpleNamespace(text_detector=types.SimpleNamespace(),
+                                       text_recognizer=types.SimpleNamespace())
+    options = {'use_onnx': True, 'cpu_threads': 2, 'det_model_dir': 'det.onnx',
+               'rec_model_dir': 'rec.onnx', 'cls_model_dir': 'cls.onnx'}
+    apply_onnx_threads(paddle_ocr, options)
+
+    for predictor, path in ((paddle_ocr.text_detector, 'det.onnx'), (paddle_ocr.text_recognizer, 'rec.onnx')):
+        assert predictor.predictor.path == path
+        assert predictor.predictor.options.intra_op_num_threads == 2
+        assert predictor.input_tensor == 'input'
+
+def test_paddle_backend_sessions_are_left_alone():
+    paddle_ocr = types.SimpleNamespace(text_detector=types.SimpleNamespace())
+    apply_onnx_threads(paddle_ocr, {'cpu_threads': 2})
+    assert not hasattr(paddle_ocr.text_detector, 'predictor')
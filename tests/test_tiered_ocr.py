@@ -0,0 +1,55 @@
+import numpy as np
+
+from conftest import SAMPLE_IMAGES
+from ocr_engines import OcrEngine, OcrWord
+from page_context import PageContext
+
+class ScriptedEngine(OcrEngine):
+    """Answers the fast (det=False) and the expensive (det=True) pass with fixed words"""
+
+    def __init__(self, fast, strong):
+        self.answers = {False: fast, True: strong}
+        self.calls = []
+
+    def recognize(self, image, det=True, cls=False):
+        self.calls.append(det)
+        text, confidence = self.answers[det]
+        return [OcrWord(text, confidence, None)] if text else []
+
+CROP = np.full((30, 120, 3), 255, np.uint8)
+
+def recognize(processor, field, fast, strong):
+    processor.ocr = ScriptedEngine(fast, strong)
+    context = PageContext()
+    result = processor.recognize_crop(CROP, field, context)
+    return result, processor.ocr.calls, context.ocr_stats['calls']
+
+def test_confident_well_formed_field_stops_at_the_fast_pass(processor):
+    result, calls, counted = recognize(processor, 'prime_totale', ('12 500,00', 0.97), ('unused', 0.99))
+    assert result == ('12 500,00', 0.97, False)
+    assert calls == [False] and counted == 1
+
+def test_weak_field_is_escalated_and_keeps_the_better_reading(processor):
+    result, calls, counted = recognize(processor, 'numero_quittance', ('Q0O1', 0.60), ('Q001', 0.93))
+    assert result == ('Q001', 0.93, True)
+    assert calls == [False, True] and counted == 2
+
+def test_confident_reading_failing_its_pattern_is_escalated(processor):
+    # Confident but not a date: the expensive pass is taken even though it is less sure
+    result, _, _ = recognize(processor, 'date_effet_debut', ('ink', 0.99), ('01/02/2024', 0.80))
+    assert result == ('01/02/2024', 0.80, True)
+    # Neither reading a date: the more confident one wins
+    result, _, _ = recognize(processor, 'date_effet_debut', ('ink', 0.99), ('inc', 0.80))
+    assert result == ('ink', 0.99, True)
+
+def test_full_mode_runs_only_the_expensive_pass(processor):
+    processor.OCR_MODE = 'full'
+    result, calls, _ = recognize(processor, 'prime_totale', ('unused', 0.99), ('12 500,00', 0.90))
+    assert result == ('12 500,00', 0.90, False) and calls == [True]
+
+def test_page_metrics_report_the_escalation_rate(processor):
+    result = processor.process_single_image(SAMPLE_IMAGES[0], 'hp0012_custom')
+    metrics = result['ocr_metrics']
+    assert metrics['ocr_mode'] == 'tiered' and metrics['fields'] == len(result['field_confidence'])
+    assert metrics['escalation_rate'] == round(metrics['escalated'] / metrics['fields'], 4)
+    assert processor.get_escalation_rate() == metrics['escalated'] / metrics['fields']
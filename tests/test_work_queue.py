@@ -0,0 +1,100 @@
+import sqlite3
+import time
+
+import pytest
+
+import work_queue
+from conftest import SAMPLE_IMAGES
+from work_queue import QueueWorker, WorkQueue
+
+RESULT = {'numero_quittance': 'Q-1', 'num_contrat': 'C-1', 'source_file': 'a.jpg', 'detected_format': 'hp0012_custom'}
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / 'queue.db'), visibility_timeout=60, max_attempts=2, retry_delay=0)
+
+def result_count(queue):
+    with sqlite3.connect(queue.path) as connection:
+        return connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+def test_expired_lease_goes_to_another_worker_and_the_old_holder_cannot_complete(queue):
+    job_id = queue.enqueue(b'image', 'a.jpg')
+    queue.visibility_timeout = 0.05
+    first = queue.lease('worker-1')
+    assert queue.lease('worker-2') is None
+    time.sleep(0.1)
+
+    queue.visibility_timeout = 60
+    second = queue.lease('worker-2')
+    assert second.job_id == job_id and second.attempts == 2
+    assert not queue.heartbeat(first) and not queue.complete(first, RESULT)
+    assert queue.complete(second, RESULT)
+    assert queue.get(job_id)['status'] == 'done' and result_count(queue) == 1
+
+def test_failed_job_is_retried_then_dead_lettered(queue):
+    job_id = queue.enqueue(b'image', 'a.jpg', format_name='hp0012_custom')
+    job = queue.lease('worker-1')
+    assert job.options == {'format_name': 'hp0012_custom'}
+    assert queue.fail(job, 'first') and queue.get(job_id)['status'] == 'queued'
+
+    job = queue.lease('worker-1')
+    assert job.attempts == 2 and queue.fail(job, 'second')
+    dead = queue.get(job_id)
+    assert dead['status'] == 'dead' and dead['last_error'] == 'second'
+    assert queue.lease('worker-1') is None
+
+    assert queue.retry_dead() == 1 and queue.lease('worker-1').attempts == 1
+
+def test_backoff_delays_the_retry(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), max_attempts=3, retry_delay=60)
+    queue.enqueue(b'image')
+    queue.fail(queue.lease('worker-1'), 'boom')
+    assert queue.lease('worker-1') is None and queue.stats() == {'queued': 1}
+
+def test_complete_records_one_result_with_the_job(queue):
+    job_id = queue.enqueue(b'image', 'a.jpg')
+    job = queue.lease('worker-1')
+    assert queue.complete(job, RESULT, 'hash')
+    assert not queue.complete(job, RESULT, 'hash')
+
+    done = queue.get(job_id)
+    assert done['result_id'] and done['result']['numero_quittance'] == 'Q-1'
+    assert result_count(queue) == 1
+
+def test_complete_failing_midway_leaves_the_job_leased_and_no_result(queue, monkeypatch):
+    job_id = queue.enqueue(b'image', 'a.jpg')
+    job = queue.lease('worker-1')
+
+    def broken_row(*args):
+        raise ValueError('bad result')
+
+    monkeypatch.setattr(work_queue, 'result_row', broken_row)
+    with pytest.raises(ValueError):
+        queue.complete(job, RESULT)
+    assert queue.get(job_id)['status'] == 'leased' and result_count(queue) == 0
+
+    monkeypatch.undo()
+    assert queue.complete(job, RESULT) and result_count(queue) == 1
+
+def test_worker_extracts_a_queued_page(queue, processor):
+    with open(SAMPLE_IMAGES[0], 'rb') as f:
+        job_id = queue.enqueue(f.read(), 'HP0012.jpg', format_name='hp0012_custom',
+                               fields=['numero_quittance', 'num_contrat'], cloudinary_url='https://example/a.jpg')
+    worker = QueueWorker(queue, processor, worker_id='test')
+
+    assert worker.run_once() == 'done' and worker.run_once() is None
+    result = queue.get(job_id)['result']
+    assert result['source_file'] == 'HP0012.jpg' and result['cloudinary_url'] == 'https://example/a.jpg'
+    assert set(result['field_confidence']) <= {'numero_quittance', 'num_contrat'}
+
+def test_api_rejects_unknown_fields_before_queueing():
+    pytest.importorskip('fastapi')
+    from fastapi import HTTPException
+    from main_simple import check_queued_fields
+
+    check_queued_fields('hp0012_custom', ['numero_quittance', 'prime'])
+    check_queued_fields(None, ['numero_quittance'])
+    for format_name, fields in (('hp0012_custom', ['montant']), ('format_9', ['numero_quittance']), (None, ['montant'])):
+        with pytest.raises(HTTPException) as rejected:
+            check_queued_fields(format_name, fields)
+        assert rejected.value.status_code == 400
@@ -0,0 +1,118 @@
+import os
+import sys
+
+# Thread pools that otherwise size themselves to every core of the machine
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS']
+
+# Worker slot claimed by this process, kept so several processors in one process share it
+_claimed_slot = None
+# Thread count set in the environment before numpy was imported, if any
+_env_threads_at_import = None
+
+class ThreadBudget:
+    """
+    Share the cores of the machine between OCR worker processes.
+
+    Each worker gets `threads_per_worker` threads (by default cores // workers) for
+    Paddle/ONNX Runtime intra-op parallelism, OpenCV and BLAS/OpenMP, and with pin=True is
+    bound to its own block of cores. BLAS/OpenMP read their environment variables when
+    numpy/cv2 are imported, so entry points call `set_thread_env()` before those imports;
+    `apply()` runs in the worker before the OCR engine is built. BLAS/OpenMP variables the
+    operator already set are left as they are.
+    """
+
+    def __init__(self, workers=1, threads_per_worker=None, pin=False, total_cores=None):
+        self.total_cores = total_cores or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.threads = threads_per_worker or max(1, self.total_cores // self.workers)
+        self.pin = pin
+        self.worker_index = None
+
+    @classmethod
+    def from_env(cls):
+        """Read OCR_WORKERS, OCR_THREADS_PER_WORKER and OCR_PIN_CPUS"""
+        return cls(
+            workers=int(os.getenv('OCR_WORKERS', '1')),
+            threads_per_worker=int(os.getenv('OCR_THREADS_PER_WORKER', '0')) or None,
+            pin=os.getenv('OCR_PIN_CPUS', '0') == '1',
+        )
+
+    def claim_worker_slot(self, lock_dir='/tmp'):
+        """
+        Pick a worker index for processes that are not told theirs (e.g. uvicorn workers):
+        the first slot whose lock file no other live process holds. The lock is kept open
+        for the lifetime of the process and released by the OS when it exits.
+        """
+        global _claimed_slot
+        if _claimed_slot is not None:
+            return _claimed_slot[0]
+        try:
+            import fcntl
+        except ImportError:
+            return os.getpid() % self.workers
+        for index in range(self.workers):
+            slot_file = open(os.path.join(lock_dir, f"quittance-ocr-worker-{index}.lock"), 'w')
+            try:
+                fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                slot_file.close()
+                continue
+            _claimed_slot = (index, slot_file)
+            return index
+        return os.getpid() % self.workers
+
+    def cores_for(self, worker_index):
+        """The block of cores a worker is pinned to"""
+        first = (worker_index * self.threads) % self.total_cores
+        return {(first + offset) % self.total_cores for offset in range(min(self.threads, self.total_cores))}
+
+    def set_thread_env(self):
+        """Size the BLAS/OpenMP pools through their environment variables (imports nothing)"""
+        global _env_threads_at_import
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(self.threads))
+        if 'numpy' not in sys.modules:
+            _env_threads_at_import = self.blas_threads()
+
+    def blas_threads(self):
+        """Size of the BLAS/OpenMP pools: OMP_NUM_THREADS when set, otherwise the budget"""
+        try:
+            return int(os.environ['OMP_NUM_THREADS'])
+        except (KeyError, ValueError):
+            return self.threads
+
+    def limit_loaded_pools(self):
+        """
+        Resize the BLAS/OpenMP pools of libraries loaded before set_thread_env() ran, which
+        no longer read the environment. Needs threadpoolctl; returns whether it was applied.
+        """
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            return False
+        threadpool_limits(self.blas_threads())
+        return True
+
+    def apply(self, worker_index=None):
+        """Limit the thread pools of this process and optionally pin it; returns the settings applied"""
+        self.set_thread_env()
+        if _env_threads_at_import != self.blas_threads() and not self.limit_loaded_pools():
+            print("Warning: numpy was imported before the thread budget was set and threadpoolctl "
+                  "is not installed; BLAS/OpenMP may use every core")
+
+        import cv2
+        cv2.setNumThreads(self.threads)
+
+        cores = None
+        if self.pin and hasattr(os, 'sched_setaffinity'):
+            if worker_index is None:
+                worker_index = self.claim_worker_slot()
+            cores = self.cores_for(worker_index)
+            os.sched_setaffinity(0, cores)
+        self.worker_index = worker_index
+        return {'threads': self.threads, 'worker_index': worker_index, 'cores': sorted(cores) if cores else None}
+
+    def engine_options(self):
+        """PaddleOCR options for the intra-op thread count of one engine (also used for ONNX sessions)"""
+        return {'cpu_threads': self.threads}
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Work Queue
+Durable extraction queue shared by any number of worker processes on one machine (a
+SQLite file; not for network filesystems, and there is no networked backend). The API enqueues
+uploaded images; workers lease jobs, keep the lease alive while they extract, and record
+the result. Jobs whose worker dies are leased again once the lease expires; jobs that
+keep failing end up in the dead-letter state.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from results_store import INSERT, RESULTS_DB, SCHEMA as RESULTS_SCHEMA, file_hash, result_row
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    filename TEXT,
+    image BLOB NOT NULL,
+    options TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result_id INTEGER,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_leased ON jobs (status, lease_expires);
+"""
+
+# A leased job: `token` proves the lease in heartbeat/complete/fail calls
+Job = namedtuple('Job', ['job_id', 'token', 'filename', 'image', 'options', 'attempts'])
+
+class WorkQueue:
+    """
+    Extraction jobs in SQLite, next to the results they produce (RESULTS_DB by default).
+
+    A worker leases a job for `visibility_timeout` seconds and must heartbeat before the
+    lease runs out; an expired lease makes the job available to other workers again.
+    Every lease counts as an attempt: after `max_attempts` the job is dead-lettered
+    instead of retried. A result is recorded in the same transaction that completes the
+    job, and only by the holder of the current lease, so each job produces exactly one
+    row in the results table even if a slow worker finishes after losing its lease.
+    """
+
+    def __init__(self, path=RESULTS_DB, visibility_timeout=120.0, max_attempts=3, retry_delay=5.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # Failed jobs wait retry_delay * 2^(attempt - 1) seconds before the next attempt
+        self.retry_delay = retry_delay
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: every transaction below is opened explicitly
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(RESULTS_SCHEMA + JOBS_SCHEMA)
+
+    def transaction(self, sql, params=()):
+        """Run one statement in an immediate (write-locked) transaction; returns the cursor"""
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self.connection.execute(sql, params)
+                self.connection.execute('COMMIT')
+                return cursor
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+
+    def enqueue(self, image, filename=None, **options):
+        """
+        Add a job for the image bytes. `options` are passed to process_single_image
+        (format_name, fields, time_budget) and returned with the result (e.g. cloudinary_url).
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.transaction(
+            'INSERT INTO jobs (job_id, status, filename, image, options, available_at, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, 'queued', filename, sqlite3.Binary(image), json.dumps(options), now, now))
+        return job_id
+
+    def lease(self, worker_id):
+        """Lease the oldest available job, or return None if there is none"""
+        now = time.time()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                # Jobs whose worker vanished on its last allowed attempt are dead-lettered, not leased
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = 'lease expired', finished_at = ?, "
+                    "lease_token = NULL WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts))
+                row = self.connection.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' AND available_at <= ? "
+                    "UNION ALL SELECT id FROM jobs WHERE status = 'leased' AND lease_expires < ? "
+                    "ORDER BY id LIMIT 1", (now, now)).fetchone()
+                if row is None:
+                    self.connection.execute('COMMIT')
+                    return None
+                token = uuid.uuid4().hex
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                    "lease_token = ?, lease_expires = ? WHERE id = ?",
+                    (worker_id, token, now + self.visibility_timeout, row['id']))
+                job = self.connection.execute(
+                    'SELECT job_id, filename, image, options, attempts FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+        return Job(job['job_id'], token, job['filename'], bytes(job['image']), json.loads(job['options']), job['attempts'])
+
+    def heartbeat(self, job):
+        """Extend the lease; False if it was lost (expired and taken by another worker)"""
+        cursor = self.transaction(
+            "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+            (time.time() + self.visibility_timeout, job.job_id, job.token))
+        return cursor.rowcount == 1
+
+    def complete(self, job, result, source_hash=None):
+        """Record the result and finish the job; False (nothing recorded) if the lease was lost"""
+        now = time.time()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self.connection.execute(
+                    "UPDATE jobs SET status = 'done', finished_at = ?, lease_token = NULL, image = X'' "
+                    "WHERE job_id = ? AND lease_token = ? AND status = 'leased'", (now, job.job_id, job.token))
+                if cursor.rowcount != 1:
+                    self.connection.execute('ROLLBACK')
+                    return False
+                result_id = self.connection.execute(INSERT, result_row(result, source_hash, now)).lastrowid
+                self.connection.execute('UPDATE jobs SET result_id = ? WHERE job_id = ?', (result_id, job.job_id))
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+        return True
+
+    def fail(self, job, error):
+        """Schedule a retry with backoff, or dead-letter the job after max_attempts"""
+        now = time.time()
+        if job.attempts >= self.max_attempts:
+            cursor = self.transaction(
+                "UPDATE jobs SET status = 'dead', last_error = ?, finished_at = ?, lease_token = NULL "
+                "WHERE job_id = ? AND lease_token = ? AND status = 'leased'", (error, now, job.job_id, job.token))
+        else:
+            cursor = self.transaction(
+                "UPDATE jobs SET status = 'queued', last_error = ?, available_at = ?, lease_token = NULL "
+                "WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+                (error, now + self.retry_delay * 2 ** (job.attempts - 1), job.job_id, job.token))
+        return cursor.rowcount == 1
+
+    def get(self, job_id):
+        """Status of a job, with its options and, once done, its result"""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT j.job_id, j.status, j.filename, j.options, j.attempts, j.last_error, j.created_at, '
+                'j.finished_at, j.result_id, r.data FROM jobs j LEFT JOIN results r ON r.id = j.result_id WHERE j.job_id = ?',
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'filename': row['filename'],
+            'options': json.loads(row['options']),
+            'attempts': row['attempts'],
+            'last_error': row['last_error'],
+            'created_at': row['created_at'],
+            'finished_at': row['finished_at'],
+            'result_id': row['result_id'],
+            'result': json.loads(row['data']) if row['data'] else None,
+        }
+
+    def retry_dead(self):
+        """Put every dead-lettered job back in the queue with a fresh attempt count"""
+        cursor = self.transaction(
+            "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, finished_at = NULL "
+            "WHERE status = 'dead'", (time.time(),))
+        return cursor.rowcount
+
+    def stats(self):
+        with self.lock:
+            rows = self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+class QueueWorker:
+    """
+    Stateless worker: leases jobs, extracts them with a warm QuittanceProcessor while a
+    background thread heartbeats the lease, and completes or fails them.
+    """
+
+    def __init__(self, queue, processor=None, worker_id=None, poll_interval=1.0):
+        self.queue = queue
+        self.processor = processor
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.running = False
+
+    def get_processor(self):
+        """Build the processor once so the OCR engine stays warm between jobs"""
+        if self.processor is None:
+            from quittance_processor import QuittanceProcessor
+            self.processor = QuittanceProcessor()
+        return self.processor
+
+    def keep_alive(self, job, done):
+        """Heartbeat three times per visibility timeout until the job is finished"""
+        while not done.wait(self.queue.visibility_timeout / 3):
+            if not self.queue.heartbeat(job):
+                print(f"Lease lost on job {job.job_id}; its result will not be recorded")
+                return
+
+    def extract(self, job):
+        from deadline import Deadline
+        options = job.options
+        suffix = os.path.splitext(job.filename or '')[1] or '.jpg'
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+            temp_file.write(job.image)
+            temp_path = temp_file.name
+        try:
+            deadline = Deadline(options['time_budget']) if options.get('time_budget') else None
+            result = self.get_processor().process_single_image(
+                temp_path, options.get('format_name'), deadline=deadline, fields=options.get('fields'))
+        finally:
+            os.unlink(temp_path)
+        result['source_file'] = job.filename or result['source_file']
+        for key in ('cloudinary_url', 'cloudinary_public_id'):
+            if options.get(key):
+                result[key] = options[key]
+        return result
+
+    def handle(self, job):
+        print(f"Job {job.job_id} ({job.filename}), attempt {job.attempts}/{self.queue.max_attempts}")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_alive, args=(job, done), name="lease-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.extract(job)
+            error = result.get('error')
+        except Exception as e:
+            result, error = None, str(e)
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if error:
+            self.queue.fail(job, error)
+            print(f"Job {job.job_id} failed: {error}")
+            return 'failed'
+        if not self.queue.complete(job, result, file_hash(contents=job.image)):
+            print(f"Job {job.job_id} finished after its lease was lost; result discarded")
+            return 'lost'
+        print(f"Job {job.job_id} done")
+        return 'done'
+
+    def run_once(self):
+        """Lease and handle one job; returns its outcome, or None if the queue was empty"""
+        job = self.queue.lease(self.worker_id)
+        if job is None:
+            return None
+        return self.handle(job)
+
+    def run(self):
+        """Work until interrupted"""
+        self.get_processor().warm_up()
+        self.running = True
+        print(f"Worker {self.worker_id} waiting for jobs in {os.path.abspath(self.queue.path)} (Ctrl+C to stop)")
+        try:
+            while self.running:
+                if self.run_once() is None:
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping worker")
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable extraction queue: run workers, enqueue files, inspect jobs")
+    parser.add_argument('--db', default=RESULTS_DB)
+    parser.add_argument('--visibility-timeout', type=float, default=120.0)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('worker', help="Process jobs until interrupted")
+    enqueue_parser = subparsers.add_parser('enqueue', help="Add image files to the queue")
+    enqueue_parser.add_argument('files', nargs='+')
+    enqueue_parser.add_argument('--format', default=None)
+    subparsers.add_parser('stats', help="Number of jobs per status")
+    subparsers.add_parser('retry-dead', help="Requeue the dead-lettered jobs")
+
+    args = parser.parse_args()
+    queue = WorkQueue(args.db, args.visibility_timeout, args.max_attempts)
+    if args.command == 'worker':
+        QueueWorker(queue).run()
+    elif args.command == 'enqueue':
+        for path in args.files:
+            with open(path, 'rb') as f:
+                print(queue.enqueue(f.read(), os.path.basename(path), format_name=args.format))
+    elif args.command == 'stats':
+        print(queue.stats())
+    else:
+        print(f"Requeued {queue.retry_dead()} job(s)")
+
+if __name__ == "__main__":
+    main()